@@ -0,0 +1,150 @@
+"""
+CACHES['default'] from the environment, with hit/miss counting.
+
+``CACHE_URL`` picks the backend:
+
+* unset or ``locmem://``: per-process local memory (development);
+* ``file:///var/cache/portal`` (or ``file://relative/path`` under the project): files on
+  disk, shared by the workers of one machine;
+* ``redis://host:6379/1`` / ``rediss://...``: Redis, shared by every replica.
+
+``CACHE_TIMEOUT`` sets the default lifetime in seconds.
+
+Whatever the backend, it is wrapped in ``InstrumentedCache``, which counts
+lookups that hit and miss. Counts are kept per process and added to shared
+totals in the cache itself every ``FLUSH_EVERY`` lookups, so ``totals()`` sees
+every worker; ``local_stats()`` is this process only.
+"""
+import os
+import threading
+from urllib.parse import urlsplit
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'rediss': 'django.core.cache.backends.redis.RedisCache',
+}
+FLUSH_EVERY = 100
+STATS_KEY = 'cache-stats:{}'
+_MISSING = object()
+
+
+def cache_config(base_dir, environ=None):
+    environ = os.environ if environ is None else environ
+    url = environ.get('CACHE_URL', '') or 'locmem://'
+    parsed = urlsplit(url)
+    if parsed.scheme not in BACKENDS:
+        raise ValueError(f"Unsupported CACHE_URL scheme: {parsed.scheme!r}")
+    if parsed.scheme == 'locmem':
+        location = parsed.netloc or 'portal'
+    elif parsed.scheme == 'file':
+        # file:///abs/path, or file://relative/path under the project.
+        path = parsed.netloc + parsed.path
+        location = str(path if os.path.isabs(path) else base_dir / path)
+    else:
+        location = url
+    return {
+        'BACKEND': 'PublicBridge.cache_backends.InstrumentedCache',
+        'LOCATION': location,
+        'TIMEOUT': int(environ.get('CACHE_TIMEOUT', 300)),
+        'KEY_PREFIX': environ.get('CACHE_KEY_PREFIX', 'portal'),
+        'OPTIONS': {'BACKEND': BACKENDS[parsed.scheme]},
+    }
+
+
+class _Counters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.pending_hits = self.pending_misses = 0
+
+    def record(self, hits, misses):
+        """Count lookups; returns pending deltas to flush once there are enough of them."""
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+            self.pending_hits += hits
+            self.pending_misses += misses
+            if self.pending_hits + self.pending_misses < FLUSH_EVERY:
+                return None
+            pending = self.pending_hits, self.pending_misses
+            self.pending_hits = self.pending_misses = 0
+            return pending
+
+
+class InstrumentedCache:
+    """Wraps the cache backend named in OPTIONS['BACKEND'] and counts its hits and misses."""
+
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        backend = import_string(options.pop('BACKEND'))
+        self._cache = backend(location, {**params, 'OPTIONS': options})
+        self._counters = _Counters()
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def _record(self, hits, misses):
+        pending = self._counters.record(hits, misses)
+        if pending:
+            self._add_to_totals(*pending)
+
+    def _add_to_totals(self, hits, misses):
+        for name, amount in (('hits', hits), ('misses', misses)):
+            if not amount:
+                continue
+            key = STATS_KEY.format(name)
+            # add() first so the counter exists; incr() is atomic on shared backends.
+            self._cache.add(key, 0, timeout=None)
+            try:
+                self._cache.incr(key, amount)
+            except ValueError:
+                self._cache.set(key, amount, timeout=None)
+
+    def get(self, key, default=None, version=None):
+        value = self._cache.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._record(0, 1)
+            return default
+        self._record(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self._cache.get_many(keys, version=version)
+        self._record(len(found), len(keys) - len(found))
+        return found
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            value = default() if callable(default) else default
+            if value is not None:
+                self._cache.add(key, value, timeout=timeout, version=version)
+                return self._cache.get(key, value, version=version)
+        return value
+
+    def local_stats(self):
+        with self._counters.lock:
+            return {'hits': self._counters.hits, 'misses': self._counters.misses}
+
+    def totals(self):
+        """Shared totals across processes (up to FLUSH_EVERY lookups behind per process)."""
+        found = self._cache.get_many([STATS_KEY.format('hits'), STATS_KEY.format('misses')])
+        return {
+            'hits': found.get(STATS_KEY.format('hits'), 0),
+            'misses': found.get(STATS_KEY.format('misses'), 0),
+        }
+
+    def reset_stats(self):
+        with self._counters.lock:
+            self._counters.hits = self._counters.misses = 0
+            self._counters.pending_hits = self._counters.pending_misses = 0
+        self._cache.delete_many([STATS_KEY.format('hits'), STATS_KEY.format('misses')])
@@ -0,0 +1,90 @@
+"""
+Versioned cache keys and page caching.
+
+A page or fragment showing one object is keyed on the object's
+``updated_at``, so it goes stale by itself as soon as the object is saved:
+nothing has to find and delete it. Changes that don't touch the object's own
+row key on a named ``generation`` instead, which their post_save/post_delete
+receivers bump once the transaction commits: e.g. a post's comment threads
+are keyed on its ``forum.post:<id>:comments`` generation (see
+forum/comment_tree.py), which a new, edited or deleted comment bumps.
+
+Templates cache fragments with Django's ``{% cache %}`` tag, passing the
+version (``object.updated_at|date:'U.u'`` or a generation) as a vary-on
+argument.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.http import HttpResponse
+
+PAGE_KEY = 'page:{name}:{version}:{path}'
+GENERATION_KEY = 'generation:{}'
+# Longer than any fragment is cached for; an expired counter only costs misses.
+GENERATION_TIMEOUT = 86400
+
+
+def generation(name):
+    """
+    The current value of the counter ``name``. It only ever changes to a new,
+    unused value, so a lost or expired counter just means a fresh one.
+    """
+    key = GENERATION_KEY.format(name)
+    value = cache.get(key)
+    if value is None:
+        value = time.time_ns()
+        if not cache.add(key, value, timeout=GENERATION_TIMEOUT):
+            value = cache.get(key, value)
+    return value
+
+
+def bump_generation(name):
+    cache.set(GENERATION_KEY.format(name), time.time_ns(), timeout=GENERATION_TIMEOUT)
+
+
+def versioned_page(version, timeout=DEFAULT_TIMEOUT):
+    """
+    Cache a view's successful GET responses under a key that includes
+    ``version(request, *args, **kwargs)``. The version callable should be
+    cheap (e.g. fetch only ``updated_at``); returning None skips the cache for
+    that request, which is how a view lets its own 404 happen.
+
+    Only use it for pages that render the same for every visitor: responses
+    that set cookies (CSRF, messages, session) are never stored.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            current = version(request, *args, **kwargs)
+            if current is None:
+                return view(request, *args, **kwargs)
+            path = hashlib.md5(request.get_full_path().encode(), usedforsecurity=False).hexdigest()
+            key = PAGE_KEY.format(name=f'{view.__module__}.{view.__qualname__}', version=current, path=path)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                cache.set(key, (response.content, response['Content-Type']), timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """Hit/miss counts for the default cache: this process, and all processes where shared."""
+    local = getattr(cache, 'local_stats', None)
+    totals = getattr(cache, 'totals', None)
+    if local is None:
+        return {}
+    stats = {'process': local(), 'total': totals()}
+    for counts in stats.values():
+        lookups = counts['hits'] + counts['misses']
+        counts['hit_rate'] = round(counts['hits'] / lookups, 4) if lookups else None
+    return stats
@@ -0,0 +1,24 @@
+"""
+ETags for pages rendered per user, for use with Django's ``condition`` decorator.
+
+A public page can take its ETag/Last-Modified straight from the data it
+shows. A page rendered for the signed-in user also carries their navbar and
+a CSRF token, so ``personal_etag`` folds in the user and their CSRF cookie.
+Pass anything else the page's chrome shows (e.g. the unread badge) as extra
+parts. It returns None, which skips conditional handling, while flash
+messages are queued: the fresh render is what shows them.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+
+
+def personal_etag(request, *parts):
+    # len() loads queued messages without marking them as shown.
+    if len(get_messages(request)):
+        return None
+    user = request.user
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    key = repr((user.pk, csrf, request.get_full_path()) + parts)
+    return hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
@@ -0,0 +1,136 @@
+"""
+Serving of user-uploaded files (MEDIA_ROOT).
+
+With ``MEDIA_SERVING['BACKEND']``:
+
+* ``'django'`` (default) streams the file from Python with ETag/Last-Modified
+  revalidation and single byte-range requests (video seeking);
+* ``'x-accel'`` hands the transfer to nginx via ``X-Accel-Redirect`` to an
+  ``internal`` location at ``ACCEL_PREFIX`` that aliases MEDIA_ROOT;
+* ``'x-sendfile'`` hands it to Apache/lighttpd via ``X-Sendfile``.
+
+Content-addressed files (forum uploads and their variants, see forum/media.py)
+never change under the same name and are cached for a year as immutable.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+DEFAULTS = {
+    'BACKEND': 'django',
+    'ACCEL_PREFIX': '/protected-media/',
+    'MAX_AGE': 3600,
+    'IMMUTABLE_PREFIXES': ('uploads/', 'thumbs/uploads/'),
+}
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'MEDIA_SERVING', {})}
+
+
+def _byte_range(header, size):
+    """``(start, end)`` inclusive for a single-range header, None to send everything, or False if unsatisfiable."""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Malformed and multi-range requests get the whole file.
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_media(request, path):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found.")
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404("Not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("Not found.")
+
+    config = _config()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    if path.startswith(tuple(config['IMMUTABLE_PREFIXES'])):
+        cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        cache_control = f"public, max-age={config['MAX_AGE']}"
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, full_path, path, stat.st_size, etag, config)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def _file_response(request, full_path, path, size, etag, config):
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    backend = config['BACKEND']
+    if backend == 'x-accel':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = config['ACCEL_PREFIX'] + quote(path)
+        return response
+    if backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return response
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range == etag):
+        byte_range = _byte_range(range_header, size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(_read_range(full_path, start, length), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    return response
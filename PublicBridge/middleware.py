@@ -0,0 +1,90 @@
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+# Only text formats are worth compressing; images, video and archives already are.
+COMPRESSIBLE_TYPES = (
+    'text/html',
+    'text/csv',
+    'text/plain',
+    'application/json',
+    'application/x-ndjson',
+)
+# HTML carries CSRF tokens next to user-controlled text, so it stays on
+# GZipMiddleware's path, which pads each response with random bytes as a
+# BREACH mitigation. Brotli has no such padding; it is used for data formats.
+BROTLI_TYPES = {content_type for content_type in COMPRESSIBLE_TYPES if content_type != 'text/html'}
+BROTLI_QUALITY = 5
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware for HTML, CSV and JSON responses. CSV and JSON are
+    compressed with brotli instead when the client accepts it and the
+    ``brotli`` package is installed; HTML always gets Django's gzip with its
+    BREACH padding. Static files are left to WhiteNoise, which serves them
+    precompressed.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return response
+        brotli = _brotli() if content_type in BROTLI_TYPES else None
+        if brotli is None or not re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+
+        if not response.streaming and len(response.content) < 200:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if response.streaming:
+            response.streaming_content = self._compress_stream(brotli, response)
+            del response.headers['Content-Length']
+        else:
+            compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+    @staticmethod
+    def _compress_stream(brotli, response):
+        # Capture the iterator now; streaming_content is reassigned below.
+        original = response.streaming_content
+        if response.is_async:
+            async def compress():
+                compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+                async for chunk in original:
+                    data = compressor.process(chunk)
+                    if data:
+                        yield data
+                yield compressor.finish()
+            return compress()
+
+        def compress():
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            for chunk in original:
+                data = compressor.process(chunk)
+                if data:
+                    yield data
+            yield compressor.finish()
+        return compress()
@@ -0,0 +1,169 @@
+"""
+Per-request cost: wall time, SQL queries and template rendering.
+
+``ProfilingMiddleware`` (first in MIDDLEWARE, so it times everything else)
+profiles a sampled share of requests (``REQUEST_PROFILING['SAMPLE_RATE']``;
+the rest pay only for one random number). For a profiled request it records:
+
+* total wall time;
+* SQL query count and time, through a ``connection.execute_wrapper`` on every
+  database alias, and each statement's fingerprint (its SQL with literals and
+  ``IN`` lists collapsed), so the same query repeated with different
+  parameters, the usual N+1, shows up as a duplicate;
+* time spent rendering templates.
+
+Results go out as a ``Server-Timing`` header (visible in browser dev tools)
+when SERVER_TIMING is on, and always as one JSON log line on the
+``PublicBridge.profiling`` logger: INFO normally, WARNING with ``flags`` when
+the request crosses SLOW_MS, MAX_QUERIES or MAX_DUPLICATES.
+"""
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.05,
+    'SERVER_TIMING': False,
+    'SLOW_MS': 500,
+    'MAX_QUERIES': 50,
+    'MAX_DUPLICATES': 5,   # flag when one fingerprint runs more often than this
+    'TOP_DUPLICATES': 3,   # fingerprints listed in the log line
+}
+
+_current = ContextVar('request_profile', default=None)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_IN_LIST_RE = re.compile(r'\bIN \((?:[^()]|\([^()]*\))*\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_PROFILING', {})}
+
+
+def fingerprint(sql):
+    """``sql`` with literals and IN lists collapsed: one per query shape."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count > 1]
+
+
+def _install_template_timer():
+    """Time Django template renders by wrapping the backend's Template.render once per process."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, '_profiled', False):
+        return
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        # Only the outermost render counts; included templates are part of it.
+        if profile is None or profile.template_depth:
+            return original(self, context, request)
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            profile.template_seconds += time.perf_counter() - started
+            profile.template_depth -= 1
+
+    render._profiled = True
+    Template.render = render
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _install_template_timer()
+
+    def __call__(self, request):
+        config = _config()
+        if not config['ENABLED'] or random.random() >= config['SAMPLE_RATE']:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, response, profile, config)
+        return response
+
+    def report(self, request, response, profile, config):
+        total_ms = (time.perf_counter() - profile.started) * 1000
+        sql_ms = profile.sql_seconds * 1000
+        template_ms = profile.template_seconds * 1000
+        duplicates = profile.duplicates()
+
+        flags = []
+        if total_ms > config['SLOW_MS']:
+            flags.append('slow')
+        if profile.queries > config['MAX_QUERIES']:
+            flags.append('many_queries')
+        if duplicates and duplicates[0][1] > config['MAX_DUPLICATES']:
+            flags.append('duplicate_queries')
+
+        if config['SERVER_TIMING']:
+            response['Server-Timing'] = (
+                f'total;dur={total_ms:.1f}, '
+                f'db;dur={sql_ms:.1f};desc="{profile.queries} queries", '
+                f'tpl;dur={template_ms:.1f}'
+            )
+
+        match = request.resolver_match
+        line = {
+            'view': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'sql_ms': round(sql_ms, 2),
+            'queries': profile.queries,
+            'template_ms': round(template_ms, 2),
+            'duplicates': [
+                {'count': count, 'sql': sql[:300]}
+                for sql, count in duplicates[:config['TOP_DUPLICATES']]
+            ],
+            'flags': flags,
+        }
+        logger.log(logging.WARNING if flags else logging.INFO, json.dumps(line))
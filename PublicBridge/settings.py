@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .cache_backends import cache_config
+from .database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -20,10 +24,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-1z1x9)oy$)bc!i^1ybab$pl9n%c947u$1cux12j4w^9_1*+o!v'
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'django-insecure-1z1x9)oy$)bc!i^1ybab$pl9n%c947u$1cux12j4w^9_1*+o!v')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# The Docker image sets DJANGO_DEBUG=0.
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = ["*"]
 
@@ -38,12 +43,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    # 'channels',
+    'channels',
     'main',
     'dashboard',
     'reports',
     'forum',
     'users',
+    'search',
     'django.contrib.sites',  # Required for allauth
     'allauth',
     'allauth.account',
@@ -51,7 +57,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'PublicBridge.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'PublicBridge.middleware.CompressionMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,6 +84,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'forum.context_processors.unread_notifications',
             ],
         },
     },
@@ -83,24 +93,89 @@ TEMPLATES = [
 WSGI_APPLICATION = 'PublicBridge.wsgi.application'
 ASGI_APPLICATION = "PublicBridge.asgi.application"
 
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
-        'CONFIG': {
-            "hosts": [('127.0.0.1', 6379)],
+# Realtime chat. Set CHANNEL_REDIS_URL (needs channels_redis installed) to share
+# chat groups between processes; otherwise the in-memory layer is used, which
+# only works within a single process (development and tests).
+if os.environ.get('CHANNEL_REDIS_URL'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                "hosts": [os.environ['CHANNEL_REDIS_URL']],
+            },
         },
-    },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
+# Chat messages are buffered per connection and written with one bulk_create
+# every FLUSH_INTERVAL_MS or FLUSH_SIZE messages, whichever comes first.
+FORUM_CHAT = {
+    'FLUSH_INTERVAL_MS': 250,
+    'FLUSH_SIZE': 50,
+    'MAX_MESSAGE_LENGTH': 4000,
+}
+
+# Forum home timeline cache (see forum/timeline.py). Set TIMELINE_REDIS_URL
+# (e.g. redis://host:6379/2) to share timelines between workers and replicas;
+# without it each process keeps its own, and their entries expire after
+# TIMEOUT seconds so posts published by other processes show up within that.
+if os.environ.get('TIMELINE_REDIS_URL'):
+    FORUM_TIMELINE = {
+        'BACKEND': 'forum.timeline.RedisTimelineStore',
+        'OPTIONS': {'url': os.environ['TIMELINE_REDIS_URL']},
+        'MAX_LENGTH': 800,
+        'FANOUT_LIMIT': 10000,
+    }
+else:
+    FORUM_TIMELINE = {
+        'BACKEND': 'forum.timeline.LocalTimelineStore',
+        'OPTIONS': {'timeout': 60, 'max_users': 10000},
+        'MAX_LENGTH': 800,
+        'FANOUT_LIMIT': 10000,
+    }
+
+# Notification outbox worker (python manage.py process_notifications).
+FORUM_NOTIFICATIONS = {
+    'WORKERS': 4,
+    'BATCH_SIZE': 500,
+    'BROADCAST_CHUNK': 1000,
+    'RATE_LIMIT': 30,
+    'RATE_WINDOW': 3600,
+    'RETRY_DELAY': 60,
+    'MAX_ATTEMPTS': 5,
+    'LEASE': 300,
+    'POLL_INTERVAL': 2,
+    'UNREAD_CACHE_TTL': 300,
+}
+
+# Forum uploads (see forum/media.py): stored once per content hash, with WebP
+# variants at these widths made by a process pool (0 workers = inline).
+FORUM_MEDIA = {
+    'MAX_UPLOAD_SIZE': 10 * 1024 * 1024,
+    'VARIANT_WIDTHS': (320, 640, 1280),
+    'THUMBNAIL_WORKERS': 2,
 }
 
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# Configured from DATABASE_URL and DB_* variables; see PublicBridge/database.py.
+# Without DATABASE_URL this is the local SQLite file, in WAL mode.
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR),
+}
+
+# Cache backend from CACHE_URL (locmem://, file:///path, redis://...); see
+# PublicBridge/cache_backends.py. Keys for pages and template fragments are
+# versioned per object (PublicBridge/caching.py).
+CACHES = {
+    'default': cache_config(BASE_DIR),
 }
 
 AUTH_USER_MODEL = 'users.User'
@@ -125,6 +200,30 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Request profiling (see PublicBridge/profiling.py): the sampled share of
+# requests is logged with its SQL and template cost; requests over the
+# thresholds are logged as warnings. Set PROFILING_SAMPLE_RATE=1 locally to
+# profile every request.
+REQUEST_PROFILING = {
+    'ENABLED': True,
+    'SAMPLE_RATE': float(os.environ.get('PROFILING_SAMPLE_RATE', 0.01)),
+    'SERVER_TIMING': DEBUG,
+    'SLOW_MS': 500,
+    'MAX_QUERIES': 50,
+    'MAX_DUPLICATES': 5,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'PublicBridge.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -142,11 +241,35 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Outside DEBUG, collectstatic writes content-hashed copies plus .gz/.br
+# variants, and WhiteNoise serves them with far-future cache headers.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
 
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# How /media/ is served (see PublicBridge/media.py): 'django' streams files
+# with ETag and Range support; behind nginx use 'x-accel' with an internal
+# location at ACCEL_PREFIX aliasing MEDIA_ROOT, behind Apache 'x-sendfile'.
+MEDIA_SERVING = {
+    'BACKEND': os.environ.get('MEDIA_SERVING_BACKEND', 'django'),
+    'ACCEL_PREFIX': '/protected-media/',
+    'MAX_AGE': 3600,
+}
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
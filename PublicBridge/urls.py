@@ -18,9 +18,10 @@ from django.contrib import admin
 # from django.contrib import admin_dashboard
 from django.urls import path
 
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from .media import serve_media
 
 
 
@@ -32,6 +33,9 @@ urlpatterns = [
     path('dashboard/', include('dashboard.urls')),
     path('users/', include('users.urls')),  # Users app URLs
     path('forum/', include('forum.urls', namespace='forum')),
+    path('search/', include('search.urls')),
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+urlpatterns += [
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+]
@@ -1,5 +1,7 @@
 from django.contrib import admin
 
+from .models import UserStats
+
 # --- Citizen Reports Management ---
 
 # --- Department Post Management ---
@@ -14,6 +16,11 @@ from django.contrib import admin
 
 
 # --- Analytics and Platform Metrics ---
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'reports_submitted', 'reports_resolved', 'posts_count', 'comments_count', 'updated_at')
+    search_fields = ('user__username',)
+    raw_id_fields = ('user',)
 
 
 # --- Project Updates ---
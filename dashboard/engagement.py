@@ -0,0 +1,198 @@
+"""
+Engagement scores for users.User.engagement_score.
+
+Each activity source (posts, comments, votes received, reports filed and
+resolved, feedback) is aggregated with one grouped query that counts a user's
+activity in each age window (``WINDOWS``) using conditional aggregation. The
+per-source window counts land in NumPy arrays and the score is
+
+    sum over sources and windows of count * SOURCE_WEIGHT * WINDOW_WEIGHT
+
+so recent activity counts most and activity older than the last window not at
+all. Scores are written back with chunked bulk_update, only where they changed.
+
+Incremental runs rescore only users with new activity since the previous run
+started. Votes carry no timestamp, so votes received on older content are only
+picked up by full runs, as is the decay of inactive users' scores: run a full
+pass nightly and incremental passes as often as needed.
+"""
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from forum.models import Comment, Feedback, Post
+from reports.models import Comment as ReportComment, Report
+from .models import EngagementScoreRun
+
+User = get_user_model()
+
+CHUNK_SIZE = 2000
+# (max age in days, weight): activity in the last week counts fully, and so on.
+WINDOWS = ((7, 1.0), (30, 0.6), (90, 0.3), (365, 0.1))
+SOURCE_WEIGHTS = {
+    'posts': 3.0,
+    'comments': 2.0,
+    'report_comments': 2.0,
+    'post_votes_received': 1.0,
+    'comment_votes_received': 0.5,
+    'reports_filed': 4.0,
+    'reports_resolved': 6.0,
+    'feedback': 3.0,
+}
+
+
+def _sources():
+    """(name, queryset, user field, time field, summed field or None for a row count)."""
+    return [
+        ('posts', Post.objects.all(), 'author_id', 'created_at', None),
+        ('comments', Comment.objects.all(), 'author_id', 'created_at', None),
+        ('report_comments', ReportComment.objects.all(), 'user_id', 'created_at', None),
+        ('post_votes_received', Post.objects.filter(upvote_count__gt=0), 'author_id', 'created_at', 'upvote_count'),
+        ('comment_votes_received', Comment.objects.filter(upvote_count__gt=0), 'author_id', 'created_at', 'upvote_count'),
+        ('reports_filed', Report.objects.all(), 'user_id', 'created_at', None),
+        ('reports_resolved', Report.objects.filter(status='resolved'), 'user_id', 'updated_at', None),
+        ('feedback', Feedback.objects.all(), 'user_id', 'created_at', None),
+    ]
+
+
+class Timer:
+    """Collects wall-clock time per pipeline stage and optionally echoes it."""
+
+    def __init__(self, stdout=None):
+        self.timings = {}
+        self.stdout = stdout
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+
+class _Stage:
+    def __init__(self, timer, name):
+        self.timer, self.name = timer, name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        self.timer.timings[self.name] = self.timer.timings.get(self.name, 0) + elapsed
+        if self.timer.stdout:
+            self.timer.stdout.write(f"{self.name}: {elapsed:.3f}s")
+
+
+def _window_cutoffs(now):
+    return [now - timedelta(days=days) for days, _ in WINDOWS]
+
+
+def _window_counts(queryset, user_field, time_field, summed, cutoffs, user_ids=None):
+    """One grouped query: {user_id: [amount in window 0, window 1, ...]}."""
+    aggregate = (lambda condition: Sum(summed, filter=condition)) if summed else (lambda condition: Count('pk', filter=condition))
+    annotations = {}
+    newer = None
+    for index, cutoff in enumerate(cutoffs):
+        condition = Q(**{f'{time_field}__gte': cutoff})
+        if newer is not None:
+            condition &= Q(**{f'{time_field}__lt': newer})
+        annotations[f'w{index}'] = aggregate(condition)
+        newer = cutoff
+    rows = queryset.filter(**{f'{time_field}__gte': cutoffs[-1]})
+    if user_ids is not None:
+        rows = rows.filter(**{f'{user_field}__in': user_ids})
+    rows = rows.order_by().values(user_field).annotate(**annotations)
+    return {
+        row[user_field]: [row[f'w{index}'] or 0 for index in range(len(cutoffs))]
+        for row in rows
+    }
+
+
+def compute_scores(user_ids, now=None, timer=None):
+    """Scores for ``user_ids`` (a sorted NumPy int array) as a NumPy int array in the same order."""
+    import numpy as np
+
+    now = now or timezone.now()
+    timer = timer or Timer()
+    cutoffs = _window_cutoffs(now)
+    window_weights = np.array([weight for _, weight in WINDOWS])
+    total = np.zeros(len(user_ids), dtype=np.float64)
+    # Unrestricted queries when scoring everyone; otherwise filter to the ids.
+    restrict = None if len(user_ids) > CHUNK_SIZE else user_ids.tolist()
+
+    collected = {}
+    for name, queryset, user_field, time_field, summed in _sources():
+        with timer.stage(f'collect {name}'):
+            collected[name] = _window_counts(queryset, user_field, time_field, summed, cutoffs, restrict)
+
+    with timer.stage('score'):
+        for name, counts in collected.items():
+            if not counts:
+                continue
+            ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            matrix = np.array(list(counts.values()), dtype=np.float64)
+            positions = np.searchsorted(user_ids, ids)
+            found = (positions < len(user_ids)) & (user_ids[np.minimum(positions, len(user_ids) - 1)] == ids)
+            np.add.at(total, positions[found], (matrix[found] @ window_weights) * SOURCE_WEIGHTS[name])
+    return np.rint(total).astype(np.int64)
+
+
+def active_user_ids(since):
+    """Users with any scored activity at or after ``since``."""
+    active = set()
+    for _, queryset, user_field, time_field, _ in _sources():
+        active.update(
+            queryset.filter(**{f'{time_field}__gte': since}).order_by()
+            .values_list(user_field, flat=True).distinct()
+        )
+    return sorted(active)
+
+
+def write_scores(user_ids, scores, current, chunk_size=CHUNK_SIZE):
+    """bulk_update the users whose score changed, ``chunk_size`` at a time. Returns rows written."""
+    changed = [
+        User(id=int(user_id), engagement_score=int(score))
+        for user_id, score, old in zip(user_ids, scores, current)
+        if score != old
+    ]
+    for start in range(0, len(changed), chunk_size):
+        User.objects.bulk_update(changed[start:start + chunk_size], ['engagement_score'])
+    return len(changed)
+
+
+def run(incremental=False, chunk_size=CHUNK_SIZE, stdout=None):
+    """
+    Score users and store the results. An incremental run falls back to a full
+    one when there is no previous run. Returns the EngagementScoreRun.
+    """
+    import numpy as np
+
+    started = timezone.now()
+    timer = Timer(stdout)
+    previous = EngagementScoreRun.objects.filter(finished_at__isnull=False).first()
+    mode = 'incremental' if incremental and previous else 'full'
+
+    with timer.stage('load users'):
+        if mode == 'incremental':
+            ids = active_user_ids(previous.started_at)
+            users = User.objects.filter(id__in=ids) if ids else User.objects.none()
+        else:
+            users = User.objects.all()
+        rows = list(users.order_by('id').values_list('id', 'engagement_score'))
+        user_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        current = np.array([row[1] for row in rows], dtype=np.int64)
+
+    scores = np.zeros(0, dtype=np.int64)
+    if len(user_ids):
+        scores = compute_scores(user_ids, now=started, timer=timer)
+    with timer.stage('write'):
+        updated = write_scores(user_ids, scores, current, chunk_size)
+
+    return EngagementScoreRun.objects.create(
+        mode=mode,
+        started_at=started,
+        finished_at=timezone.now(),
+        users_scored=len(user_ids),
+        users_updated=updated,
+        timings={name: round(seconds, 4) for name, seconds in timer.timings.items()},
+    )
@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from dashboard.stats import BATCH_SIZE, rebuild_all
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-user dashboard counters (UserStats) from the source tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--user', action='append', dest='usernames', help="Only rebuild these users (repeatable).")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        written = rebuild_all(users.values_list('id', flat=True).iterator(), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {written} users."))
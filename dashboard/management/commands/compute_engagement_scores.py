@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.engagement import CHUNK_SIZE, run
+
+
+class Command(BaseCommand):
+    help = "Recompute users' engagement scores from their recent activity, printing the time taken per stage."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help="Only rescore users with activity since the last run.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Users written per bulk_update.")
+
+    def handle(self, *args, **options):
+        result = run(incremental=options['incremental'], chunk_size=options['chunk_size'], stdout=self.stdout)
+        total = sum(result.timings.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.get_mode_display()} run scored {result.users_scored} users, "
+            f"updated {result.users_updated}, in {total:.3f}s."
+        ))
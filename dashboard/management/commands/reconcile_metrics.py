@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.metrics import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recompute the report metric counters from scratch, report any drift and correct it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without fixing it.")
+
+    def handle(self, *args, **options):
+        drift = reconcile(fix=not options['dry_run'])
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Report metrics are in sync."))
+            return
+        for dimension, key, stored, actual in drift:
+            self.stdout.write(f"{dimension}={key or '-'}: stored {stored}, actual {actual} ({actual - stored:+d})")
+        verb = "Found" if options['dry_run'] else "Fixed"
+        self.stdout.write(self.style.WARNING(f"{verb} {len(drift)} drifted counters."))
@@ -0,0 +1,156 @@
+"""
+Platform metrics for the admin overview and analytics pages.
+
+Report totals are kept as running counters in ReportMetric, adjusted in the
+same transaction as each report create/update/delete, and the assembled page
+payload is cached (``PLATFORM_METRICS_CACHE_TTL``) and dropped whenever a
+counter moves. There is no grand-total row for every write to lock: the total
+is the sum of the status counters. ``reconcile`` recomputes everything from
+the reports table.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from reports.models import Report
+from users.models import GovernmentAdmin
+from .models import ReportMetric
+
+User = get_user_model()
+
+CACHE_KEY = 'dashboard:platform_metrics'
+# ReportMetric dimension -> Report field it counts
+DIMENSION_FIELDS = {
+    'status': 'status',
+    'category': 'category',
+    'priority': 'priority',
+    'department': 'assigned_department_id',
+}
+
+
+def _cache_ttl():
+    return getattr(settings, 'PLATFORM_METRICS_CACHE_TTL', 300)
+
+
+def report_keys(values):
+    """
+    The (dimension, key) counters one report contributes to. ``values`` is a
+    Report or a dict with the report's field values.
+    """
+    get = values.get if isinstance(values, dict) else lambda name: getattr(values, name)
+    keys = []
+    for dimension, field in DIMENSION_FIELDS.items():
+        value = get(field)
+        keys.append((dimension, '' if value is None else str(value)))
+    created_at = get('created_at')
+    if created_at is not None:
+        keys.append(('day', timezone.localtime(created_at).date().isoformat()))
+    return keys
+
+
+def apply_deltas(deltas):
+    """
+    Add ``deltas`` ({(dimension, key): change}) to the stored counters with a
+    single upsert, creating missing rows, and invalidate the cached page
+    payload once the transaction commits.
+    """
+    deltas = {key: change for key, change in deltas.items() if change}
+    if not deltas:
+        return
+    table = connection.ops.quote_name(ReportMetric._meta.db_table)
+    # Both supported databases (SQLite, PostgreSQL) speak ON CONFLICT. Rows are
+    # written in key order so concurrent upserts lock them in the same order.
+    rows = ', '.join(['(%s, %s, %s)'] * len(deltas))
+    params = [value for (dimension, key), change in sorted(deltas.items()) for value in (dimension, key, change)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ("dimension", "key", "count") VALUES {rows} '
+            f'ON CONFLICT ("dimension", "key") DO UPDATE SET "count" = {table}."count" + excluded."count"',
+            params,
+        )
+    transaction.on_commit(invalidate)
+
+
+def record_change(before, after):
+    """Move one report's contribution from ``before`` to ``after`` (either may be None)."""
+    deltas = Counter()
+    if before is not None:
+        deltas.subtract(report_keys(before))
+    if after is not None:
+        deltas.update(report_keys(after))
+    apply_deltas(deltas)
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
+
+
+def _counters():
+    grouped = {}
+    for dimension, key, count in ReportMetric.objects.values_list('dimension', 'key', 'count'):
+        grouped.setdefault(dimension, {})[key] = count
+    return grouped
+
+
+def get_platform_metrics():
+    """Return the cached overview/analytics payload, rebuilding it from the counters on a miss."""
+    metrics = cache.get(CACHE_KEY)
+    if metrics is None:
+        counters = _counters()
+        metrics = {
+            'total_reports': sum(counters.get('status', {}).values()),
+            'by_status': counters.get('status', {}),
+            'by_category': counters.get('category', {}),
+            'by_priority': counters.get('priority', {}),
+            'by_department': counters.get('department', {}),
+            'by_day': dict(sorted(counters.get('day', {}).items())),
+            'total_users': User.objects.count(),
+            'active_departments': GovernmentAdmin.objects.filter(is_active=True).count(),
+        }
+        cache.set(CACHE_KEY, metrics, _cache_ttl())
+    return metrics
+
+
+def compute_from_scratch():
+    """Recount every counter from the reports table with one GROUP BY per dimension."""
+    counts = {}
+    for dimension, field in DIMENSION_FIELDS.items():
+        for value, count in Report.objects.order_by().values_list(field).annotate(n=Count('id')):
+            counts[(dimension, '' if value is None else str(value))] = count
+    days = (
+        Report.objects.order_by().annotate(day=TruncDate('created_at'))
+        .values_list('day').annotate(n=Count('id'))
+    )
+    for day, count in days:
+        counts[('day', day.isoformat())] = count
+    return counts
+
+
+def reconcile(fix=True):
+    """
+    Compare the stored counters with a fresh recount. Returns a list of
+    ``(dimension, key, stored, actual)`` for every counter that drifted, and
+    overwrites the stored values when ``fix`` is true.
+    """
+    actual = compute_from_scratch()
+    stored = {
+        (dimension, key): count
+        for dimension, key, count in ReportMetric.objects.values_list('dimension', 'key', 'count')
+    }
+    drift = [
+        (dimension, key, stored.get((dimension, key), 0), actual.get((dimension, key), 0))
+        for dimension, key in sorted(set(actual) | set(stored))
+        if stored.get((dimension, key), 0) != actual.get((dimension, key), 0)
+    ]
+    if fix and drift:
+        with transaction.atomic():
+            for dimension, key, _, count in drift:
+                ReportMetric.objects.update_or_create(dimension=dimension, key=key, defaults={'count': count})
+            transaction.on_commit(invalidate)
+    return drift
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:44
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_report_metrics(apps, schema_editor):
+    Report = apps.get_model('reports', 'Report')
+    ReportMetric = apps.get_model('dashboard', 'ReportMetric')
+    counts = {('total', ''): Report.objects.count()}
+    fields = {
+        'status': 'status',
+        'category': 'category',
+        'priority': 'priority',
+        'department': 'assigned_department_id',
+    }
+    for dimension, field in fields.items():
+        for value, count in Report.objects.order_by().values_list(field).annotate(n=Count('id')):
+            counts[(dimension, '' if value is None else str(value))] = count
+    days = Report.objects.order_by().annotate(day=TruncDate('created_at')).values_list('day').annotate(n=Count('id'))
+    for day, count in days:
+        counts[('day', day.isoformat())] = count
+    ReportMetric.objects.bulk_create([
+        ReportMetric(dimension=dimension, key=key, count=count)
+        for (dimension, key), count in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+        ('reports', '0006_report_queue_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('key', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'key'), name='unique_report_metric')],
+            },
+        ),
+        migrations.RunPython(backfill_report_metrics, migrations.RunPython.noop),
+    ]
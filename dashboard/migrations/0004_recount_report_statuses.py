@@ -0,0 +1,49 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# UserStats column -> Report.status key
+STATUS_FIELDS = {
+    'reports_pending': 'pending',
+    'reports_under_review': 'under_review',
+    'reports_resolved': 'resolved',
+    'reports_rejected': 'rejected',
+}
+
+
+def recount_report_statuses(apps, schema_editor):
+    """
+    Reports saved with status labels weren't counted under any status. Now that
+    reports 0008 has rewritten them to keys, recount the status counters.
+    """
+    Report = apps.get_model('reports', 'Report')
+    ReportMetric = apps.get_model('dashboard', 'ReportMetric')
+    UserStats = apps.get_model('dashboard', 'UserStats')
+
+    ReportMetric.objects.filter(dimension='status').delete()
+    ReportMetric.objects.bulk_create([
+        ReportMetric(dimension='status', key=status, count=count)
+        for status, count in Report.objects.order_by().values_list('status').annotate(n=Count('id'))
+    ])
+
+    def per_user(status):
+        return Subquery(
+            Report.objects.filter(user_id=OuterRef('user_id'), status=status)
+            .order_by().values('user_id').annotate(n=Count('id')).values('n')
+        )
+
+    UserStats.objects.update(**{
+        field: Coalesce(per_user(status), Value(0)) for field, status in STATUS_FIELDS.items()
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_engagementscorerun'),
+        ('reports', '0008_report_status_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_report_statuses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def drop_total_metric(apps, schema_editor):
+    """The report total is now the sum of the status counters."""
+    ReportMetric = apps.get_model('dashboard', 'ReportMetric')
+    ReportMetric.objects.filter(dimension='total').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_recount_report_statuses'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_total_metric, migrations.RunPython.noop),
+    ]
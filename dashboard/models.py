@@ -1,3 +1,70 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class UserStats(models.Model):
+    """
+    Per-user counters shown on the citizen dashboard, kept current by the
+    signal handlers in dashboard/signals.py so the page reads one row instead
+    of counting across several tables on every hit.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='stats')
+    reports_submitted = models.PositiveIntegerField(default=0)
+    reports_pending = models.PositiveIntegerField(default=0)
+    reports_under_review = models.PositiveIntegerField(default=0)
+    reports_resolved = models.PositiveIntegerField(default=0)
+    reports_rejected = models.PositiveIntegerField(default=0)
+    posts_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    unread_notifications_count = models.PositiveIntegerField(default=0)
+    conversations_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'user stats'
+
+    def __str__(self):
+        return f"Stats for {self.user}"
+
+
+class ReportMetric(models.Model):
+    """
+    Running report totals for the admin overview and analytics pages, one row
+    per (dimension, key): e.g. ('status', 'resolved'), ('department', '3'),
+    ('day', '2024-12-07'). Maintained by dashboard/metrics.py.
+    """
+    dimension = models.CharField(max_length=20)
+    key = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='unique_report_metric')
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}={self.key}: {self.count}"
+
+
+class EngagementScoreRun(models.Model):
+    """
+    One run of the engagement scoring pipeline (dashboard/engagement.py).
+    Incremental runs rescore only users active since the last run started.
+    """
+    MODE_CHOICES = [
+        ('full', 'Full'),
+        ('incremental', 'Incremental'),
+    ]
+
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    users_scored = models.PositiveIntegerField(default=0)
+    users_updated = models.PositiveIntegerField(default=0)
+    timings = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.get_mode_display()} engagement run at {self.started_at:%Y-%m-%d %H:%M}"
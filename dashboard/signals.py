@@ -0,0 +1,161 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from forum.models import Comment, Conversation, Notification, Post
+from forum.notifications import notifications_delivered, notifications_read
+from reports.models import Report
+from reports.signals import reports_bulk_changed
+from users.models import GovernmentAdmin
+from . import metrics, stats
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Report)
+@receiver(post_delete, sender=Report)
+def update_report_stats(sender, instance, **kwargs):
+    stats.refresh_report_stats([instance.user_id])
+
+
+@receiver(reports_bulk_changed)
+def update_bulk_report_stats(sender, changes, **kwargs):
+    stats.refresh_report_stats(sorted({after['user_id'] for _, after in changes}))
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    stats.bump(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, 'comments_count', 1)
+
+
+@receiver(pre_delete, sender=Post)
+def count_deleted_post_comments(sender, instance, origin=None, **kwargs):
+    if origin is instance:
+        stats.subtract_post_comments(instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    if isinstance(kwargs.get('origin'), Post):
+        return  # counted by count_deleted_post_comments
+    stats.bump(instance.author_id, 'comments_count', -1)
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def update_unread_notifications(sender, instance, **kwargs):
+    stats.refresh_unread_notifications([instance.user_id])
+
+
+@receiver(notifications_delivered)
+def count_delivered_notifications(sender, counts, **kwargs):
+    stats.add_unread_notifications(counts)
+
+
+@receiver(notifications_read)
+def count_read_notifications(sender, user_id, marked, **kwargs):
+    stats.bump(user_id, 'unread_notifications_count', -marked)
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def update_conversation_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove'):
+        return
+    delta = 1 if action == 'post_add' else -1
+    # Forward: instance is the Conversation and pk_set holds user ids.
+    # Reverse: instance is the user and pk_set holds conversation ids.
+    if reverse:
+        stats.bump(instance.pk, 'conversations_count', delta * len(pk_set))
+    else:
+        for user_id in pk_set:
+            stats.bump(user_id, 'conversations_count', delta)
+
+
+# --- Platform metrics ---
+
+def _metric_values(instance):
+    # Deferred fields aren't in __dict__ and so are left out.
+    return {
+        field: instance.__dict__[field]
+        for field in metrics.DIMENSION_FIELDS.values() if field in instance.__dict__
+    }
+
+
+def _metrics_unchanged(instance, update_fields):
+    """Whether this save of a loaded report leaves every counted field as it was loaded."""
+    if instance._state.adding:
+        return False
+    counted = set(metrics.DIMENSION_FIELDS.values())
+    if update_fields is not None:
+        saved = {Report._meta.get_field(name).attname for name in update_fields}
+        if not counted & saved:
+            return True
+    loaded = getattr(instance, '_metrics_loaded', None)
+    return loaded is not None and len(loaded) == len(counted) and _metric_values(instance) == loaded
+
+
+@receiver(post_init, sender=Report)
+def snapshot_report_metrics(sender, instance, **kwargs):
+    instance._metrics_loaded = _metric_values(instance)
+
+
+@receiver(pre_save, sender=Report)
+def remember_report_metrics(sender, instance, update_fields=None, **kwargs):
+    instance._metrics_before = None
+    instance._metrics_unchanged = _metrics_unchanged(instance, update_fields)
+    if instance.pk and not instance._metrics_unchanged:
+        # Read the stored row rather than trusting the loaded values, which may be stale.
+        instance._metrics_before = (
+            Report.objects.filter(pk=instance.pk)
+            .values(*metrics.DIMENSION_FIELDS.values(), 'created_at')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Report)
+def update_report_metrics(sender, instance, **kwargs):
+    if not instance._metrics_unchanged:
+        metrics.record_change(instance._metrics_before, instance)
+    instance._metrics_loaded = _metric_values(instance)
+
+
+@receiver(reports_bulk_changed)
+def update_bulk_report_metrics(sender, changes, **kwargs):
+    deltas = Counter()
+    for before, after in changes:
+        deltas.subtract(metrics.report_keys(before))
+        deltas.update(metrics.report_keys(after))
+    metrics.apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=Report)
+def remove_report_metrics(sender, instance, **kwargs):
+    metrics.record_change(instance, None)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_total(sender, created, **kwargs):
+    # Ignore routine saves such as the last_login update on every sign-in.
+    if created:
+        metrics.invalidate()
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=GovernmentAdmin)
+@receiver(post_delete, sender=GovernmentAdmin)
+def invalidate_platform_metrics(sender, **kwargs):
+    metrics.invalidate()
@@ -0,0 +1,155 @@
+from collections import defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from forum.models import Comment, Conversation, Notification, Post
+from reports.models import Report
+from .models import UserStats
+
+# Report.status key -> UserStats column
+REPORT_STATUS_FIELDS = {
+    'pending': 'reports_pending',
+    'under_review': 'reports_under_review',
+    'resolved': 'reports_resolved',
+    'rejected': 'reports_rejected',
+}
+REPORT_FIELDS = ['reports_submitted', *REPORT_STATUS_FIELDS.values()]
+STATS_FIELDS = REPORT_FIELDS + [
+    'posts_count', 'comments_count', 'unread_notifications_count', 'conversations_count',
+]
+BATCH_SIZE = 1000
+
+
+def _report_counts(user_ids):
+    counts = defaultdict(lambda: dict.fromkeys(REPORT_FIELDS, 0))
+    rows = (
+        Report.objects.filter(user_id__in=user_ids)
+        .order_by().values_list('user_id', 'status').annotate(total=Count('id'))
+    )
+    for user_id, status, total in rows:
+        counts[user_id]['reports_submitted'] += total
+        field = REPORT_STATUS_FIELDS.get(status)
+        if field:
+            counts[user_id][field] += total
+    return counts
+
+
+def _unread_counts(user_ids):
+    return dict(
+        Notification.objects.filter(user_id__in=user_ids, is_read=False)
+        .order_by().values_list('user_id').annotate(total=Count('id'))
+    )
+
+
+def compute_stats(user_ids):
+    """Count everything for ``user_ids`` from scratch with one grouped query per table."""
+    user_ids = list(user_ids)
+    reports = _report_counts(user_ids)
+    posts = dict(
+        Post.objects.filter(author_id__in=user_ids)
+        .order_by().values_list('author_id').annotate(total=Count('id'))
+    )
+    comments = dict(
+        Comment.objects.filter(author_id__in=user_ids)
+        .order_by().values_list('author_id').annotate(total=Count('id'))
+    )
+    unread = _unread_counts(user_ids)
+    conversations = dict(
+        Conversation.participants.through.objects.filter(user_id__in=user_ids)
+        .order_by().values_list('user_id').annotate(total=Count('id'))
+    )
+    return {
+        user_id: {
+            **(reports[user_id] if user_id in reports else dict.fromkeys(REPORT_FIELDS, 0)),
+            'posts_count': posts.get(user_id, 0),
+            'comments_count': comments.get(user_id, 0),
+            'unread_notifications_count': unread.get(user_id, 0),
+            'conversations_count': conversations.get(user_id, 0),
+        }
+        for user_id in user_ids
+    }
+
+
+def get_user_stats(user):
+    """Return ``user``'s UserStats row, computing it the first time it is needed."""
+    stats = UserStats.objects.filter(user=user).first()
+    if stats is None:
+        stats, _ = UserStats.objects.get_or_create(user=user, defaults=compute_stats([user.id])[user.id])
+    return stats
+
+
+def bump(user_id, field, delta):
+    """
+    Apply a +/- ``delta`` to one counter without reading it first. Counters
+    that drifted low stop at zero instead of failing the unsigned column.
+    """
+    updated = UserStats.objects.filter(user_id=user_id).update(**{field: Greatest(F(field) + delta, 0)})
+    if not updated and delta > 0:
+        # First activity since stats were introduced: build the full row.
+        UserStats.objects.get_or_create(user_id=user_id, defaults=compute_stats([user_id])[user_id])
+
+
+def subtract_post_comments(post_id):
+    """Take a post's comments off their authors' counts in one UPDATE; call before deleting them."""
+    per_author = (
+        Comment.objects.filter(post_id=post_id, author_id=OuterRef('user_id'))
+        .order_by().values('author_id').annotate(total=Count('id')).values('total')
+    )
+    UserStats.objects.filter(
+        user_id__in=Comment.objects.filter(post_id=post_id).values('author_id')
+    ).update(comments_count=Greatest(F('comments_count') - Subquery(per_author), 0))
+
+
+def refresh_report_stats(user_ids):
+    """Recount report totals by status; a status change can't be expressed as a single delta."""
+    counts = _report_counts(user_ids)
+    rows = list(UserStats.objects.filter(user_id__in=user_ids))
+    for row in rows:
+        for field, value in (counts[row.user_id] if row.user_id in counts else dict.fromkeys(REPORT_FIELDS, 0)).items():
+            setattr(row, field, value)
+    UserStats.objects.bulk_update(rows, REPORT_FIELDS, batch_size=BATCH_SIZE)
+
+
+def refresh_unread_notifications(user_ids):
+    unread = _unread_counts(user_ids)
+    for user_id in user_ids:
+        UserStats.objects.filter(user_id=user_id).update(
+            unread_notifications_count=unread.get(user_id, 0)
+        )
+
+
+def add_unread_notifications(counts):
+    """Add bulk-delivered notifications (``{user_id: n}``) with one UPDATE per distinct n."""
+    by_amount = {}
+    for user_id, amount in counts.items():
+        by_amount.setdefault(amount, []).append(user_id)
+    for amount, user_ids in by_amount.items():
+        UserStats.objects.filter(user_id__in=user_ids).update(
+            unread_notifications_count=F('unread_notifications_count') + amount
+        )
+
+
+def rebuild_all(user_ids, batch_size=BATCH_SIZE):
+    """Recompute and upsert stats for ``user_ids`` in batches. Returns the number of rows written."""
+    user_ids = list(user_ids)
+    written = 0
+    for start in range(0, len(user_ids), batch_size):
+        chunk = user_ids[start:start + batch_size]
+        computed = compute_stats(chunk)
+        existing = {stats.user_id: stats for stats in UserStats.objects.filter(user_id__in=chunk)}
+        to_update, to_create = [], []
+        for user_id, values in computed.items():
+            stats = existing.get(user_id)
+            if stats is None:
+                to_create.append(UserStats(user_id=user_id, **values))
+            else:
+                for field, value in values.items():
+                    setattr(stats, field, value)
+                stats.updated_at = timezone.now()
+                to_update.append(stats)
+        UserStats.objects.bulk_create(to_create)
+        UserStats.objects.bulk_update(to_update, STATS_FIELDS + ['updated_at'])
+        written += len(chunk)
+    return written
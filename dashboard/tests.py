@@ -1,3 +1,142 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from forum.models import Comment, Notification, Post
+from forum.notifications import mark_read
+from reports.models import Report
+from users.models import GovernmentAdmin
+from . import engagement, metrics, stats
+from .models import EngagementScoreRun, UserStats
+
+User = get_user_model()
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('citizen', password='pw')
+
+    def setUp(self):
+        # Rows are built lazily on first read; start from one.
+        stats.get_user_stats(self.user)
+
+    def current(self):
+        return UserStats.objects.get(user=self.user)
+
+    def test_counters_follow_activity(self):
+        post = Post.objects.create(author=self.user, title='Park', content='...')
+        Comment.objects.create(post=post, author=self.user, content='First')
+        Comment.objects.create(post=post, author=self.user, content='Second')
+        self.assertEqual((self.current().posts_count, self.current().comments_count), (1, 2))
+        post.delete()
+        self.assertEqual((self.current().posts_count, self.current().comments_count), (0, 0))
+
+    def test_submitted_reports_count_as_pending(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('submit_userreport'), {'title': 'Pothole', 'description': 'Deep one'})
+        row = self.current()
+        self.assertEqual((row.reports_submitted, row.reports_pending), (1, 1))
+        Report.objects.filter(user=self.user).get().delete()
+        self.assertEqual(self.current().reports_pending, 0)
+
+    def test_bump_stops_at_zero(self):
+        stats.bump(self.user.id, 'posts_count', -3)
+        self.assertEqual(self.current().posts_count, 0)
+
+    def test_drifted_unread_count_does_not_fail_mark_read(self):
+        Notification.objects.create(user=self.user, message='Hello')
+        Notification.objects.create(user=self.user, message='Again')
+        UserStats.objects.filter(user=self.user).update(unread_notifications_count=1)
+        self.assertEqual(mark_read(self.user), 2)
+        self.assertEqual(self.current().unread_notifications_count, 0)
+
+    def test_rebuild_matches_counted_values(self):
+        Post.objects.create(author=self.user, title='Park', content='...')
+        UserStats.objects.filter(user=self.user).update(posts_count=7)
+        stats.rebuild_all([self.user.id])
+        self.assertEqual(self.current().posts_count, 1)
+
+
+class ReportMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('citizen', password='pw')
+        cls.admin = User.objects.create_user('admin', is_government_admin=True)
+        cls.department = GovernmentAdmin.objects.create(user=cls.admin, department_name='Roads')
+
+    def assertMatchesRecount(self):
+        self.assertEqual(metrics.reconcile(fix=False), [])
+
+    def test_counters_match_a_recount_through_create_edit_and_delete(self):
+        report = Report.objects.create(user=self.user, title='Pothole', description='Deep one')
+        Report.objects.create(user=self.user, title='Streetlight', description='Out', priority='high')
+        self.assertMatchesRecount()
+
+        report.status = 'under_review'
+        report.assigned_department = self.department
+        report.save()
+        self.assertMatchesRecount()
+        self.assertEqual(metrics.get_platform_metrics()['total_reports'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            report.delete()
+        self.assertMatchesRecount()
+        self.assertEqual(metrics.get_platform_metrics()['by_status'], {'pending': 1, 'under_review': 0})
+
+    def test_saves_that_leave_counted_fields_alone_write_no_metrics(self):
+        report = Report.objects.create(user=self.user, title='Pothole', description='Deep one')
+        report = Report.objects.get(pk=report.pk)
+        report.description = 'Deeper now'
+        with CaptureQueriesContext(connection) as queries:
+            report.save()
+        self.assertFalse([query for query in queries if 'reportmetric' in query['sql']])
+        self.assertMatchesRecount()
+
+    def test_one_statement_writes_every_delta(self):
+        with CaptureQueriesContext(connection) as queries:
+            Report.objects.create(user=self.user, title='Pothole', description='Deep one')
+        self.assertEqual(len([query for query in queries if 'reportmetric' in query['sql']]), 1)
+        self.assertMatchesRecount()
+
+
+class EngagementScoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice')
+        cls.bob = User.objects.create_user('bob')
+        cls.carol = User.objects.create_user('carol')
+        post = Post.objects.create(author=cls.alice, title='Fresh', content='This week')
+        Post.objects.filter(pk=post.pk).update(upvote_count=2)
+        Comment.objects.create(post=post, author=cls.alice, content='Bump')
+        old = Post.objects.create(author=cls.bob, title='Older', content='Last month')
+        ancient = Post.objects.create(author=cls.bob, title='Ancient', content='Years ago')
+        now = timezone.now()
+        Post.objects.filter(pk=old.pk).update(created_at=now - timedelta(days=20))
+        Post.objects.filter(pk=ancient.pk).update(created_at=now - timedelta(days=400))
+
+    def scores(self):
+        return dict(User.objects.filter(pk__in=[self.alice.pk, self.bob.pk, self.carol.pk])
+                    .values_list('username', 'engagement_score'))
+
+    def test_full_run_weights_sources_and_windows(self):
+        run = engagement.run()
+        # alice: post 3 + comment 2 + two upvotes 1 each; bob: post 3 * 0.6, the 400-day-old one not at all.
+        self.assertEqual(self.scores(), {'alice': 7, 'bob': 2, 'carol': 0})
+        self.assertEqual((run.mode, run.users_scored, run.users_updated), ('full', 3, 2))
+        self.assertIn('write', run.timings)
+        self.assertEqual(engagement.run().users_updated, 0)
 
-# Create your tests here.
+    def test_incremental_run_rescores_only_recently_active_users(self):
+        self.assertEqual(engagement.run(incremental=True).mode, 'full')
+        User.objects.filter(pk=self.bob.pk).update(engagement_score=99)
+        Comment.objects.create(post=Post.objects.get(title='Fresh'), author=self.carol, content='Me too')
+        run = engagement.run(incremental=True)
+        self.assertEqual((run.mode, run.users_scored, run.users_updated), ('incremental', 1, 1))
+        self.assertEqual(self.scores(), {'alice': 7, 'bob': 99, 'carol': 2})
+        self.assertEqual(EngagementScoreRun.objects.count(), 2)
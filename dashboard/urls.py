@@ -15,6 +15,7 @@ urlpatterns = [
     path('manage-reports/', views.manage_reports, name='manage_reports'),
     path('assign-report/<int:report_id>/<int:department_id>/', views.assign_report_to_department, name='assign_report_to_department'),
     path('export-reports/', views.export_reports_to_csv, name='export_reports_to_csv'),
+    path('reports/bulk/', views.bulk_update_reports, name='bulk_update_reports'),
 
     # Citizen and Profile Management Views
     path('manage-citizens/', views.manage_citizens, name='manage_citizens'),
@@ -29,4 +30,5 @@ urlpatterns = [
 
     # Custom Analytics View
     path('analytics/', views.analytics_view, name='analytics_view'),
+    path('cache-stats/', views.cache_stats_view, name='cache_stats'),
 ]
@@ -1,21 +1,25 @@
-from forum.models import Post, Comment, Notification, Conversation
-from reports.models import Report
-from users.models import Profile
-from django.contrib.auth import get_user_model
+import json
+
 from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
+from django.shortcuts import render, get_object_or_404, redirect
+from django.views.decorators.http import require_POST
 
-from forum.models import Post, Comment, Notification, Conversation, Poll, Feedback
+from forum.models import Notification, Conversation, Poll, Feedback
 from reports.models import Report
-from users.models import Profile,GovernmentAdmin
+from users.models import Profile, GovernmentAdmin
+from users.recommendations import suggestions_for
+from reports.pagination import keyset_paginate
+from reports.exports import stream_reports_from_request
+from reports.bulk import bulk_assign, bulk_transition
+from dashboard.stats import get_user_stats
+from dashboard.metrics import get_platform_metrics
+from PublicBridge.caching import cache_stats
 
 User = get_user_model()
 
-from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponse
-from django.db.models import Count
-from django.contrib.auth.decorators import login_required
-import csv
-
 
 # ------------------------
 # Dashboard Overview
@@ -23,16 +27,13 @@ import csv
 
 @login_required
 def dashboard_overview(request):
-    total_reports = Report.objects.count()
-    resolved_reports = Report.objects.filter(status='resolved').count()
-    total_users = Profile.objects.count()
-    active_departments = GovernmentAdmin.objects.filter(is_active=True).count()
+    metrics = get_platform_metrics()
 
     context = {
-        'total_reports': total_reports,
-        'resolved_reports': resolved_reports,
-        'total_users': total_users,
-        'active_departments': active_departments,
+        'total_reports': metrics['total_reports'],
+        'resolved_reports': metrics['by_status'].get('resolved', 0),
+        'total_users': metrics['total_users'],
+        'active_departments': metrics['active_departments'],
     }
     return render(request, 'admin_dashboard/overview.html', context)
 
@@ -59,41 +60,112 @@ def toggle_department_status(request, department_id):
 # Report Management Views
 # ------------------------
 
+REPORT_QUEUE_PAGE_SIZE = 50
+
+
 @login_required
 def manage_reports(request):
-    reports = Report.objects.all()
-    return render(request, 'admin_dashboard/manage_reports.html', {'reports': reports})
+    reports = Report.objects.select_related('user', 'assigned_department__user')
+
+    # Server-side filters; unknown values are ignored rather than matching nothing.
+    filters = {}
+    for field, choices in (
+        ('status', Report.STATUS_CHOICES),
+        ('priority', Report.PRIORITY_CHOICES),
+        ('category', Report.CATEGORY_CHOICES),
+    ):
+        value = request.GET.get(field)
+        if value in dict(choices):
+            filters[field] = value
+    department = request.GET.get('department')
+    if department and department.isdigit():
+        filters['assigned_department_id'] = int(department)
+    reports = reports.filter(**filters)
+
+    reports, next_cursor = keyset_paginate(
+        reports, request.GET.get('cursor'), REPORT_QUEUE_PAGE_SIZE
+    )
+
+    # Carry the active filters over into the "next page" link.
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    filter_query = query.urlencode()
+    if next_cursor:
+        query['cursor'] = next_cursor
+
+    context = {
+        'reports': reports,
+        'next_page_query': query.urlencode() if next_cursor else None,
+        'filter_query': filter_query,
+        'is_first_page': not request.GET.get('cursor'),
+        'departments': GovernmentAdmin.objects.only('id', 'department_name').order_by('department_name'),
+        'status_choices': Report.STATUS_CHOICES,
+        'priority_choices': Report.PRIORITY_CHOICES,
+        'category_choices': Report.CATEGORY_CHOICES,
+        'current': request.GET,
+    }
+    return render(request, 'admin_dashboard/manage_reports.html', context)
 
 
 @login_required
+@require_POST
 def assign_report_to_department(request, report_id, department_id):
+    if not (request.user.is_staff or request.user.is_government_admin):
+        raise PermissionDenied
     report = get_object_or_404(Report, id=report_id)
     department = get_object_or_404(GovernmentAdmin, id=department_id)
-    report.assigned_department = department
-    report.status = 'under_review'
-    report.save()
+    bulk_assign([report.id], department, actor=request.user)
     return redirect('manage_reports')
 
 
+MAX_BULK_REPORT_IDS = 10000
+
+
+@login_required
+@require_POST
+def bulk_update_reports(request):
+    """
+    JSON triage endpoint. Body: {"ids": [...], "action": "assign", "department_id": N}
+    or {"ids": [...], "action": "transition", "status": "<status key>"}.
+    """
+    if not (request.user.is_staff or request.user.is_government_admin):
+        return JsonResponse({'status': 'error', 'message': 'Permission denied.'}, status=403)
+    try:
+        payload = json.loads(request.body)
+        ids = [int(pk) for pk in payload.get('ids', [])]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'status': 'error', 'message': 'Expected a JSON object with a list of integer ids.'}, status=400)
+    if len(ids) > MAX_BULK_REPORT_IDS:
+        return JsonResponse({'status': 'error', 'message': f'At most {MAX_BULK_REPORT_IDS} ids per call.'}, status=400)
+
+    action = payload.get('action')
+    if action == 'assign':
+        department = GovernmentAdmin.objects.filter(id=payload.get('department_id')).first()
+        if department is None:
+            return JsonResponse({'status': 'error', 'message': 'Unknown department.'}, status=400)
+        result = bulk_assign(ids, department, actor=request.user)
+    elif action == 'transition':
+        if payload.get('status') not in dict(Report.STATUS_CHOICES):
+            return JsonResponse({'status': 'error', 'message': 'Unknown status.'}, status=400)
+        result = bulk_transition(ids, payload['status'], actor=request.user)
+    else:
+        return JsonResponse({'status': 'error', 'message': 'Unknown action.'}, status=400)
+    return JsonResponse({'status': 'success', **result.as_dict()})
+
+
+@login_required
+def cache_stats_view(request):
+    """Cache hit/miss counters, for this worker process and across all of them."""
+    if not request.user.is_staff:
+        return JsonResponse({'status': 'error', 'message': 'Permission denied.'}, status=403)
+    return JsonResponse({'status': 'success', **cache_stats()})
+
+
 @login_required
 def export_reports_to_csv(request):
-    reports = Report.objects.all()
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="reports.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(['Title', 'User', 'Status', 'Category', 'Priority', 'Created At', 'Updated At'])
-    for report in reports:
-        writer.writerow([
-            report.title,
-            report.user.username if report.user else "Anonymous",
-            report.status,
-            report.category,
-            getattr(report, 'priority', 'N/A'),
-            report.created_at,
-            report.updated_at,
-        ])
-    return response
+    # Accepts ?format=csv|ndjson, ?compress=gzip, ?status=, ?date_from=, ?date_to=,
+    # and ?after=<last id>&limit=<rows> for resumable, chunked downloads.
+    return stream_reports_from_request(request)
 
 
 # ------------------------
@@ -102,10 +174,7 @@ def export_reports_to_csv(request):
 
 @login_required
 def manage_citizens(request):
-    profiles = Profile.objects.annotate(
-        followers_count=Count('followers'),
-        following_count=Count('following')
-    )
+    profiles = Profile.objects.select_related('user')
     return render(request, 'admin_dashboard/manage_citizens.html', {'profiles': profiles})
 
 
@@ -115,7 +184,7 @@ def manage_citizens(request):
 
 @login_required
 def manage_polls(request):
-    polls = Poll.objects.all()
+    polls = Poll.objects.select_related('department')
     return render(request, 'admin_dashboard/manage_polls.html', {'polls': polls})
 
 
@@ -129,9 +198,15 @@ def manage_feedback(request):
 # Notifications and Messages Views
 # ------------------------
 
+MANAGE_NOTIFICATIONS_LIMIT = 200
+
+
 @login_required
 def manage_notifications(request):
-    notifications = Notification.objects.filter(is_read=False)
+    notifications = (
+        Notification.objects.filter(is_read=False).select_related('user')
+        .order_by('-created_at')[:MANAGE_NOTIFICATIONS_LIMIT]
+    )
     return render(request, 'admin_dashboard/manage_notifications.html', {'notifications': notifications})
 
 
@@ -145,12 +220,32 @@ def manage_messages(request):
 # Custom Analytics
 # ------------------------
 
+ANALYTICS_DAYS = 30
+
+
 @login_required
 def analytics_view(request):
-    reports_by_status = Report.objects.values('status').annotate(count=Count('id'))
-    departments_activity = GovernmentAdmin.objects.annotate(report_count=Count('report')).order_by('-report_count')
+    metrics = get_platform_metrics()
+    status_labels = dict(Report.STATUS_CHOICES)
+    reports_by_status = [
+        {'status': status, 'label': status_labels.get(status, status), 'count': count}
+        for status, count in metrics['by_status'].items()
+        if count
+    ]
+    department_counts = metrics['by_department']
+    departments_activity = sorted(
+        GovernmentAdmin.objects.only('id', 'department_name', 'is_active'),
+        key=lambda department: department_counts.get(str(department.id), 0),
+        reverse=True,
+    )
+    for department in departments_activity:
+        department.report_count = department_counts.get(str(department.id), 0)
     context = {
         'reports_by_status': reports_by_status,
+        'reports_by_category': metrics['by_category'],
+        'reports_by_priority': metrics['by_priority'],
+        'reports_by_day': dict(list(metrics['by_day'].items())[-ANALYTICS_DAYS:]),
+        'unassigned_reports': department_counts.get('', 0),
         'departments_activity': departments_activity,
     }
     return render(request, 'admin_dashboard/analytics.html', context)
@@ -158,46 +253,29 @@ def analytics_view(request):
 
 @login_required
 def dashboard(request):
-    # User-related statistics
-    user_profile = Profile.objects.get(user=request.user)
-
-    # User's reports statistics
-    user_reports = Report.objects.filter(user=request.user)
-    reports_submitted = user_reports.count()
-    reports_under_review = user_reports.filter(status='Under Review').count()
-    reports_resolved = user_reports.filter(status='Resolved').count()
+    # All counters come from the user's precomputed UserStats row.
+    stats = get_user_stats(request.user)
 
     # Recent reports
-    recent_reports = user_reports.order_by('-created_at')[:5]
-
-    # User's posts and interactions
-    user_posts = Post.objects.filter(author=request.user)
-    posts_count = user_posts.count()
-    comments_count = Comment.objects.filter(author=request.user).count()
+    recent_reports = Report.objects.filter(user=request.user).order_by('-created_at')[:5]
 
-    # User's notifications (unread notifications)
+    # Querysets below are lazy: they only hit the database if the template renders them.
     notifications = Notification.objects.filter(user=request.user, is_read=False).order_by('-created_at')[:5]
-    unread_notifications_count = notifications.count()
-
-    # Conversations the user is involved in
     conversations = Conversation.objects.filter(participants=request.user).order_by('-last_updated')[:5]
-    conversations_count = conversations.count()
-
-    # Suggested users for following
-    suggested_users = User.objects.exclude(id=request.user.id).exclude(id__in=user_profile.following.all()).order_by('date_joined')[:5]
+    suggested_users = suggestions_for(request.user)
 
     # Context data to pass to the template
     context = {
         'user': request.user,
-        'user_profile': user_profile,
-        'reports_submitted': reports_submitted,
-        'reports_under_review': reports_under_review,
-        'reports_resolved': reports_resolved,
+        'stats': stats,
+        'reports_submitted': stats.reports_submitted,
+        'reports_under_review': stats.reports_under_review,
+        'reports_resolved': stats.reports_resolved,
         'recent_reports': recent_reports,
-        'posts_count': posts_count,
-        'comments_count': comments_count,
-        'unread_notifications_count': unread_notifications_count,
-        'conversations_count': conversations_count,
+        'posts_count': stats.posts_count,
+        'comments_count': stats.comments_count,
+        'unread_notifications_count': stats.unread_notifications_count,
+        'conversations_count': stats.conversations_count,
         'conversations': conversations,
         'notifications': notifications,
         'suggested_users': suggested_users,
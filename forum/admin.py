@@ -1,23 +1,26 @@
 from django.contrib import admin
 from .models import (
-    Post, Comment, Conversation, Message, Notification,
+    Post, Comment, Conversation, Message, Notification, NotificationOutbox,
     ProjectUpdate, Poll, PollOption, GovernmentNotification, DepartmentPost, Feedback
 )
+from search.mixins import FullTextSearchAdminMixin
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'author', 'created_at', 'vote_count')
     list_filter = ('created_at',)
     search_fields = ('title', 'content', 'author__username')
+    search_kind = 'post'
     raw_id_fields = ('author', 'upvotes', 'downvotes', 'shared_by')
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
     list_display = ('content', 'author', 'post', 'created_at', 'vote_count', 'is_parent')
     list_filter = ('created_at',)
     search_fields = ('content', 'author__username', 'post__title')
+    search_kind = 'comment'
     raw_id_fields = ('author', 'post', 'parent_comment', 'upvotes', 'downvotes')
 
 
@@ -44,6 +47,17 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ('message', 'user', 'is_read', 'created_at')
     list_filter = ('is_read', 'created_at')
     search_fields = ('message', 'user__username')
+    ordering = ('-created_at',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('message', 'kind', 'recipient', 'event_count', 'status', 'delivered', 'attempts', 'available_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('message', 'recipient__username', 'coalesce_key')
+    raw_id_fields = ('recipient', 'actor', 'broadcast')
+    readonly_fields = ('cursor', 'delivered', 'attempts', 'last_error', 'locked_until', 'created_at', 'processed_at')
 
 
 @admin.register(ProjectUpdate)
@@ -73,10 +87,11 @@ class GovernmentNotificationAdmin(admin.ModelAdmin):
 
 
 @admin.register(DepartmentPost)
-class DepartmentPostAdmin(admin.ModelAdmin):
+class DepartmentPostAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'author', 'department', 'category', 'created_at')
     list_filter = ('category', 'created_at')
     search_fields = ('title', 'content', 'author__username', 'department__department_name')
+    search_kind = 'department_post'
 
 
 @admin.register(Feedback)
@@ -5,5 +5,5 @@ class ForumConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'forum'
 
-def ready(self):
-    import forum.signals
\ No newline at end of file
+    def ready(self):
+        import forum.signals  # Import signals here
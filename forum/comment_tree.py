@@ -0,0 +1,135 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from PublicBridge.caching import bump_generation, generation
+from reports.pagination import keyset_paginate
+
+from .models import Comment
+
+THREADS_PER_PAGE = 20
+# Replies deeper than this (relative to where loading started) are left for
+# the "load more replies" request instead of being rendered up front.
+MAX_INLINE_DEPTH = 4
+# At most this many replies per thread are rendered up front, and per
+# "load more replies" request.
+MAX_INLINE_REPLIES = 50
+
+
+def threads_version(post_id):
+    """Cache version of ``post_id``'s comment threads; moves whenever one of its comments changes."""
+    return generation(f'forum.post:{post_id}:comments')
+
+
+def expire_threads(post_id):
+    """Move ``post_id``'s thread version once the current transaction commits."""
+    transaction.on_commit(lambda: bump_generation(f'forum.post:{post_id}:comments'))
+
+
+def _tree_queryset():
+    # Authors come along in the same query; vote totals are stored columns.
+    return Comment.objects.select_related('author').order_by('created_at', 'id')
+
+
+def _first_replies(replies, limit):
+    """
+    The first ``limit`` of ``replies`` in each thread, level by level and
+    oldest first within a level. A parent always comes before its replies,
+    so every reply kept has its parent kept too (or is a direct reply to
+    where loading started).
+    """
+    position = Window(
+        RowNumber(), partition_by=[F('thread_root_id')], order_by=[F('depth').asc(), F('id').asc()]
+    )
+    return list(replies.annotate(position=position).filter(position__lte=limit).order_by('depth', 'id'))
+
+
+def _mark_more_replies(comments):
+    """
+    Flag each of ``comments`` (already nested by build_tree) with
+    ``has_more_replies`` when it has replies that weren't loaded, and set
+    ``replies_after``, the id after which "load more replies" resumes.
+    One grouped COUNT for the whole page.
+    """
+    reply_counts = dict(
+        Comment.objects.filter(parent_comment_id__in=[comment.id for comment in comments])
+        .order_by().values_list('parent_comment_id').annotate(n=Count('id'))
+    )
+    for comment in comments:
+        comment.has_more_replies = reply_counts.get(comment.id, 0) > len(comment.children)
+        comment.replies_after = comment.children[-1].id if comment.children else None
+
+
+def build_tree(comments, root_ids):
+    """
+    Nest a flat list of comments in O(n).
+
+    Every comment gets a ``children`` list in the order it appears in
+    ``comments``; the comments whose ids are in ``root_ids`` are returned, in
+    that order, as the top of the tree.
+    """
+    nodes = {comment.id: comment for comment in comments}
+    roots = set(root_ids)
+    for comment in comments:
+        comment.children = []
+        if not hasattr(comment, 'has_more_replies'):
+            comment.has_more_replies = False
+    for comment in comments:
+        parent = nodes.get(comment.parent_comment_id)
+        if parent is not None and comment.id not in roots:
+            parent.children.append(comment)
+    return [nodes[pk] for pk in root_ids if pk in nodes]
+
+
+def load_post_threads(post, cursor=None, per_page=THREADS_PER_PAGE, max_depth=MAX_INLINE_DEPTH,
+                      max_replies=MAX_INLINE_REPLIES):
+    """
+    Load one page of a post's top-level threads with their replies nested.
+
+    Three queries however large the threads are: a keyset page of top-level
+    comments, then up to ``max_replies`` replies per thread down to
+    ``max_depth``, then the reply counts that say which comments have more.
+    Returns ``(threads, next_cursor)``.
+    """
+    roots, next_cursor = keyset_paginate(
+        _tree_queryset().filter(post=post, depth=0), cursor, per_page
+    )
+    root_ids = [root.id for root in roots]
+    if not root_ids:
+        return [], next_cursor
+    replies = _first_replies(
+        _tree_queryset().filter(thread_root_id__in=root_ids, depth__lte=max_depth), max_replies
+    )
+    comments = roots + replies
+    threads = build_tree(comments, root_ids)
+    _mark_more_replies(comments)
+    return threads, next_cursor
+
+
+def load_subtree(comment, after=None, max_depth=MAX_INLINE_DEPTH, max_replies=MAX_INLINE_REPLIES):
+    """
+    Load the replies below ``comment`` for "load more replies": up to
+    ``max_replies`` of them, ``max_depth`` levels deep, skipping its direct
+    replies up to id ``after`` (and everything below those), which the page
+    already shows. Queries run over its thread's materialized path prefix.
+    Sets ``has_more_replies`` and ``replies_after`` on ``comment`` for the
+    next request.
+    """
+    prefix = comment.descendants_path()
+    descendants = _tree_queryset().filter(
+        thread_root_id=comment.thread_root_id or comment.id,
+        path__startswith=prefix,
+        depth__lte=comment.depth + max_depth,
+    )
+    if after:
+        # Paths below a direct reply start with its zero-padded id, so they sort with it.
+        descendants = descendants.filter(
+            Q(path=prefix, id__gt=after) | Q(path__gte=f'{prefix}{after + 1:010d}/')
+        )
+    comments = [comment] + _first_replies(descendants, max_replies)
+    replies = build_tree(comments, [comment.id])[0].children
+    _mark_more_replies(comments[1:])
+    comment.replies_after = replies[-1].id if replies else after
+    comment.has_more_replies = comment.replies.filter(id__gt=comment.replies_after or 0).exists()
+    return replies
+
@@ -1,15 +1,77 @@
+import asyncio
 import json
+import logging
+
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
 from .models import Message, Conversation
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
+
+CHAT_DEFAULTS = {
+    'FLUSH_INTERVAL_MS': 250,
+    'FLUSH_SIZE': 50,
+    'MAX_MESSAGE_LENGTH': 4000,
+    # Consecutive failed writes before a batch is dropped (and logged).
+    'MAX_FLUSH_ATTEMPTS': 5,
+}
+
+
+def _chat_config():
+    return {**CHAT_DEFAULTS, **getattr(settings, 'FORUM_CHAT', {})}
+
+
+@database_sync_to_async
+def _participant_ids(conversation_id):
+    return set(
+        Conversation.participants.through.objects
+        .filter(conversation_id=conversation_id)
+        .values_list('user_id', flat=True)
+    )
+
+
+@database_sync_to_async
+def _persist(conversation_id, messages):
+    with transaction.atomic():
+        Message.objects.bulk_create(messages)
+        Conversation.objects.filter(id=conversation_id).update(last_updated=timezone.now())
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
+    """
+    Chat for one conversation. Participants are checked once on connect;
+    incoming messages are relayed to the group immediately and written to the
+    database in batches (see ``settings.FORUM_CHAT``), with the conversation's
+    ``last_updated`` touched once per batch. A batch that fails to save is
+    logged and put back in the buffer for the next flush.
+    """
+
     async def connect(self):
         self.conversation_id = self.scope['url_route']['kwargs']['conversation_id']
-        self.conversation = await database_sync_to_async(Conversation.objects.get)(id=self.conversation_id)
-        self.room_group_name = f"chat_{self.conversation.id}"
+        self.user = self.scope.get('user')
+        if self.user is None or not self.user.is_authenticated:
+            await self.close()
+            return
+        if self.user.id not in await _participant_ids(self.conversation_id):
+            await self.close()
+            return
+
+        config = _chat_config()
+        self.flush_interval = config['FLUSH_INTERVAL_MS'] / 1000
+        self.flush_size = config['FLUSH_SIZE']
+        self.max_length = config['MAX_MESSAGE_LENGTH']
+        self.max_flush_attempts = config['MAX_FLUSH_ATTEMPTS']
+        self.buffer = []
+        self.flush_handle = None
+        self.flush_task = None
+        self.failed_flushes = 0
+        self.room_group_name = f"chat_{self.conversation_id}"
 
         # Join room group
         await self.channel_layer.group_add(
@@ -20,6 +82,19 @@ class ChatConsumer(AsyncWebsocketConsumer):
         await self.accept()
 
     async def disconnect(self, close_code):
+        if not hasattr(self, 'room_group_name'):
+            return
+        if self.flush_task is not None:
+            await asyncio.wait([self.flush_task])
+        await self.flush()
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if self.buffer:
+            logger.error(
+                "Dropping %d unsaved chat messages for conversation %s on disconnect.",
+                len(self.buffer), self.conversation_id,
+            )
         # Leave room group
         await self.channel_layer.group_discard(
             self.room_group_name,
@@ -27,17 +102,27 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
 
     # Receive message from WebSocket
-    async def receive(self, text_data):
-        text_data_json = json.loads(text_data)
-        message_content = text_data_json['message']
-        sender = self.scope['user']
-
-        # Save the message to the database
-        message = await database_sync_to_async(Message.objects.create)(
-            conversation=self.conversation,
-            sender=sender,
-            content=message_content
-        )
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            message_content = json.loads(text_data or '')['message']
+        except (ValueError, KeyError, TypeError):
+            return
+        if not isinstance(message_content, str):
+            return
+        message_content = message_content.strip()[:self.max_length]
+        if not message_content:
+            return
+
+        sent_at = timezone.now()
+        self.buffer.append(Message(
+            conversation_id=self.conversation_id,
+            sender_id=self.user.id,
+            content=message_content,
+        ))
+        if len(self.buffer) >= self.flush_size:
+            await self.flush()
+        else:
+            self._schedule_flush()
 
         # Send the message to the group
         await self.channel_layer.group_send(
@@ -45,17 +130,71 @@ class ChatConsumer(AsyncWebsocketConsumer):
             {
                 'type': 'chat_message',
                 'message': message_content,
-                'sender': sender.username
+                'sender': self.user.username,
+                'timestamp': sent_at.isoformat(),
             }
         )
 
+    def _schedule_flush(self):
+        if self.flush_handle is None and self.flush_task is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.flush_interval, self._start_flush)
+
+    def _start_flush(self):
+        self.flush_handle = None
+        # Keep a reference: the loop only holds tasks weakly.
+        self.flush_task = asyncio.ensure_future(self.flush())
+        self.flush_task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task):
+        self.flush_task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Chat flush for conversation %s failed.", self.conversation_id, exc_info=task.exception())
+        if self.buffer:
+            self._schedule_flush()
+
+    async def flush(self):
+        """Write the buffered messages with one bulk_create."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if not self.buffer:
+            return
+        messages, self.buffer = self.buffer, []
+        try:
+            await _persist(self.conversation_id, messages)
+        except Exception:
+            self.failed_flushes += 1
+            if self.failed_flushes >= self.max_flush_attempts:
+                logger.exception(
+                    "Dropping %d chat messages for conversation %s after %d failed writes.",
+                    len(messages), self.conversation_id, self.failed_flushes,
+                )
+                self.failed_flushes = 0
+                return
+            logger.exception(
+                "Saving %d chat messages for conversation %s failed; will retry.",
+                len(messages), self.conversation_id,
+            )
+            # Back in front of anything received meanwhile, to keep the order.
+            self.buffer[:0] = messages
+            if self.flush_task is None:
+                self._schedule_flush()
+            return
+        self.failed_flushes = 0
+
     # Receive message from room group
     async def chat_message(self, event):
-        message = event['message']
-        sender = event['sender']
-
         # Send message to WebSocket
         await self.send(text_data=json.dumps({
-            'message': message,
-            'sender': sender
+            'message': event['message'],
+            'sender': event['sender'],
+            'timestamp': event['timestamp'],
+        }))
+
+    # Read receipt from forum.messaging.mark_read
+    async def read_receipt(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'read_receipt',
+            'reader': event['reader'],
+            'last_read_message_id': event['last_read_message_id'],
         }))
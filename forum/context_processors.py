@@ -0,0 +1,13 @@
+from .notifications import unread_count
+
+
+def unread_notifications(request):
+    """
+    ``unread_notifications_count`` for the navbar badge. It is passed as a
+    callable so templates that never show it cost nothing, and the cached
+    count costs no query when they do.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'unread_notifications_count': lambda: unread_count(user.id)}
@@ -1,4 +1,5 @@
 from django import forms
+from .media import validate_upload
 from .models import Post, Comment
 
 
@@ -20,19 +21,9 @@ class PostForm(forms.ModelForm):
 
     def clean_media(self):
         media = self.cleaned_data.get('media')
-
         if media:
-            # Validate file type
-            allowed_extensions = ['jpg', 'jpeg', 'png', 'gif', 'mp4', 'mov']
-            file_extension = media.name.split('.')[-1].lower()
-            if file_extension not in allowed_extensions:
-                raise forms.ValidationError("Only image or video files (JPG, PNG, GIF, MP4, MOV) are allowed.")
-
-            # Validate file size (limit to 10MB)
-            max_file_size = 10 * 1024 * 1024  # 10MB
-            if media.size > max_file_size:
-                raise forms.ValidationError("File size must not exceed 10MB.")
-
+            # Checks the file's leading bytes, not its extension.
+            validate_upload(media)
         return media
 
 
@@ -46,7 +37,8 @@ class CommentForm(forms.ModelForm):
             'content': forms.Textarea(attrs={'placeholder': 'Write your comment...'}),
         }
 
-
-
-
-
+    def clean_media(self):
+        media = self.cleaned_data.get('media')
+        if media:
+            validate_upload(media)
+        return media
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from forum.media import backfill_variants
+
+
+class Command(BaseCommand):
+    help = "Generate missing WebP variants for images already stored by the forum models."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: FORUM_MEDIA['THUMBNAIL_WORKERS']).")
+
+    def handle(self, *args, **options):
+        done, failed = backfill_variants(workers=options['workers'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Variants ready for {done} images, {failed} failed."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from forum.notifications import Worker
+
+
+class Command(BaseCommand):
+    help = "Deliver queued notifications from the outbox, fanning out broadcasts, until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help="Delivery threads (default: FORUM_NOTIFICATIONS['WORKERS']).")
+        parser.add_argument('--batch-size', type=int, help="Direct notifications delivered per batch.")
+        parser.add_argument('--once', action='store_true', help="Exit once nothing is due instead of polling.")
+
+    def handle(self, *args, **options):
+        worker = Worker(workers=options['workers'], batch_size=options['batch_size'])
+        try:
+            worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            worker.stop()
+        self.stdout.write(self.style.SUCCESS("Notification worker stopped."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from forum.models import Comment, Post
+from forum.votes import rebuild_vote_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized upvote/downvote/score columns on posts and comments from the vote tables."
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            updated = rebuild_vote_counts(model)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt vote counters for {updated} {model._meta.verbose_name_plural}."))
@@ -0,0 +1,251 @@
+"""
+Media uploads for the forum models.
+
+Every forum FileField stores through ``ContentAddressedStorage``:
+
+* uploads are streamed to disk chunk by chunk while being hashed, so a large
+  file is never held in memory;
+* the stored name is ``uploads/<sha256[:2]>/<sha256>.<ext>`` whatever the
+  field's ``upload_to``, so the same content uploaded twice, to any model, is
+  kept once;
+* the type comes from the file's leading bytes, not its name or the browser's
+  Content-Type header, and the extension is chosen from that.
+
+New images get resized WebP variants (``FORUM_MEDIA['VARIANT_WIDTHS']``) made
+in a background process pool by forum/thumbnails.py. Templates render them
+with ``{% responsive_media %}`` (forum_media tags), which falls back to the
+original until the variants exist.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from . import thumbnails
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MAX_UPLOAD_SIZE': 10 * 1024 * 1024,
+    'VARIANT_WIDTHS': (320, 640, 1280),
+    'THUMBNAIL_WORKERS': 2,   # 0 generates variants inline (tests, management commands)
+}
+
+CONTENT_DIR = 'uploads'
+SNIFF_BYTES = 32
+# Leading-byte signatures -> (content type, extension, kind).
+SIGNATURES = [
+    (b'\xff\xd8\xff', ('image/jpeg', 'jpg', 'image')),
+    (b'\x89PNG\r\n\x1a\n', ('image/png', 'png', 'image')),
+    (b'GIF87a', ('image/gif', 'gif', 'image')),
+    (b'GIF89a', ('image/gif', 'gif', 'image')),
+]
+# ISO base media major brands accepted as video. HEIC, AVIF and other
+# ISO-BMFF formats carry their own brands and are rejected.
+MP4_BRANDS = {b'isom', b'mp41', b'mp42', b'avc1', b'M4V '}
+QUICKTIME_BRAND = b'qt  '
+# Older uploads were named by the uploader, hence 'jpeg'.
+EXTENSION_KINDS = {
+    'jpg': 'image', 'jpeg': 'image', 'png': 'image', 'gif': 'image', 'webp': 'image',
+    'mp4': 'video', 'mov': 'video',
+}
+# Images that get resized variants. GIFs are left alone to keep their animation.
+RESIZABLE = {'image/jpeg', 'image/png', 'image/webp'}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'FORUM_MEDIA', {})}
+
+
+def sniff(head):
+    """Return ``(content_type, extension, kind)`` for a file's first bytes, or None if unsupported."""
+    for signature, result in SIGNATURES:
+        if head.startswith(signature):
+            return result
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp', 'webp', 'image'
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand == QUICKTIME_BRAND:
+            return 'video/quicktime', 'mov', 'video'
+        if brand in MP4_BRANDS:
+            return 'video/mp4', 'mp4', 'video'
+    return None
+
+
+def _read_head(upload):
+    position = upload.tell() if hasattr(upload, 'tell') else 0
+    upload.seek(0)
+    head = upload.read(SNIFF_BYTES)
+    upload.seek(position)
+    return head
+
+
+def validate_upload(upload, kinds=('image', 'video')):
+    """Form-level check of an uploaded file's size and real type. Returns the sniffed type."""
+    max_size = _config()['MAX_UPLOAD_SIZE']
+    if upload.size > max_size:
+        raise ValidationError(f"File size must not exceed {max_size // (1024 * 1024)}MB.")
+    detected = sniff(_read_head(upload))
+    if detected is None or detected[2] not in kinds:
+        raise ValidationError("Only image or video files (JPG, PNG, GIF, WEBP, MP4, MOV) are allowed.")
+    return detected
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content hash and stores each content once."""
+
+    def _save(self, name, content):
+        os.makedirs(self.path(CONTENT_DIR), exist_ok=True)
+        digest = hashlib.sha256()
+        head = b''
+        descriptor, partial = tempfile.mkstemp(dir=self.path(CONTENT_DIR), suffix='.part')
+        try:
+            with os.fdopen(descriptor, 'wb') as out:
+                for chunk in content.chunks():
+                    if len(head) < SNIFF_BYTES:
+                        head += chunk[:SNIFF_BYTES - len(head)]
+                    digest.update(chunk)
+                    out.write(chunk)
+            detected = sniff(head)
+            extension = detected[1] if detected else (os.path.splitext(name)[1].lstrip('.').lower() or 'bin')
+            sha = digest.hexdigest()
+            final = os.path.join(CONTENT_DIR, sha[:2], f"{sha}.{extension}")
+            if self.exists(final):
+                return final.replace(os.sep, '/')
+            os.makedirs(os.path.dirname(self.path(final)), exist_ok=True)
+            os.replace(partial, self.path(final))
+            partial = None
+        finally:
+            if partial and os.path.exists(partial):
+                os.remove(partial)
+        if self.file_permissions_mode is not None:
+            os.chmod(self.path(final), self.file_permissions_mode)
+        if detected and detected[0] in RESIZABLE:
+            schedule_variants(final)
+        return final.replace(os.sep, '/')
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is decided by content in _save; identical content maps
+        # to the same file on purpose.
+        return name
+
+
+media_storage = ContentAddressedStorage()
+
+
+def get_media_storage():
+    return media_storage
+
+
+# --- Variants ---
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: workers must not inherit the web process's threads or DB connections.
+            _pool = ProcessPoolExecutor(
+                max_workers=_config()['THUMBNAIL_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error("Generating media variants failed", exc_info=future.exception())
+
+
+def schedule_variants(name):
+    """Generate ``name``'s variants in the background (inline when THUMBNAIL_WORKERS is 0)."""
+    config = _config()
+    root = str(media_storage.location)
+    widths = tuple(config['VARIANT_WIDTHS'])
+    if not config['THUMBNAIL_WORKERS']:
+        try:
+            return thumbnails.generate_variants(root, name, widths)
+        except Exception:
+            logger.exception("Generating media variants for %s failed", name)
+            return []
+    future = _get_pool().submit(thumbnails.generate_variants, root, name, widths)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def stored_images():
+    """Names of every stored forum image that variants can be made for, each once."""
+    from django.apps import apps
+
+    names = set()
+    for model in apps.get_app_config('forum').get_models():
+        for field in model._meta.get_fields():
+            if getattr(field, 'storage', None) is media_storage:
+                names.update(
+                    model.objects.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+                    .values_list(field.name, flat=True).distinct().iterator()
+                )
+    return sorted(
+        name for name in names
+        if os.path.splitext(name)[1].lstrip('.').lower() in {'jpg', 'jpeg', 'png', 'webp'}
+    )
+
+
+def backfill_variants(workers=None, stdout=None):
+    """Make any missing variants for already stored images in a process pool. Returns (done, failed)."""
+    config = _config()
+    root = str(media_storage.location)
+    widths = tuple(config['VARIANT_WIDTHS'])
+    names = [name for name in stored_images() if os.path.exists(os.path.join(root, name))]
+    done = failed = 0
+    with ProcessPoolExecutor(
+        max_workers=workers or config['THUMBNAIL_WORKERS'] or None,
+        mp_context=multiprocessing.get_context('spawn'),
+    ) as pool:
+        futures = {pool.submit(thumbnails.generate_variants, root, name, widths): name for name in names}
+        for future in as_completed(futures):
+            if future.exception() is None:
+                done += 1
+            else:
+                failed += 1
+                logger.error("Generating media variants for %s failed", futures[future], exc_info=future.exception())
+            if stdout and (done + failed) % 100 == 0:
+                stdout.write(f"Processed {done + failed} of {len(names)} images.")
+    return done, failed
+
+
+def variants(fieldfile):
+    """``[(url, width), ...]`` for the WebP variants of ``fieldfile`` that exist so far."""
+    if not fieldfile or not fieldfile.name:
+        return []
+    storage = fieldfile.storage
+    root = str(storage.location)
+    found = []
+    for width in _config()['VARIANT_WIDTHS']:
+        path = thumbnails.variant_path(root, fieldfile.name, width)
+        if not os.path.exists(path):
+            break
+        relative = os.path.relpath(path, root).replace(os.sep, '/')
+        found.append((storage.url(relative), width))
+    return found
+
+
+def media_kind(fieldfile):
+    """'image', 'video' or None, from the stored file's extension (chosen by sniffing on upload)."""
+    if not fieldfile or not fieldfile.name:
+        return None
+    extension = os.path.splitext(fieldfile.name)[1].lstrip('.').lower()
+    return EXTENSION_KINDS.get(extension)
@@ -0,0 +1,142 @@
+"""
+Direct conversations, conversation history, read receipts and the inbox listing.
+
+The conversation between two users is found through Conversation.direct_key
+(a unique index) rather than by joining the participants table twice.
+
+History is paged by message id (newest first, ``before`` an id), which the
+(conversation, id) index serves directly. Each participant's read position is
+a ConversationReadState row, so an unread count is an index range count of
+messages after it rather than a scan of the conversation.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import IntegrityError, transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Conversation, ConversationReadState, Message
+
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 200
+
+
+def direct_conversation(user, other_user):
+    """
+    Return ``(conversation, created)`` for the two-person conversation between
+    ``user`` and ``other_user``, creating it if needed. Safe against two
+    requests creating the same conversation at once: the unique direct_key
+    makes one of them fail and re-read the winner's row.
+    """
+    if user.pk == other_user.pk:
+        raise ValueError("A direct conversation needs two different users.")
+    key = Conversation.direct_key_for(user.pk, other_user.pk)
+    conversation = Conversation.objects.filter(direct_key=key).first()
+    if conversation is not None:
+        return conversation, False
+    try:
+        with transaction.atomic():
+            conversation = Conversation.objects.create(direct_key=key)
+            conversation.participants.add(user, other_user)
+    except IntegrityError:
+        return Conversation.objects.get(direct_key=key), False
+    return conversation, True
+
+
+def is_participant(conversation_id, user):
+    return Conversation.participants.through.objects.filter(
+        conversation_id=conversation_id, user_id=user.id
+    ).exists()
+
+
+def message_history(conversation_id, before=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Return ``(messages, next_before)``: the newest ``limit`` messages older than
+    message id ``before`` (or the newest overall), oldest first for display,
+    and the cursor for the page before them (None at the start).
+    """
+    limit = max(1, min(limit, MAX_HISTORY_PAGE_SIZE))
+    messages = Message.objects.filter(conversation_id=conversation_id).select_related("sender")
+    if before is not None:
+        messages = messages.filter(id__lt=before)
+    page = list(messages.order_by("-id")[:limit + 1])
+    next_before = page[limit - 1].id if len(page) > limit else None
+    return page[:limit][::-1], next_before
+
+
+def read_positions(conversation_id):
+    """{user_id: last_read_message_id} for everyone who has read the conversation."""
+    return dict(
+        ConversationReadState.objects.filter(conversation_id=conversation_id)
+        .values_list("user_id", "last_read_message_id")
+    )
+
+
+def mark_read(conversation_id, user, message_id=None):
+    """
+    Move ``user``'s read position forward to ``message_id`` (the latest message
+    by default). Positions never move backwards. Returns the stored position.
+    """
+    if message_id is None:
+        message_id = (
+            Message.objects.filter(conversation_id=conversation_id)
+            .order_by("-id").values_list("id", flat=True).first()
+        ) or 0
+    updated = ConversationReadState.objects.filter(
+        conversation_id=conversation_id, user=user, last_read_message_id__lt=message_id
+    ).update(last_read_message_id=message_id)
+    if not updated:
+        try:
+            with transaction.atomic():
+                ConversationReadState.objects.create(
+                    conversation_id=conversation_id, user=user, last_read_message_id=message_id
+                )
+        except IntegrityError:
+            # Already at or past message_id, or created concurrently.
+            ConversationReadState.objects.filter(
+                conversation_id=conversation_id, user=user, last_read_message_id__lt=message_id
+            ).update(last_read_message_id=message_id)
+    position = ConversationReadState.objects.filter(
+        conversation_id=conversation_id, user=user
+    ).values_list("last_read_message_id", flat=True).get()
+    _announce_receipt(conversation_id, user, position)
+    return position
+
+
+def _announce_receipt(conversation_id, user, position):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(
+        f"chat_{conversation_id}",
+        {"type": "read_receipt", "reader": user.username, "last_read_message_id": position},
+    )
+
+
+def inbox_conversations(user):
+    """
+    ``user``'s conversations, most recently active first, each annotated with
+    its last message (id, content, sender, timestamp) and ``unread_count``,
+    all in one query.
+    """
+    last_message = Message.objects.filter(conversation=OuterRef("pk")).order_by("-id")
+    last_read = ConversationReadState.objects.filter(
+        conversation=OuterRef("conversation"), user=user
+    ).values("last_read_message_id")[:1]
+    unread = (
+        Message.objects.filter(conversation=OuterRef("pk"))
+        .filter(id__gt=Coalesce(Subquery(last_read), Value(0)))
+        .filter(~Q(sender=user))
+        .order_by().values("conversation")
+        .annotate(total=Count("id")).values("total")
+    )
+    return (
+        user.conversations.annotate(
+            last_message_id=Subquery(last_message.values("id")[:1]),
+            last_message_content=Subquery(last_message.values("content")[:1]),
+            last_message_sender=Subquery(last_message.values("sender__username")[:1]),
+            last_message_at=Subquery(last_message.values("timestamp")[:1]),
+            unread_count=Coalesce(Subquery(unread, output_field=IntegerField()), Value(0)),
+        )
+        .order_by("-last_updated")
+    )
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_vote_counts(apps, schema_editor):
+    def count(model, field):
+        relation = model._meta.get_field(field)
+        source = relation.m2m_field_name()
+        return Coalesce(Subquery(
+            relation.remote_field.through.objects.filter(**{source: OuterRef('pk')})
+            .order_by().values(source).annotate(total=Count('pk')).values('total'),
+            output_field=models.IntegerField(),
+        ), Value(0))
+
+    for model_name in ('Post', 'Comment'):
+        model = apps.get_model('forum', model_name)
+        model.objects.update(
+            upvote_count=count(model, 'upvotes'),
+            downvote_count=count(model, 'downvotes'),
+            score=count(model, 'upvotes') - count(model, 'downvotes'),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0007_departmentpost_governmentnotification_poll_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='downvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='score',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='upvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='downvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='score',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='upvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_vote_counts, migrations.RunPython.noop),
+    ]
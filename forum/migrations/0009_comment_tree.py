@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_comment_paths(apps, schema_editor):
+    Comment = apps.get_model('forum', 'Comment')
+    # Parents always have a lower id than their replies, so one ordered pass
+    # sees every parent before its children.
+    known = {}
+    batch = []
+    for comment in Comment.objects.order_by('id').only('id', 'parent_comment_id').iterator(chunk_size=2000):
+        parent = known.get(comment.parent_comment_id)
+        if parent is None:
+            comment.depth, comment.thread_root_id, comment.path = 0, None, ''
+        else:
+            depth, root_id, path = parent
+            comment.depth = depth + 1
+            comment.thread_root_id = root_id or comment.parent_comment_id
+            comment.path = f"{path}{comment.parent_comment_id:010d}/"
+        known[comment.id] = (comment.depth, comment.thread_root_id, comment.path)
+        batch.append(comment)
+        if len(batch) >= 2000:
+            Comment.objects.bulk_update(batch, ['depth', 'thread_root', 'path'])
+            batch = []
+    Comment.objects.bulk_update(batch, ['depth', 'thread_root', 'path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0008_vote_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='thread_root',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='thread_comments', to='forum.comment'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'depth', '-created_at', '-id'], name='comment_thread_page_idx'),
+        ),
+        migrations.RunPython(backfill_comment_paths, migrations.RunPython.noop),
+    ]
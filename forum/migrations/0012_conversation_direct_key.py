@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+
+def backfill_direct_keys(apps, schema_editor):
+    Conversation = apps.get_model('forum', 'Conversation')
+    Participant = Conversation.participants.through
+    members = {}
+    for conversation_id, user_id in Participant.objects.values_list('conversation_id', 'user_id').iterator():
+        members.setdefault(conversation_id, set()).add(user_id)
+    # If a pair already has several conversations, the most recently active one
+    # becomes the canonical DM; the others keep their history but no key.
+    claimed = set()
+    for conversation in Conversation.objects.order_by('-last_updated', '-id').only('id'):
+        users = members.get(conversation.id, set())
+        if len(users) != 2:
+            continue
+        low, high = sorted(users)
+        key = f"{low}:{high}"
+        if key in claimed:
+            continue
+        claimed.add(key)
+        # update() so last_updated (auto_now) is left alone.
+        Conversation.objects.filter(id=conversation.id).update(direct_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0011_message_history_read_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='direct_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_direct_keys, migrations.RunPython.noop),
+    ]
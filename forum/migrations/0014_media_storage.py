@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:02
+
+import forum.media
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forum', '0013_notification_unread_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='media',
+            field=models.FileField(blank=True, null=True, storage=forum.media.get_media_storage, upload_to='comment_media/'),
+        ),
+        migrations.AlterField(
+            model_name='departmentpost',
+            name='media',
+            field=models.FileField(blank=True, null=True, storage=forum.media.get_media_storage, upload_to='department_post_media/'),
+        ),
+        migrations.AlterField(
+            model_name='feedback',
+            name='media',
+            field=models.FileField(blank=True, null=True, storage=forum.media.get_media_storage, upload_to='feedback_media/'),
+        ),
+        migrations.AlterField(
+            model_name='governmentnotification',
+            name='media',
+            field=models.FileField(blank=True, null=True, storage=forum.media.get_media_storage, upload_to='notification_media/'),
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='media',
+            field=models.FileField(blank=True, null=True, storage=forum.media.get_media_storage, upload_to='message_media/'),
+        ),
+        migrations.AlterField(
+            model_name='poll',
+            name='media',
+            field=models.FileField(blank=True, null=True, storage=forum.media.get_media_storage, upload_to='poll_media/'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='media',
+            field=models.FileField(blank=True, null=True, storage=forum.media.get_media_storage, upload_to='post_media/'),
+        ),
+        migrations.AlterField(
+            model_name='projectupdate',
+            name='media',
+            field=models.FileField(blank=True, null=True, storage=forum.media.get_media_storage, upload_to='project_update_media/'),
+        ),
+    ]
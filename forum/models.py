@@ -1,6 +1,9 @@
 import os
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .media import get_media_storage
 
 User = get_user_model()
 
@@ -13,18 +16,27 @@ def upload_to(instance, filename):
 class Post(models.Model):
     title = models.CharField(max_length=255)
     content = models.TextField()
-    media = models.FileField(upload_to="post_media/", blank=True, null=True)
+    media = models.FileField(upload_to="post_media/", storage=get_media_storage, blank=True, null=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="posts")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also moved by votes on the post (forum/votes.py), so it versions cached
+    # renderings of the post itself. Its comment threads are versioned
+    # separately (forum.comment_tree.threads_version).
+    updated_at = models.DateTimeField(auto_now=True)
     upvotes = models.ManyToManyField(User, related_name="upvoted_posts", blank=True)
     downvotes = models.ManyToManyField(User, related_name="downvoted_posts", blank=True)
     shared_by = models.ManyToManyField(User, related_name="shared_posts", blank=True)
 
+    # Denormalized vote counters, maintained by forum.votes.cast_vote
+    upvote_count = models.PositiveIntegerField(default=0)
+    downvote_count = models.PositiveIntegerField(default=0)
+    score = models.IntegerField(default=0)
+
     def __str__(self):
         return self.title
 
     def vote_count(self):
-        return self.upvotes.count() - self.downvotes.count()
+        return self.score
 
 
 # Comment Model
@@ -32,39 +44,67 @@ class Comment(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
     content = models.TextField(default="No content")  # Default text for empty comments
-    media = models.FileField(upload_to="comment_media/", blank=True, null=True)
+    media = models.FileField(upload_to="comment_media/", storage=get_media_storage, blank=True, null=True)
     parent_comment = models.ForeignKey(
         'self', on_delete=models.CASCADE, null=True, blank=True, related_name="replies"
     )
     upvotes = models.ManyToManyField(User, related_name="upvoted_comments", blank=True)
     downvotes = models.ManyToManyField(User, related_name="downvoted_comments", blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Denormalized vote counters, maintained by forum.votes.cast_vote
+    upvote_count = models.PositiveIntegerField(default=0)
+    downvote_count = models.PositiveIntegerField(default=0)
+    score = models.IntegerField(default=0)
 
     # Helper fields
     depth = models.PositiveIntegerField(default=0)  # For nesting levels
+    # Top-level comment this reply belongs to (null for top-level comments)
+    thread_root = models.ForeignKey(
+        'self', on_delete=models.CASCADE, null=True, blank=True, related_name="thread_comments"
+    )
+    # Materialized path of ancestor ids, e.g. "0000000012/0000000040/"
+    path = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [
+            # Paging through a post's top-level threads, newest first
+            models.Index(fields=['post', 'depth', '-created_at', '-id'], name='comment_thread_page_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title}"
 
     def save(self, *args, **kwargs):
         """
-        Automatically set the depth of the comment based on the parent comment.
-        Top-level comments have a depth of 0; replies are incremented accordingly.
+        Automatically set the depth, thread root and ancestor path of the comment
+        based on the parent comment. Top-level comments have a depth of 0 and an
+        empty path; replies are incremented accordingly.
         """
         if self.parent_comment:
-            self.depth = self.parent_comment.depth + 1
+            parent = self.parent_comment
+            self.depth = parent.depth + 1
+            self.thread_root_id = parent.thread_root_id or parent.id
+            self.path = f"{parent.path}{parent.id:010d}/"
         else:
             self.depth = 0
+            self.thread_root = None
+            self.path = ""
         super().save(*args, **kwargs)
 
+    def descendants_path(self):
+        """Path prefix shared by every comment below this one."""
+        return f"{self.path}{self.id:010d}/"
+
     def vote_count(self):
-        return self.upvotes.count() - self.downvotes.count()
+        return self.score
 
     def is_parent(self):
         """
         Returns True if the comment is a top-level comment.
         """
-        return self.parent_comment is None
+        return self.parent_comment_id is None
 
     def get_replies(self):
         """
@@ -75,8 +115,16 @@ class Comment(models.Model):
 # Conversation Model (for private messaging)
 class Conversation(models.Model):
     participants = models.ManyToManyField(User, related_name="conversations")
+    # "<lower user id>:<higher user id>" for two-person conversations, so the DM
+    # between two users is one unique-index lookup. Null for anything else.
+    direct_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     last_updated = models.DateTimeField(auto_now=True)
 
+    @staticmethod
+    def direct_key_for(user_id, other_user_id):
+        low, high = sorted((int(user_id), int(other_user_id)))
+        return f"{low}:{high}"
+
     def __str__(self):
         return f"Conversation between {', '.join([user.username for user in self.participants.all()])}"
 
@@ -85,12 +133,34 @@ class Message(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name="messages")
     sender = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
-    media = models.FileField(upload_to="message_media/", blank=True, null=True)  # Optional media in messages
+    media = models.FileField(upload_to="message_media/", storage=get_media_storage, blank=True, null=True)  # Optional media in messages
     timestamp = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Message from {self.sender.username} at {self.timestamp}"
 
+    class Meta:
+        indexes = [
+            # History pages (id < cursor) and unread counts (id > last read) are
+            # both range scans within one conversation; ids follow send order.
+            models.Index(fields=["conversation", "id"], name="message_conversation_id_idx"),
+        ]
+
+# Read receipts: how far each participant has read in a conversation.
+class ConversationReadState(models.Model):
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name="read_states")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="conversation_read_states")
+    last_read_message_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["conversation", "user"], name="unique_conversation_read_state"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} read conversation {self.conversation_id} up to {self.last_read_message_id}"
+
 # Notification Model
 class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
@@ -102,7 +172,58 @@ class Notification(models.Model):
         return f"Notification for {self.user.username} - {self.message[:30]}"
 
     class Meta:
-        ordering = ["-created_at"]
+        # No default ordering: every list orders explicitly, and counts and
+        # bulk updates shouldn't pay for a sort.
+        indexes = [
+            # Recent notifications per user: delivery rate limits.
+            models.Index(fields=["user", "-created_at"], name="notification_user_recent_idx"),
+            # Unread counts and the newest-first notification pages.
+            models.Index(fields=["user", "is_read", "-created_at", "-id"], name="notification_user_unread_idx"),
+        ]
+
+# Notification outbox: request handlers enqueue here, the process_notifications
+# worker delivers into Notification (see forum/notifications.py).
+class NotificationOutbox(models.Model):
+    KIND_CHOICES = [
+        ('direct', 'Direct'),
+        ('broadcast', 'Broadcast'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='direct')
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    message = models.TextField()
+    # Pending direct entries with the same key are merged into one notification.
+    coalesce_key = models.CharField(max_length=255, blank=True, default='')
+    event_count = models.PositiveIntegerField(default=1)
+    broadcast = models.ForeignKey(
+        'GovernmentNotification', on_delete=models.CASCADE, null=True, blank=True, related_name="deliveries"
+    )
+    # Broadcast progress: the last recipient id fanned out, so a restart resumes from there.
+    cursor = models.BigIntegerField(default=0)
+    delivered = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="notification_outbox_due_idx"),
+            models.Index(fields=["coalesce_key", "status"], name="notification_outbox_key_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} notification ({self.status}) - {self.message[:30]}"
 
 # Government-Specific Models
 class ProjectUpdate(models.Model):
@@ -128,7 +249,7 @@ class ProjectUpdate(models.Model):
         ],
         default='Pending',
     )
-    media = models.FileField(upload_to="project_update_media/", blank=True, null=True)  # Added media support
+    media = models.FileField(upload_to="project_update_media/", storage=get_media_storage, blank=True, null=True)  # Added media support
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -148,7 +269,7 @@ class Poll(models.Model):
         on_delete=models.CASCADE,
         related_name="polls"
     )
-    media = models.FileField(upload_to="poll_media/", blank=True, null=True)  # Added media support
+    media = models.FileField(upload_to="poll_media/", storage=get_media_storage, blank=True, null=True)  # Added media support
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -175,7 +296,7 @@ class GovernmentNotification(models.Model):
     target_audience = models.TextField(blank=True, null=True)
     message = models.TextField()
     is_broadcast = models.BooleanField(default=True)
-    media = models.FileField(upload_to="notification_media/", blank=True, null=True)  # Added media support
+    media = models.FileField(upload_to="notification_media/", storage=get_media_storage, blank=True, null=True)  # Added media support
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -204,7 +325,7 @@ class DepartmentPost(models.Model):
         ],
         default='General',
     )
-    media = models.FileField(upload_to="department_post_media/", blank=True, null=True)  # Added media support
+    media = models.FileField(upload_to="department_post_media/", storage=get_media_storage, blank=True, null=True)  # Added media support
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -225,7 +346,7 @@ class Feedback(models.Model):
         null=True
     )
     content = models.TextField()
-    media = models.FileField(upload_to="feedback_media/", blank=True, null=True)  # Added media support
+    media = models.FileField(upload_to="feedback_media/", storage=get_media_storage, blank=True, null=True)  # Added media support
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -0,0 +1,338 @@
+"""
+Notification outbox and delivery worker.
+
+Request handlers never write ``Notification`` rows themselves: they call
+``notify`` (or save a broadcast ``GovernmentNotification``), which adds a row
+to ``NotificationOutbox`` in the same transaction. The ``process_notifications``
+command drains the outbox with a thread pool:
+
+* direct entries are delivered in batches with one ``bulk_create``; pending
+  entries sharing a ``coalesce_key`` are merged before delivery, and recipients
+  over the per-user rate limit are deferred (and keep coalescing meanwhile);
+* broadcasts are fanned out to every active user in chunks, recording the last
+  recipient id after each chunk so an interrupted broadcast resumes, not restarts.
+
+Tuning lives in ``settings.FORUM_NOTIFICATIONS``.
+
+On the reading side, each user's unread count is cached (``unread_count``)
+and dropped whenever their notifications change, and marking notifications
+read is a single UPDATE however many are marked.
+"""
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F, Q
+from django.dispatch import Signal
+from django.utils import timezone
+
+from reports.pagination import keyset_paginate
+from .models import Notification, NotificationOutbox
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WORKERS': 4,
+    'BATCH_SIZE': 500,
+    'BROADCAST_CHUNK': 1000,
+    'RATE_LIMIT': 30,       # notifications per user ...
+    'RATE_WINDOW': 3600,    # ... per this many seconds
+    'RETRY_DELAY': 60,
+    'MAX_ATTEMPTS': 5,
+    'LEASE': 300,
+    'POLL_INTERVAL': 2,
+    'UNREAD_CACHE_TTL': 300,
+}
+
+# Sent after Notification rows are bulk-created (no post_save fires), with
+# ``counts`` mapping user id -> number of notifications delivered.
+notifications_delivered = Signal()
+
+# Sent after notifications are marked read in bulk (no post_save fires), with
+# the ``user_id`` and how many were ``marked``.
+notifications_read = Signal()
+
+UNREAD_CACHE_KEY = 'forum:notifications:unread:{}'
+PAGE_SIZE = 20
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'FORUM_NOTIFICATIONS', {})}
+
+
+# --- Reading (user side) ---
+
+def unread_count(user_id):
+    """The user's unread notification count, from the cache when possible."""
+    key = UNREAD_CACHE_KEY.format(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        cache.set(key, count, _config()['UNREAD_CACHE_TTL'])
+    return count
+
+
+def invalidate_unread(user_ids):
+    cache.delete_many([UNREAD_CACHE_KEY.format(user_id) for user_id in user_ids])
+
+
+def notification_page(user, cursor=None, unread_only=True, page_size=PAGE_SIZE):
+    """One page of ``user``'s notifications, newest first. Returns ``(rows, next_cursor)``."""
+    notifications = Notification.objects.filter(user=user)
+    if unread_only:
+        notifications = notifications.filter(is_read=False)
+    return keyset_paginate(notifications, cursor, page_size)
+
+
+def mark_read(user, notification_ids=None):
+    """
+    Mark ``user``'s unread notifications read with one UPDATE: all of them, or
+    only ``notification_ids``. Returns how many changed.
+    """
+    notifications = Notification.objects.filter(user=user, is_read=False)
+    if notification_ids is not None:
+        notifications = notifications.filter(id__in=notification_ids)
+    marked = notifications.update(is_read=True)
+    if marked:
+        invalidate_unread([user.id])
+        notifications_read.send(sender=Notification, user_id=user.id, marked=marked)
+    return marked
+
+
+# --- Enqueueing (request side) ---
+
+def notify(recipient, message, actor=None, coalesce_key='', summary=''):
+    """
+    Queue a notification for ``recipient``. If a pending entry with the same
+    ``coalesce_key`` exists it absorbs this event instead: its count goes up and
+    its message becomes ``summary`` formatted with ``count`` and ``actor``.
+    """
+    with transaction.atomic():
+        if coalesce_key:
+            entry = (
+                NotificationOutbox.objects.select_for_update()
+                .filter(kind='direct', status='pending', coalesce_key=coalesce_key)
+                .first()
+            )
+            if entry is not None:
+                entry.event_count += 1
+                entry.actor = actor
+                if summary:
+                    entry.message = summary.format(
+                        count=entry.event_count, actor=actor.username if actor else ''
+                    )
+                entry.save(update_fields=['event_count', 'actor', 'message'])
+                return entry
+        return NotificationOutbox.objects.create(
+            kind='direct', recipient=recipient, actor=actor, message=message, coalesce_key=coalesce_key
+        )
+
+
+def notify_comment(comment):
+    """
+    Queue the notification for a new comment: 'X replied to your comment' for
+    the parent comment's author, or 'X commented on your post' for the post's.
+    Each kind coalesces separately, per post and recipient.
+    """
+    if comment.parent_comment:
+        recipient = comment.parent_comment.author
+        kind, message = 'reply', f"{comment.author.username} replied to your comment."
+        summary = "{count} new replies to your comments, latest from {actor}."
+    else:
+        recipient = comment.post.author
+        kind, message = 'comment', f"{comment.author.username} commented on your post."
+        summary = "{count} new comments on your post, latest from {actor}."
+    if recipient.pk == comment.author_id:
+        return None
+    return notify(
+        recipient,
+        message,
+        actor=comment.author,
+        coalesce_key=f"{kind}:{comment.post_id}:{recipient.pk}",
+        summary=summary,
+    )
+
+
+def enqueue_broadcast(government_notification):
+    return NotificationOutbox.objects.create(
+        kind='broadcast',
+        broadcast=government_notification,
+        message=f"{government_notification.department.department_name}: {government_notification.message}",
+    )
+
+
+# --- Delivery (worker side) ---
+
+def _due(now):
+    # Processing entries whose lease ran out belong to a worker that died.
+    return NotificationOutbox.objects.filter(
+        Q(status='pending', available_at__lte=now) | Q(status='processing', locked_until__lt=now)
+    )
+
+
+def claim(kind, limit, lease=None):
+    """Lease up to ``limit`` due entries of ``kind`` to this worker. Returns their ids."""
+    lease = lease or _config()['LEASE']
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            _due(now).filter(kind=kind)
+            .select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+            .order_by('available_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if ids:
+            NotificationOutbox.objects.filter(id__in=ids).update(
+                status='processing', locked_until=now + timedelta(seconds=lease)
+            )
+    return ids
+
+
+def _recent_counts(user_ids, window):
+    since = timezone.now() - timedelta(seconds=window)
+    return Counter(dict(
+        Notification.objects.filter(user_id__in=user_ids, created_at__gte=since)
+        .order_by().values_list('user_id').annotate(total=Count('id'))
+    ))
+
+
+def deliver_direct(entry_ids):
+    """Deliver a claimed batch of direct entries. Returns (delivered, deferred)."""
+    config = _config()
+    entries = list(NotificationOutbox.objects.filter(id__in=entry_ids, status='processing').order_by('created_at', 'id'))
+    if not entries:
+        return 0, 0
+    recent = _recent_counts({entry.recipient_id for entry in entries}, config['RATE_WINDOW'])
+    delivered, deferred = [], []
+    for entry in entries:
+        if recent[entry.recipient_id] >= config['RATE_LIMIT']:
+            deferred.append(entry.id)
+        else:
+            recent[entry.recipient_id] += 1
+            delivered.append(entry)
+    now = timezone.now()
+    with transaction.atomic():
+        Notification.objects.bulk_create(
+            [Notification(user_id=entry.recipient_id, message=entry.message) for entry in delivered],
+            batch_size=config['BATCH_SIZE'],
+        )
+        NotificationOutbox.objects.filter(id__in=[entry.id for entry in delivered]).update(
+            status='done', processed_at=now, delivered=1, locked_until=None
+        )
+        if deferred:
+            # Back to pending so later events can still coalesce into them.
+            NotificationOutbox.objects.filter(id__in=deferred).update(
+                status='pending', locked_until=None,
+                available_at=now + timedelta(seconds=config['RETRY_DELAY']),
+            )
+        counts = Counter(entry.recipient_id for entry in delivered)
+        if counts:
+            transaction.on_commit(lambda: notifications_delivered.send(sender=Notification, counts=counts))
+    return len(delivered), len(deferred)
+
+
+def deliver_broadcast(entry_id):
+    """Fan a claimed broadcast out to every active user, chunk by chunk. Returns recipients added."""
+    config = _config()
+    chunk = config['BROADCAST_CHUNK']
+    entry = NotificationOutbox.objects.get(id=entry_id)
+    added = 0
+    while True:
+        recipient_ids = list(
+            User.objects.filter(is_active=True, id__gt=entry.cursor)
+            .order_by('id').values_list('id', flat=True)[:chunk]
+        )
+        if not recipient_ids:
+            break
+        with transaction.atomic():
+            Notification.objects.bulk_create(
+                [Notification(user_id=user_id, message=entry.message) for user_id in recipient_ids],
+                batch_size=chunk,
+            )
+            entry.cursor = recipient_ids[-1]
+            NotificationOutbox.objects.filter(id=entry.id).update(
+                cursor=entry.cursor,
+                delivered=F('delivered') + len(recipient_ids),
+                locked_until=timezone.now() + timedelta(seconds=config['LEASE']),
+            )
+            counts = dict.fromkeys(recipient_ids, 1)
+            transaction.on_commit(lambda counts=counts: notifications_delivered.send(sender=Notification, counts=counts))
+        added += len(recipient_ids)
+    NotificationOutbox.objects.filter(id=entry.id).update(
+        status='done', processed_at=timezone.now(), locked_until=None
+    )
+    return added
+
+
+def _fail(entry_ids, error):
+    config = _config()
+    now = timezone.now()
+    for entry in NotificationOutbox.objects.filter(id__in=entry_ids).only('id', 'attempts'):
+        attempts = entry.attempts + 1
+        NotificationOutbox.objects.filter(id=entry.id).update(
+            status='failed' if attempts >= config['MAX_ATTEMPTS'] else 'pending',
+            attempts=attempts,
+            last_error=error,
+            locked_until=None,
+            available_at=now + timedelta(seconds=config['RETRY_DELAY'] * 2 ** (attempts - 1)),
+        )
+
+
+def _run(task, entry_ids, *args):
+    # Each pool thread has its own database connection; drop it when done.
+    close_old_connections()
+    try:
+        return task(*args)
+    except Exception as exc:
+        logger.exception("Notification delivery failed for outbox entries %s", entry_ids)
+        _fail(entry_ids, repr(exc))
+        return None
+    finally:
+        connection.close()
+
+
+class Worker:
+    """Drains the outbox with a thread pool until stopped (or until empty with ``once``)."""
+
+    def __init__(self, workers=None, batch_size=None, poll_interval=None):
+        config = _config()
+        self.workers = workers or config['WORKERS']
+        self.batch_size = batch_size or config['BATCH_SIZE']
+        self.poll_interval = config['POLL_INTERVAL'] if poll_interval is None else poll_interval
+        self.stopped = threading.Event()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _claim_jobs(self, free):
+        jobs = []
+        for entry_id in claim('broadcast', free):
+            jobs.append((deliver_broadcast, [entry_id], entry_id))
+        while len(jobs) < free:
+            ids = claim('direct', self.batch_size)
+            if not ids:
+                break
+            jobs.append((deliver_direct, ids, ids))
+        return jobs
+
+    def run(self, once=False):
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='notifications') as pool:
+            while not self.stopped.is_set():
+                free = self.workers - len(in_flight)
+                if free > 0:
+                    for task, entry_ids, arg in self._claim_jobs(free):
+                        in_flight.add(pool.submit(_run, task, entry_ids, arg))
+                if not in_flight:
+                    if once:
+                        break
+                    self.stopped.wait(self.poll_interval)
+                    continue
+                _, in_flight = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
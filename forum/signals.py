@@ -1,10 +1,34 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.contrib.auth.models import User
-from .models import Profile
-
-@receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
-    if created:
-        Profile.objects.create(user=instance)
-    instance.profile.save()
+
+from .comment_tree import expire_threads
+from .models import Comment, GovernmentNotification, Notification, Post
+from . import notifications
+
+
+@receiver(post_save, sender=GovernmentNotification)
+def queue_broadcast(sender, instance, created, **kwargs):
+    if created and instance.is_broadcast:
+        notifications.enqueue_broadcast(instance)
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def drop_unread_count(sender, instance, **kwargs):
+    notifications.invalidate_unread([instance.user_id])
+
+
+@receiver(notifications.notifications_delivered)
+def drop_delivered_unread_counts(sender, counts, **kwargs):
+    notifications.invalidate_unread(counts)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def expire_comment_caches(sender, instance, **kwargs):
+    if isinstance(kwargs.get('origin'), Post):
+        # Deleted along with its post: the post's pages are gone too.
+        return
+    # The post's threads are cached under its comment generation; its own
+    # fragments are keyed on its updated_at, which comments don't touch.
+    expire_threads(instance.post_id)
@@ -0,0 +1,39 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from forum.media import media_kind, variants
+
+register = template.Library()
+
+DEFAULT_SIZES = '(max-width: 768px) 100vw, 768px'
+
+
+@register.filter
+def media_srcset(fieldfile):
+    """The ``srcset`` value for a media file's WebP variants ('' until they exist)."""
+    return ', '.join(f"{url} {width}w" for url, width in variants(fieldfile))
+
+
+@register.simple_tag
+def responsive_media(fieldfile, alt='', css_class='img-fluid rounded', sizes=DEFAULT_SIZES):
+    """
+    Render an uploaded file: images as a <picture> offering the WebP variants
+    with the original as fallback, videos as a <video>.
+    """
+    kind = media_kind(fieldfile)
+    if kind == 'video':
+        return format_html(
+            '<video src="{}" class="{}" controls preload="metadata"></video>', fieldfile.url, css_class
+        )
+    if kind != 'image':
+        return ''
+    image = format_html(
+        '<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async">', fieldfile.url, alt, css_class
+    )
+    found = variants(fieldfile)
+    if not found:
+        return image
+    srcset = format_html_join(', ', '{} {}w', found)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">{}</picture>', srcset, sizes, image
+    )
@@ -1,3 +1,467 @@
+import asyncio
+import importlib
+import os
+import tempfile
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users import follows
+from . import media, messaging, timeline
+from .comment_tree import load_post_threads, load_subtree, threads_version
+from .consumers import ChatConsumer
+from .models import Comment, Conversation, Message, Notification, NotificationOutbox, Post
+from .notifications import claim, deliver_direct, mark_read, notify, notify_comment, unread_count
+from .votes import CLEAR, DOWNVOTE, UPVOTE, cast_vote, rebuild_vote_counts
+
+User = get_user_model()
+
+
+class LocalTimelineStoreTests(TestCase):
+    def test_entries_expire(self):
+        store = timeline.LocalTimelineStore(max_length=10, timeout=60)
+        with mock.patch('forum.timeline.time.monotonic', return_value=1000):
+            store.replace(1, [3, 1, 2])
+            store.add_wide_author(7)
+            self.assertEqual(store.read(1), [3, 2, 1])
+            self.assertEqual(store.wide_authors([7, 8]), {7})
+        with mock.patch('forum.timeline.time.monotonic', return_value=1061):
+            self.assertFalse(store.exists(1))
+            self.assertEqual(store.read(1), [])
+            self.assertEqual(store.wide_authors([7]), set())
+
+    def test_least_recently_used_timelines_are_evicted(self):
+        store = timeline.LocalTimelineStore(max_length=10, max_users=2)
+        store.replace(1, [1])
+        store.replace(2, [2])
+        store.read(1)
+        store.replace(3, [3])
+        self.assertTrue(store.exists(1))
+        self.assertFalse(store.exists(2))
+        self.assertTrue(store.exists(3))
+
+    def test_push_keeps_newest_first_and_bounded(self):
+        store = timeline.LocalTimelineStore(max_length=3)
+        store.replace(1, [5, 3, 1])
+        store.push([1, 2], 4)
+        self.assertEqual(store.read(1), [5, 4, 3])
+        # Timelines nobody has read yet are left for the first read to build.
+        self.assertFalse(store.exists(2))
+
+
+class HomeTimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user('reader')
+        cls.author = User.objects.create_user('author')
+        cls.stranger = User.objects.create_user('stranger')
+        follows.follow(cls.reader, cls.author)
+
+    def setUp(self):
+        timeline.get_store().clear()
+
+    def post(self, author, title='Post'):
+        post = Post.objects.create(author=author, title=title, content='...')
+        timeline.publish(post)
+        return post
+
+    def test_fan_out_reaches_built_timelines(self):
+        older = self.post(self.author)
+        self.post(self.stranger)
+        posts, _ = timeline.home_timeline(self.reader)
+        self.assertEqual(posts, [older])
+
+        newer = self.post(self.author)
+        self.assertEqual(timeline.get_store().read(self.reader.id), [newer.id, older.id])
+        posts, _ = timeline.home_timeline(self.reader)
+        self.assertEqual(posts, [newer, older])
+
+    def test_pages_past_the_cached_window(self):
+        posts = [self.post(self.author, f'Post {n}') for n in range(5)]
+        page, cursor = timeline.home_timeline(self.reader, limit=3)
+        self.assertEqual(page, posts[:1:-1])
+        page, cursor = timeline.home_timeline(self.reader, before=cursor, limit=3)
+        self.assertEqual(page, posts[1::-1])
+        self.assertIsNone(cursor)
+
+    def test_wide_authors_are_merged_at_read_time(self):
+        timeline.home_timeline(self.reader)
+        with self.settings(FORUM_TIMELINE={**timeline._config(), 'FANOUT_LIMIT': 0}):
+            post = self.post(self.author)
+        self.assertEqual(timeline.get_store().read(self.reader.id), [])
+        posts, _ = timeline.home_timeline(self.reader)
+        self.assertEqual(posts, [post])
+
+    def test_readers_following_nobody_see_everyone(self):
+        post = self.post(self.stranger)
+        posts, _ = timeline.home_timeline(self.author)
+        self.assertEqual(posts, [post])
+
+
+class NotifyCommentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.commenter = User.objects.create_user('commenter')
+        cls.replier = User.objects.create_user('replier')
+        cls.post = Post.objects.create(author=cls.author, title='Park', content='...')
+
+    def comment(self, author, parent=None):
+        comment = Comment.objects.create(post=self.post, author=author, content='...', parent_comment=parent)
+        return notify_comment(comment)
+
+    def test_replies_and_comments_coalesce_separately(self):
+        top = Comment.objects.create(post=self.post, author=self.author, content='...')
+        self.comment(self.commenter)
+        self.comment(self.replier)
+        reply = self.comment(self.commenter, parent=top)
+        self.assertEqual(reply.message, "commenter replied to your comment.")
+        entries = dict(NotificationOutbox.objects.values_list('coalesce_key', 'message'))
+        self.assertEqual(entries, {
+            f'comment:{self.post.pk}:{self.author.pk}': "2 new comments on your post, latest from replier.",
+            f'reply:{self.post.pk}:{self.author.pk}': "commenter replied to your comment.",
+        })
+
+    def test_own_comments_are_not_notified(self):
+        self.assertIsNone(self.comment(self.author))
+
+
+class NotificationDeliveryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipient = User.objects.create_user('recipient')
+        cls.actors = [User.objects.create_user(f'actor{n}') for n in range(3)]
+
+    def deliver(self):
+        return deliver_direct(claim('direct', 100))
+
+    def test_pending_entries_coalesce_into_one_notification(self):
+        for actor in self.actors:
+            notify(self.recipient, f"{actor.username} commented.", actor=actor,
+                   coalesce_key='comment:1', summary="{count} comments, latest from {actor}.")
+        self.assertEqual(NotificationOutbox.objects.get().event_count, 3)
+        self.assertEqual(self.deliver(), (1, 0))
+        self.assertEqual(list(Notification.objects.values_list('message', flat=True)),
+                         ["3 comments, latest from actor2."])
+
+    def test_recipients_over_the_rate_limit_are_deferred_and_keep_coalescing(self):
+        with self.settings(FORUM_NOTIFICATIONS={'RATE_LIMIT': 2}):
+            for n in range(3):
+                notify(self.recipient, f"Event {n}", coalesce_key=f'event:{n}', summary="{count} events.")
+            self.assertEqual(self.deliver(), (2, 1))
+            deferred = NotificationOutbox.objects.get(status='pending')
+            self.assertEqual(deferred.coalesce_key, 'event:2')
+            self.assertEqual(claim('direct', 100), [])
+
+            notify(self.recipient, "Event 2 again", coalesce_key='event:2', summary="{count} events.")
+            deferred.refresh_from_db()
+            self.assertEqual((deferred.event_count, deferred.message), (2, "2 events."))
+        self.assertEqual(Notification.objects.filter(user=self.recipient).count(), 2)
+
+
+
+class UnreadNotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='pw')
+        cls.notes = [Notification.objects.create(user=cls.user, message=f"Note {n}") for n in range(3)]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unread_count_is_cached_until_notifications_change(self):
+        self.assertEqual(unread_count(self.user.id), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.user.id), 3)
+        Notification.objects.create(user=self.user, message="Note 3")
+        self.assertEqual(unread_count(self.user.id), 4)
+
+    def test_mark_read_marks_only_the_given_ids_in_one_update(self):
+        self.assertEqual(unread_count(self.user.id), 3)
+        with CaptureQueriesContext(connection) as queries:
+            marked = mark_read(self.user, [self.notes[0].id, self.notes[1].id])
+        self.assertEqual(marked, 2)
+        # The rest is the dashboard's notifications_read receiver.
+        self.assertEqual(len([q for q in queries if 'forum_notification' in q['sql']]), 1)
+        self.assertEqual(mark_read(self.user, [self.notes[0].id]), 0)
+        self.assertEqual(unread_count(self.user.id), 1)
+        self.assertEqual(mark_read(User.objects.create_user('other'), [self.notes[2].id]), 0)
+
+    def test_mark_notifications_read_view(self):
+        self.client.login(username='reader', password='pw')
+        url = reverse('forum:mark_notifications_read')
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(self.client.post(url, {'ids': ['x']}).status_code, 400)
+        response = self.client.post(url, {'ids': [self.notes[0].id]})
+        self.assertEqual(response.json(), {'status': 'success', 'marked': 1, 'unread_count': 2})
+        response = self.client.post(url)
+        self.assertEqual(response.json(), {'status': 'success', 'marked': 2, 'unread_count': 0})
+
+class DirectConversationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='pw')
+        cls.bob = User.objects.create_user('bob')
+        cls.carol = User.objects.create_user('carol')
+
+    def test_each_pair_has_one_conversation_either_way_round(self):
+        conversation, created = messaging.direct_conversation(self.alice, self.bob)
+        self.assertTrue(created)
+        self.assertEqual(messaging.direct_conversation(self.bob, self.alice), (conversation, False))
+        other, _ = messaging.direct_conversation(self.alice, self.carol)
+        self.assertNotEqual(other, conversation)
+        self.assertEqual(set(conversation.participants.all()), {self.alice, self.bob})
+        with self.assertRaises(ValueError):
+            messaging.direct_conversation(self.alice, self.alice)
+
+    def test_losing_a_concurrent_create_returns_the_winner(self):
+        winner, _ = messaging.direct_conversation(self.alice, self.bob)
+        # The lookup misses as if the other request hadn't committed yet.
+        with mock.patch.object(Conversation.objects, 'filter', return_value=Conversation.objects.none()):
+            self.assertEqual(messaging.direct_conversation(self.alice, self.bob), (winner, False))
+        self.assertEqual(Conversation.objects.count(), 1)
+
+    def test_chat_room_opens_the_pair_conversation(self):
+        self.client.force_login(self.alice)
+        messaging.direct_conversation(self.alice, self.carol)
+        response = self.client.get(reverse('forum:chat_room', args=['bob']))
+        self.assertEqual(set(response.context['conversation'].participants.all()), {self.alice, self.bob})
+        self.assertRedirects(self.client.get(reverse('forum:chat_room', args=['alice'])), reverse('forum:inbox'))
+
+    def test_migration_keys_the_latest_conversation_of_each_pair(self):
+        older, newer, group = (Conversation.objects.create() for _ in range(3))
+        for conversation in (older, newer):
+            conversation.participants.add(self.alice, self.bob)
+        group.participants.add(self.alice, self.bob, self.carol)
+        migration = importlib.import_module('forum.migrations.0012_conversation_direct_key')
+        migration.backfill_direct_keys(django_apps, None)
+        keys = dict(Conversation.objects.values_list('id', 'direct_key'))
+        self.assertEqual(keys, {older.id: None, newer.id: f'{self.alice.id}:{self.bob.id}', group.id: None})
+
+
+class MessageHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice')
+        cls.bob = User.objects.create_user('bob')
+        cls.conversation, _ = messaging.direct_conversation(cls.alice, cls.bob)
+        cls.messages = [
+            Message.objects.create(conversation=cls.conversation, sender=cls.bob, content=f'Message {n}')
+            for n in range(5)
+        ]
+
+    def ids(self, messages):
+        return [message.id for message in messages]
+
+    def test_history_pages_back_from_the_newest(self):
+        page, before = messaging.message_history(self.conversation.id, limit=2)
+        self.assertEqual(self.ids(page), self.ids(self.messages[3:]))
+        page, before = messaging.message_history(self.conversation.id, before=before, limit=2)
+        self.assertEqual(self.ids(page), self.ids(self.messages[1:3]))
+        page, before = messaging.message_history(self.conversation.id, before=before, limit=2)
+        self.assertEqual((self.ids(page), before), (self.ids(self.messages[:1]), None))
+
+    def test_read_position_only_moves_forward(self):
+        conversation_id, latest = self.conversation.id, self.messages[-1].id
+        self.assertEqual(messaging.mark_read(conversation_id, self.alice, self.messages[2].id), self.messages[2].id)
+        self.assertEqual(messaging.mark_read(conversation_id, self.alice, self.messages[0].id), self.messages[2].id)
+        self.assertEqual(messaging.mark_read(conversation_id, self.alice), latest)
+        self.assertEqual(messaging.read_positions(conversation_id), {self.alice.id: latest})
+
+    def test_inbox_counts_messages_after_the_read_position(self):
+        messaging.mark_read(self.conversation.id, self.alice, self.messages[1].id)
+        (conversation,) = messaging.inbox_conversations(self.alice)
+        self.assertEqual((conversation.unread_count, conversation.last_message_id), (3, self.messages[-1].id))
+        # Your own messages are never unread.
+        (conversation,) = messaging.inbox_conversations(self.bob)
+        self.assertEqual(conversation.unread_count, 0)
+
+
+class ChatFlushTests(TestCase):
+    def consumer(self):
+        consumer = ChatConsumer()
+        consumer.conversation_id = 1
+        consumer.flush_interval = 0
+        consumer.max_flush_attempts = 3
+        consumer.buffer = ['first', 'second']
+        consumer.flush_handle = consumer.flush_task = None
+        consumer.failed_flushes = 0
+        return consumer
+
+    async def test_failed_timed_flush_is_logged_and_retried(self):
+        consumer = self.consumer()
+        saved = []
+
+        async def persist(conversation_id, messages):
+            if not saved:
+                saved.append(None)
+                raise RuntimeError("database is locked")
+            saved.append(messages)
+
+        with mock.patch('forum.consumers._persist', persist), \
+                self.assertLogs('forum.consumers', 'ERROR') as logs:
+            consumer._schedule_flush()
+            for _ in range(10):
+                await asyncio.sleep(0)
+        self.assertEqual(saved, [None, ['first', 'second']])
+        self.assertEqual(consumer.buffer, [])
+        self.assertIn('will retry', logs.output[0])
+
+    async def test_batch_is_dropped_after_repeated_failures(self):
+        consumer = self.consumer()
+        failing = mock.AsyncMock(side_effect=RuntimeError("database is down"))
+        with mock.patch('forum.consumers._persist', failing), \
+                self.assertLogs('forum.consumers', 'ERROR') as logs:
+            consumer._schedule_flush()
+            for _ in range(20):
+                await asyncio.sleep(0)
+        self.assertEqual(failing.await_count, 3)
+        self.assertEqual(consumer.buffer, [])
+        self.assertIn('Dropping 2 chat messages', logs.output[-1])
+
+
+class CommentTreeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.post = Post.objects.create(author=cls.author, title='Park', content='...')
+        cls.root = cls.reply()
+        cls.replies = [cls.reply(cls.root) for _ in range(5)]
+        cls.nested = cls.reply(cls.replies[0])
+
+    @classmethod
+    def reply(cls, parent=None):
+        return Comment.objects.create(post=cls.post, author=cls.author, content='...', parent_comment=parent)
+
+    def ids(self, comments):
+        return [comment.id for comment in comments]
+
+    def test_replies_per_thread_are_capped(self):
+        (root,), _ = load_post_threads(self.post, max_replies=3)
+        self.assertEqual(self.ids(root.children), self.ids(self.replies[:3]))
+        self.assertTrue(root.has_more_replies)
+        self.assertEqual(root.replies_after, self.replies[2].id)
+        # The reply's own reply is past the cap: it waits behind its parent's button.
+        self.assertEqual(root.children[0].children, [])
+        self.assertTrue(root.children[0].has_more_replies)
+
+    def test_load_more_resumes_after_the_last_reply_shown(self):
+        replies = load_subtree(self.root, after=self.replies[2].id, max_replies=1)
+        self.assertEqual(self.ids(replies), [self.replies[3].id])
+        self.assertTrue(self.root.has_more_replies)
+        replies = load_subtree(self.root, after=self.root.replies_after, max_replies=5)
+        self.assertEqual(self.ids(replies), [self.replies[4].id])
+        self.assertFalse(self.root.has_more_replies)
+
+    def test_load_more_brings_nested_replies(self):
+        replies = load_subtree(self.root)
+        self.assertEqual(self.ids(replies), self.ids(self.replies))
+        self.assertEqual(self.ids(replies[0].children), [self.nested.id])
+        self.assertFalse(any(reply.has_more_replies for reply in replies))
+
+    def test_depth_limit_flags_parents(self):
+        (root,), _ = load_post_threads(self.post, max_depth=1)
+        self.assertEqual(self.ids(root.children), self.ids(self.replies))
+        self.assertTrue(root.children[0].has_more_replies)
+        self.assertFalse(root.has_more_replies)
+
+
+class ThreadCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.post = Post.objects.create(author=cls.author, title='Park', content='...')
+
+    def test_comment_changes_move_the_thread_version_not_the_post(self):
+        updated_at, version = self.post.updated_at, threads_version(self.post.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = Comment.objects.create(post=self.post, author=self.author, content='...')
+        self.assertNotEqual(threads_version(self.post.pk), version)
+
+        version = threads_version(self.post.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.delete()
+        self.assertNotEqual(threads_version(self.post.pk), version)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.updated_at, updated_at)
+
+
+class VoteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.voter = User.objects.create_user('voter')
+        cls.post = Post.objects.create(author=cls.author, title='Park', content='...')
+
+    def test_votes_are_set_not_toggled(self):
+        self.assertEqual(cast_vote(self.post, self.voter, UPVOTE), (1, 0, 1))
+        self.assertEqual(cast_vote(self.post, self.voter, UPVOTE), (1, 0, 1))
+        self.assertEqual(cast_vote(self.post, self.voter, DOWNVOTE), (0, 1, -1))
+        self.assertEqual(cast_vote(self.post, self.voter, CLEAR), (0, 0, 0))
+        self.assertFalse(self.post.downvotes.exists())
+
+    def test_rebuild_repairs_drifted_counters(self):
+        cast_vote(self.post, self.author, UPVOTE)
+        cast_vote(self.post, self.voter, DOWNVOTE)
+        Post.objects.filter(pk=self.post.pk).update(upvote_count=9, score=9)
+        rebuild_vote_counts(Post)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.upvote_count, self.post.downvote_count, self.post.score), (1, 1, 0))
+
+    def test_vote_endpoints_require_post(self):
+        self.client.force_login(self.voter)
+        comment = Comment.objects.create(post=self.post, author=self.author, content='...')
+        for url in (reverse('forum:vote_post', args=[self.post.pk]),
+                    reverse('forum:vote_comment', args=[comment.pk])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, {'action': UPVOTE}).status_code, 405)
+                response = self.client.post(url, {'action': UPVOTE})
+                self.assertEqual(response.json(), {'upvotes': 1, 'downvotes': 0, 'score': 1})
+
+    def test_vote_endpoints_check_csrf(self):
+        client = self.client_class(enforce_csrf_checks=True)
+        client.force_login(self.voter)
+        response = client.post(reverse('forum:vote_post', args=[self.post.pk]), {'action': UPVOTE})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(self.post.upvotes.exists())
+
+
+class MediaTests(TestCase):
+    GIF = b'GIF89a' + bytes(26)
+
+    @staticmethod
+    def iso_media(brand):
+        return b'\x00\x00\x00\x18ftyp' + brand + bytes(20)
+
+    def test_types_come_from_leading_bytes(self):
+        self.assertEqual(media.sniff(self.GIF), ('image/gif', 'gif', 'image'))
+        self.assertEqual(media.sniff(self.iso_media(b'isom')), ('video/mp4', 'mp4', 'video'))
+        self.assertEqual(media.sniff(self.iso_media(b'qt  ')), ('video/quicktime', 'mov', 'video'))
+        self.assertIsNone(media.sniff(b'<html><script>'))
+
+    def test_other_iso_media_brands_are_rejected(self):
+        for brand in (b'heic', b'avif', b'mif1'):
+            with self.subTest(brand=brand):
+                self.assertIsNone(media.sniff(self.iso_media(brand)))
+                upload = SimpleUploadedFile('photo.mp4', self.iso_media(brand))
+                with self.assertRaises(ValidationError):
+                    media.validate_upload(upload)
 
-# Create your tests here.
+    def test_same_content_is_stored_once(self):
+        with tempfile.TemporaryDirectory() as root:
+            storage = media.ContentAddressedStorage(location=root)
+            first = storage.save('post_media/cat.png', ContentFile(self.GIF))
+            second = storage.save('comment_media/other.jpg', ContentFile(self.GIF))
+            self.assertEqual(first, second)
+            self.assertTrue(first.startswith('uploads/') and first.endswith('.gif'))
+            stored = [name for _, _, names in os.walk(root) for name in names]
+            self.assertEqual(stored, [os.path.basename(first)])
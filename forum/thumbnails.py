@@ -0,0 +1,45 @@
+"""
+Resized WebP variants of uploaded images.
+
+Runs in the media process pool (see forum/media.py), so it depends only on
+Pillow and the filesystem: no Django settings, models or database access.
+"""
+import os
+
+from PIL import Image, ImageOps
+
+WEBP_QUALITY = 80
+
+
+def variant_path(root, name, width):
+    """Filesystem path of the ``width`` variant of the stored file ``name``."""
+    stem = os.path.splitext(name)[0]
+    return os.path.join(root, 'thumbs', f"{stem}-{width}.webp")
+
+
+def generate_variants(root, name, widths):
+    """
+    Write a WebP copy of ``root/name`` at each width narrower than the image.
+    Returns the widths written. Existing variants are left alone.
+    """
+    written = []
+    with Image.open(os.path.join(root, name)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        for width in sorted(widths):
+            if width >= image.width:
+                break
+            path = variant_path(root, name, width)
+            if os.path.exists(path):
+                written.append(width)
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            # Write under a temporary name so readers never see a half-written file.
+            partial = f"{path}.part"
+            resized.save(partial, 'WEBP', quality=WEBP_QUALITY, method=4)
+            os.replace(partial, path)
+            written.append(width)
+    return written
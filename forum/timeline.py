@@ -0,0 +1,293 @@
+"""
+Home timeline cache for the forum feed.
+
+New posts are pushed (fan-out-on-write) into a bounded list of post ids per
+follower, so rendering the feed is a read of one list plus one query for the
+posts on the page. Authors with more followers than ``FANOUT_LIMIT`` are not
+fanned out; their posts are merged in at read time instead (fan-out-on-read).
+
+The store is pluggable through ``settings.FORUM_TIMELINE['BACKEND']``:
+``LocalTimelineStore`` keeps short-lived timelines in process memory (tests,
+a single worker), ``RedisTimelineStore`` shares them between workers and
+replicas.
+"""
+import bisect
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from users.models import Follow
+from .models import Post
+
+DEFAULTS = {
+    'BACKEND': 'forum.timeline.LocalTimelineStore',
+    'OPTIONS': {},
+    'MAX_LENGTH': 800,
+    'FANOUT_LIMIT': 10000,
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'FORUM_TIMELINE', {})}
+
+
+class LocalTimelineStore:
+    """
+    In-process store: one descending list of post ids per user.
+
+    ``publish()`` only reaches the store of the process that ran it, so with
+    several workers every other process serves a stale feed. Entries
+    therefore expire after ``timeout`` seconds (and are rebuilt from the
+    database on the next read), and only the ``max_users`` most recently
+    used timelines are kept. Use ``RedisTimelineStore`` when more than one
+    process serves requests.
+    """
+
+    def __init__(self, max_length, timeout=60, max_users=10000):
+        self.max_length = max_length
+        self.timeout = timeout
+        self.max_users = max_users
+        # user id -> (expires at, post ids), least recently used first.
+        self._timelines = OrderedDict()
+        # author id -> expires at
+        self._wide_authors = {}
+        self._lock = threading.Lock()
+
+    def _get(self, user_id):
+        entry = self._timelines.get(user_id)
+        if entry is None:
+            return None
+        expires, timeline = entry
+        if expires <= time.monotonic():
+            del self._timelines[user_id]
+            return None
+        self._timelines.move_to_end(user_id)
+        return timeline
+
+    def exists(self, user_id):
+        with self._lock:
+            return self._get(user_id) is not None
+
+    def push(self, user_ids, post_id):
+        with self._lock:
+            for user_id in user_ids:
+                timeline = self._get(user_id)
+                if timeline is None:
+                    # Not built yet; the first read will build it from the database.
+                    continue
+                if post_id not in timeline:
+                    # Kept in descending order, newest first.
+                    timeline.insert(bisect.bisect_left(timeline, -post_id, key=lambda pk: -pk), post_id)
+                    del timeline[self.max_length:]
+
+    def replace(self, user_id, post_ids):
+        with self._lock:
+            self._timelines[user_id] = (
+                time.monotonic() + self.timeout,
+                sorted(post_ids, reverse=True)[:self.max_length],
+            )
+            self._timelines.move_to_end(user_id)
+            while len(self._timelines) > self.max_users:
+                self._timelines.popitem(last=False)
+
+    def read(self, user_id, before=None, limit=20):
+        with self._lock:
+            timeline = self._get(user_id) or []
+        if before is not None:
+            timeline = [pk for pk in timeline if pk < before]
+        return timeline[:limit]
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._timelines.pop(user_id, None)
+
+    def add_wide_author(self, author_id):
+        with self._lock:
+            self._wide_authors[author_id] = time.monotonic() + self.timeout
+
+    def wide_authors(self, author_ids):
+        now = time.monotonic()
+        with self._lock:
+            return {pk for pk in author_ids if self._wide_authors.get(pk, 0) > now}
+
+    def clear(self):
+        with self._lock:
+            self._timelines.clear()
+            self._wide_authors.clear()
+
+
+class RedisTimelineStore:
+    """
+    Shared store on Redis sorted sets (score = post id). Requires the ``redis``
+    package. Timelines expire ``timeout`` seconds after they were built, so
+    those of users who stopped visiting don't stay in memory. Wide-author
+    flags are keys with the same timeout, refreshed on each of the author's
+    posts: a timeline built before a post either expires before the flag
+    does or is rebuilt with the post from the database.
+    """
+
+    # Adds to a timeline only if it is still there, in one atomic step, so a
+    # timeline that expires mid-push isn't recreated without its sentinel and TTL.
+    PUSH_SCRIPT = """
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return 0
+    end
+    redis.call('ZADD', KEYS[1], ARGV[1], ARGV[1])
+    -- Keep the sentinel (score 0) plus the newest max_length ids.
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 1, -tonumber(ARGV[2]) - 2)
+    return 1
+    """
+
+    def __init__(self, max_length, url='redis://127.0.0.1:6379/0', prefix='timeline', timeout=86400):
+        import redis
+
+        self.max_length = max_length
+        self.prefix = prefix
+        self.timeout = timeout
+        self._redis = redis.Redis.from_url(url)
+        self._push = self._redis.register_script(self.PUSH_SCRIPT)
+
+    def _key(self, user_id):
+        return f"{self.prefix}:{user_id}"
+
+    def exists(self, user_id):
+        return bool(self._redis.exists(self._key(user_id)))
+
+    def _wide_key(self, author_id):
+        return f"{self.prefix}:wide:{author_id}"
+
+    def push(self, user_ids, post_id):
+        # Timelines that were never built are left for the first read to build.
+        pipe = self._redis.pipeline(transaction=False)
+        for user_id in user_ids:
+            self._push(keys=[self._key(user_id)], args=[post_id, self.max_length], client=pipe)
+        pipe.execute()
+
+    def replace(self, user_id, post_ids):
+        key = self._key(user_id)
+        pipe = self._redis.pipeline()
+        pipe.delete(key)
+        # A sentinel member marks the timeline as built even when it is empty.
+        pipe.zadd(key, {0: 0, **{pk: pk for pk in post_ids[:self.max_length]}})
+        pipe.expire(key, self.timeout)
+        pipe.execute()
+
+    def read(self, user_id, before=None, limit=20):
+        upper = f"({before}" if before is not None else '+inf'
+        ids = self._redis.zrevrangebyscore(self._key(user_id), upper, '(0', start=0, num=limit)
+        return [int(pk) for pk in ids]
+
+    def invalidate(self, user_id):
+        self._redis.delete(self._key(user_id))
+
+    def add_wide_author(self, author_id):
+        self._redis.set(self._wide_key(author_id), 1, ex=self.timeout)
+
+    def wide_authors(self, author_ids):
+        author_ids = list(author_ids)
+        if not author_ids:
+            return set()
+        flags = self._redis.mget([self._wide_key(pk) for pk in author_ids])
+        return {pk for pk, flag in zip(author_ids, flags) if flag is not None}
+
+    def clear(self):
+        for key in self._redis.scan_iter(f"{self.prefix}:*"):
+            self._redis.delete(key)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = _config()
+                backend = import_string(config['BACKEND'])
+                _store = backend(config['MAX_LENGTH'], **config['OPTIONS'])
+    return _store
+
+
+def followed_user_ids(user):
+    return list(
+        Follow.objects.filter(follower__user=user).values_list('followed__user_id', flat=True)
+    )
+
+
+def follower_user_ids(user):
+    return Follow.objects.filter(followed__user=user).values_list('follower__user_id', flat=True)
+
+
+def publish(post):
+    """Fan a freshly created post out to its author's followers' timelines."""
+    store = get_store()
+    followers = follower_user_ids(post.author)
+    if followers[:_config()['FANOUT_LIMIT'] + 1].count() > _config()['FANOUT_LIMIT']:
+        # Too many followers to write to; readers pull this author's posts instead.
+        store.add_wide_author(post.author_id)
+        followers = []
+    store.push([post.author_id, *followers], post.id)
+
+
+def _build(user, store, author_ids):
+    limit = _config()['MAX_LENGTH']
+    post_ids = list(
+        Post.objects.filter(author_id__in=[user.id, *author_ids])
+        .order_by('-id')
+        .values_list('id', flat=True)[:limit]
+    )
+    store.replace(user.id, post_ids)
+
+
+def _recent_ids(author_ids, before, limit):
+    recent = Post.objects.order_by('-id')
+    if author_ids is not None:
+        recent = recent.filter(author_id__in=author_ids)
+    if before is not None:
+        recent = recent.filter(id__lt=before)
+    return list(recent.values_list('id', flat=True)[:limit])
+
+
+def home_timeline(user, before=None, limit=20, author_ids=None):
+    """
+    Return ``(posts, next_cursor)`` for ``user``'s feed: the newest ``limit``
+    posts by people they follow (and themselves) with an id below ``before``.
+    Users who follow nobody get the newest posts from everyone. Pass
+    ``author_ids`` when the caller already has the followed user ids.
+    """
+    store = get_store()
+    if author_ids is None:
+        author_ids = followed_user_ids(user)
+    if not author_ids:
+        post_ids = _recent_ids(None, before, limit + 1)
+    else:
+        if not store.exists(user.id):
+            _build(user, store, author_ids)
+        post_ids = store.read(user.id, before=before, limit=limit + 1)
+        if len(post_ids) <= limit:
+            # Paged past the cached window (or it is short): read the rest from the database.
+            older_than = post_ids[-1] if post_ids else before
+            post_ids += _recent_ids([user.id, *author_ids], older_than, limit + 1 - len(post_ids))
+        wide = store.wide_authors(author_ids)
+        if wide:
+            post_ids = sorted(
+                set(post_ids).union(_recent_ids(wide, before, limit + 1)), reverse=True
+            )[:limit + 1]
+
+    next_cursor = None
+    if len(post_ids) > limit:
+        post_ids = post_ids[:limit]
+        next_cursor = post_ids[-1]
+    posts = Post.objects.select_related('author').in_bulk(post_ids)
+    # Deleted posts simply drop out of the page.
+    return [posts[pk] for pk in post_ids if pk in posts], next_cursor
+
+
+def invalidate(user):
+    """Forget ``user``'s timeline, e.g. after they follow someone; it is rebuilt on the next read."""
+    get_store().invalidate(user.id)
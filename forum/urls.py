@@ -12,16 +12,22 @@ urlpatterns = [
     path('edit-post/<int:post_id>/', views.edit_post, name='edit_post'),
     path('delete-post/<int:post_id>/', views.delete_post, name='delete_post'),
     path("post/<int:post_id>/comment/", views.add_comment, name="add_comment"),
+    path("comment/<int:comment_id>/replies/", views.comment_replies, name="comment_replies"),
     path('post/<int:post_id>/vote/', views.vote_post, name='vote_post'),
+    path('comment/<int:comment_id>/vote/', views.vote_comment, name='vote_comment'),
 
     # Follow User
     path('follow/<int:user_id>/', views.follow_user, name='follow_user'),
+    path('unfollow/<int:user_id>/', views.unfollow_user, name='unfollow_user'),
     # Notifications
     path("notifications/", views.notifications, name="notifications"),
     path("notifications/<int:notification_id>/read/", views.mark_as_read, name="mark_as_read"),
+    path("notifications/read/", views.mark_notifications_read, name="mark_notifications_read"),
 
     # Messaging
     path("messages/", views.inbox, name="inbox"),
     path("messages/<str:username>/", views.chat_room, name="chat_room"),
+    path("conversations/<int:conversation_id>/messages/", views.message_history, name="message_history"),
+    path("conversations/<int:conversation_id>/read/", views.mark_conversation_read, name="mark_conversation_read"),
     path('profile/<str:username>/', views.profile_view, name='profile_view'),
 ]
\ No newline at end of file
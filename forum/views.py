@@ -2,10 +2,25 @@ from django.contrib import messages
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from .models import Post, Comment, Notification, Conversation, Message, User
+from django.views.decorators.http import condition, require_POST
+from .models import Post, Comment, User
 from users.models import Profile
 from .forms import PostForm, CommentForm
+from .votes import VOTE_ACTIONS, cast_vote
+from .comment_tree import load_post_threads, load_subtree, threads_version
+from . import messaging, timeline
+from .notifications import mark_read, notification_page, notify_comment, unread_count
 from users.forms import ProfileForm
+from users import follows
+from users.recommendations import suggestions_for
+from PublicBridge.conditional import personal_etag
+
+def _post_detail_etag(request, post_id):
+    updated_at = Post.objects.filter(id=post_id).values_list("updated_at", flat=True).first()
+    if updated_at is None:
+        return None
+    unread = unread_count(request.user.id) if request.user.is_authenticated else 0
+    return personal_etag(request, post_id, updated_at, threads_version(post_id), unread)
 
 # Profile View
 @login_required
@@ -34,6 +49,7 @@ def profile_view(request, username=None):
         'profile': profile,
         'posts': user_posts,
         'is_own_profile': user == request.user,
+        'is_following': user != request.user and follows.is_following(request.user, user),
     })
 
 # Create a Post
@@ -45,6 +61,7 @@ def create_post(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            timeline.publish(post)
             messages.success(request, 'Post created successfully!')
             return redirect("forum:feed")
     else:
@@ -76,16 +93,26 @@ def delete_post(request, post_id):
     return render(request, 'forum/delete_post.html', {'post': post})
 
 # Post Detail
+@condition(etag_func=_post_detail_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.filter(parent_comment__isnull=True).order_by("-created_at")
+    post = get_object_or_404(Post.objects.select_related("author"), id=post_id)
+    comments, next_cursor = load_post_threads(post, request.GET.get("cursor"))
     comment_form = CommentForm()
     return render(request, "forum/post_detail.html", {
         "post": post,
         "comments": comments,
+        "threads_version": threads_version(post.id),
+        "next_comments_cursor": next_cursor,
         "comment_form": comment_form
     })
 
+# Load More Replies (?after=<id of the last direct reply already shown>)
+def comment_replies(request, comment_id):
+    comment = get_object_or_404(Comment, id=comment_id)
+    after = request.GET.get("after")
+    replies = load_subtree(comment, after=int(after) if after and after.isdigit() else None)
+    return render(request, "forum/comment_replies.html", {"comment": comment, "replies": replies})
+
 # Add Comment or Reply
 @login_required
 def add_comment(request, post_id):
@@ -99,82 +126,162 @@ def add_comment(request, post_id):
             parent_id = request.POST.get("parent_id")
             if parent_id:
                 try:
-                    parent_comment = Comment.objects.get(id=parent_id)
+                    parent_comment = Comment.objects.select_related("author").get(id=parent_id, post=post)
                     comment.parent_comment = parent_comment
                 except Comment.DoesNotExist:
                     return redirect("forum:post_detail", post_id=post.id)
             comment.save()
-            recipient = comment.parent_comment.author if comment.parent_comment else post.author
-            if recipient != request.user:
-                Notification.objects.create(
-                    user=recipient,
-                    message=f"{request.user.username} commented on your post."
-                )
+            notify_comment(comment)
             return redirect("forum:post_detail", post_id=post.id)
     return redirect("forum:post_detail", post_id=post.id)
 
 # Upvote or Downvote Post
 @login_required
+@require_POST
 def vote_post(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    action = request.GET.get("action")
-    if action == "upvote":
-        post.upvotes.add(request.user)
-        post.downvotes.remove(request.user)
-    elif action == "downvote":
-        post.downvotes.add(request.user)
-        post.upvotes.remove(request.user)
+    return _vote(request, post)
+
+# Upvote or Downvote Comment
+@login_required
+@require_POST
+def vote_comment(request, comment_id):
+    comment = get_object_or_404(Comment, id=comment_id)
+    return _vote(request, comment)
+
+def _vote(request, obj):
+    action = request.POST.get("action")
+    if action not in VOTE_ACTIONS:
+        return JsonResponse({"status": "error", "message": "Unknown vote action."}, status=400)
+    upvotes, downvotes, score = cast_vote(obj, request.user, action)
     return JsonResponse({
-        "upvotes": post.upvotes.count(),
-        "downvotes": post.downvotes.count(),
+        "upvotes": upvotes,
+        "downvotes": downvotes,
+        "score": score,
     })
 
 # Notifications
 @login_required
 def notifications(request):
-    notifications = request.user.notifications.filter(is_read=False).order_by("-created_at")
-    return render(request, "forum/notifications.html", {"notifications": notifications})
+    show_all = request.GET.get("show") == "all"
+    notifications, next_cursor = notification_page(
+        request.user, cursor=request.GET.get("cursor"), unread_only=not show_all
+    )
+    return render(request, "forum/notifications.html", {
+        "notifications": notifications,
+        "next_cursor": next_cursor,
+        "show_all": show_all,
+    })
 
 @login_required
 def mark_as_read(request, notification_id):
-    notification = get_object_or_404(Notification, id=notification_id, user=request.user)
-    notification.is_read = True
-    notification.save()
-    return redirect("notifications")
+    mark_read(request.user, [notification_id])
+    return redirect("forum:notifications")
+
+# Mark several (POST ids) or all (no ids) notifications read in one UPDATE
+@login_required
+@require_POST
+def mark_notifications_read(request):
+    ids = request.POST.getlist("ids")
+    if any(not notification_id.isdigit() for notification_id in ids):
+        return JsonResponse({"status": "error", "message": "ids must be integers."}, status=400)
+    marked = mark_read(request.user, [int(notification_id) for notification_id in ids] if ids else None)
+    return JsonResponse({"status": "success", "marked": marked, "unread_count": unread_count(request.user.id)})
 
 # Inbox
 @login_required
 def inbox(request):
-    conversations = request.user.conversations.all().order_by("-last_updated")
+    conversations = messaging.inbox_conversations(request.user).prefetch_related("participants")
     return render(request, "forum/inbox.html", {"conversations": conversations})
 
+# Message history (JSON, newest page first, older pages via ?before=<message id>)
+@login_required
+def message_history(request, conversation_id):
+    if not messaging.is_participant(conversation_id, request.user):
+        return JsonResponse({"status": "error", "message": "You are not part of this conversation."}, status=403)
+    before = request.GET.get("before")
+    limit = request.GET.get("limit")
+    if (before and not before.isdigit()) or (limit and not limit.isdigit()):
+        return JsonResponse({"status": "error", "message": "before and limit must be integers."}, status=400)
+    messages_page, next_before = messaging.message_history(
+        conversation_id,
+        before=int(before) if before else None,
+        limit=int(limit) if limit else messaging.HISTORY_PAGE_SIZE,
+    )
+    return JsonResponse({
+        "messages": [
+            {
+                "id": message.id,
+                "sender": message.sender.username,
+                "content": message.content,
+                "timestamp": message.timestamp.isoformat(),
+            }
+            for message in messages_page
+        ],
+        "next_before": next_before,
+        "read_positions": {
+            str(user_id): position
+            for user_id, position in messaging.read_positions(conversation_id).items()
+        },
+    })
+
+# Read receipt
+@login_required
+@require_POST
+def mark_conversation_read(request, conversation_id):
+    if not messaging.is_participant(conversation_id, request.user):
+        return JsonResponse({"status": "error", "message": "You are not part of this conversation."}, status=403)
+    message_id = request.POST.get("message_id")
+    if message_id and not message_id.isdigit():
+        return JsonResponse({"status": "error", "message": "message_id must be an integer."}, status=400)
+    position = messaging.mark_read(conversation_id, request.user, int(message_id) if message_id else None)
+    return JsonResponse({"status": "success", "last_read_message_id": position})
+
 # Chat Room
 @login_required
 def chat_room(request, username):
     other_user = get_object_or_404(User, username=username)
-    conversation, created = Conversation.objects.get_or_create(participants=request.user)
+    if other_user == request.user:
+        messages.error(request, "You cannot start a conversation with yourself.")
+        return redirect("forum:inbox")
+    conversation, created = messaging.direct_conversation(request.user, other_user)
     return render(request, "forum/chat_room.html", {"conversation": conversation, "other_user": other_user})
 
 # Follow User
 @login_required
+@require_POST
 def follow_user(request, user_id):
     user_to_follow = get_object_or_404(User, id=user_id)
     if user_to_follow == request.user:
         return JsonResponse({"status": "error", "message": "You cannot follow yourself."}, status=400)
-    user_profile = request.user.profile
-    if user_to_follow.profile in user_profile.following.all():
+    if not follows.follow(request.user, user_to_follow):
         return JsonResponse({"status": "error", "message": f"You are already following {user_to_follow.username}."}, status=400)
-    user_profile.following.add(user_to_follow.profile)
+    timeline.invalidate(request.user)
     return JsonResponse({"status": "success", "message": f"You are now following {user_to_follow.username}."})
 
+# Unfollow User
+@login_required
+@require_POST
+def unfollow_user(request, user_id):
+    user_to_unfollow = get_object_or_404(User, id=user_id)
+    if not follows.unfollow(request.user, user_to_unfollow):
+        return JsonResponse({"status": "error", "message": f"You are not following {user_to_unfollow.username}."}, status=400)
+    timeline.invalidate(request.user)
+    return JsonResponse({"status": "success", "message": f"You have unfollowed {user_to_unfollow.username}."})
+
 # Feed
 @login_required
 def feed(request):
-    profile, created = Profile.objects.get_or_create(user=request.user)
-    following = profile.following.all()
-    if following.exists():
-        posts = Post.objects.filter(author__in=following).order_by("-created_at")
-    else:
-        posts = Post.objects.all().order_by("-created_at")[:20]
-    suggested_users = User.objects.exclude(id__in=following.values_list('id', flat=True)).exclude(id=request.user.id)[:5]
-    return render(request, "forum/feed.html", {"posts": posts, "suggested_users": suggested_users})
+    before = request.GET.get("before")
+    following_ids = timeline.followed_user_ids(request.user)
+    posts, next_cursor = timeline.home_timeline(
+        request.user,
+        before=int(before) if before and before.isdigit() else None,
+        author_ids=following_ids,
+    )
+    suggested_users = suggestions_for(request.user)
+    return render(request, "forum/feed.html", {
+        "posts": posts,
+        "next_cursor": next_cursor,
+        "suggested_users": suggested_users,
+    })
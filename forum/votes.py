@@ -0,0 +1,108 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .comment_tree import expire_threads
+from .models import Comment
+
+UPVOTE = 'upvote'
+DOWNVOTE = 'downvote'
+CLEAR = 'clear'
+VOTE_ACTIONS = (UPVOTE, DOWNVOTE, CLEAR)
+
+
+def _through_filter(model, field, obj, user):
+    relation = model._meta.get_field(field)
+    through = relation.remote_field.through
+    # Through-table column names: "<model>_id" and "user_id".
+    source = relation.m2m_column_name()
+    target = relation.m2m_reverse_name()
+    return through, {source: obj.pk, target: user.pk}
+
+
+def _remove(model, field, obj, user):
+    through, lookup = _through_filter(model, field, obj, user)
+    deleted, _ = through.objects.filter(**lookup).delete()
+    return 1 if deleted else 0
+
+
+def _add(model, field, obj, user):
+    through, lookup = _through_filter(model, field, obj, user)
+    try:
+        # The savepoint lets a duplicate (a concurrent double-click) fail alone.
+        with transaction.atomic():
+            through.objects.create(**lookup)
+    except IntegrityError:
+        return 0
+    return 1
+
+
+def cast_vote(obj, user, action):
+    """
+    Record ``user``'s vote on a Post or Comment and keep its counters in step.
+
+    ``action`` sets the vote rather than flipping it, so repeating a request is a
+    no-op; switching from up to down (or clearing) moves the user's vote between
+    the M2M tables. Counter deltas come from the rows actually inserted or
+    deleted, and are applied with F() expressions, all in one transaction.
+    Returns ``(upvote_count, downvote_count, score)``.
+    """
+    if action not in VOTE_ACTIONS:
+        raise ValueError(f"Unknown vote action: {action!r}")
+
+    model = type(obj)
+    with transaction.atomic():
+        up_delta = down_delta = 0
+        if action == UPVOTE:
+            down_delta -= _remove(model, 'downvotes', obj, user)
+            up_delta += _add(model, 'upvotes', obj, user)
+        elif action == DOWNVOTE:
+            up_delta -= _remove(model, 'upvotes', obj, user)
+            down_delta += _add(model, 'downvotes', obj, user)
+        else:
+            up_delta -= _remove(model, 'upvotes', obj, user)
+            down_delta -= _remove(model, 'downvotes', obj, user)
+
+        if up_delta or down_delta:
+            # updated_at moves too, so cached fragments keyed on it refresh.
+            model.objects.filter(pk=obj.pk).update(
+                upvote_count=F('upvote_count') + up_delta,
+                downvote_count=F('downvote_count') + down_delta,
+                score=F('score') + up_delta - down_delta,
+                updated_at=timezone.now(),
+            )
+            if model is Comment:
+                expire_threads(obj.post_id)
+        counts = model.objects.filter(pk=obj.pk).values_list(
+            'upvote_count', 'downvote_count', 'score'
+        ).get()
+
+    obj.upvote_count, obj.downvote_count, obj.score = counts
+    return counts
+
+
+def _count_subquery(model, field):
+    relation = model._meta.get_field(field)
+    through = relation.remote_field.through
+    source = relation.m2m_field_name()
+    return Coalesce(
+        Subquery(
+            through.objects.filter(**{source: OuterRef('pk')})
+            .order_by()
+            .values(source)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def rebuild_vote_counts(model):
+    """Recompute every row's counters from the M2M tables with a single UPDATE."""
+    return model.objects.update(
+        upvote_count=_count_subquery(model, 'upvotes'),
+        downvote_count=_count_subquery(model, 'downvotes'),
+        score=_count_subquery(model, 'upvotes') - _count_subquery(model, 'downvotes'),
+    )
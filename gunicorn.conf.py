@@ -0,0 +1,37 @@
+"""
+Gunicorn settings for production: ``gunicorn -c gunicorn.conf.py``.
+
+By default each worker is a uvicorn (ASGI) worker, so the chat websockets
+work. Uvicorn ignores ``threads``: Django runs every sync view of a worker
+in one thread-sensitive executor, so each worker serves one view at a time
+and holds at most one database connection for it. Scale with
+WEB_CONCURRENCY, and keep DB_POOL_MAX_SIZE small (deployment.yaml uses 2).
+Set GUNICORN_WORKER_CLASS=gthread to run the plain WSGI app with
+GUNICORN_THREADS threads per worker instead (no websockets; serve those
+from a separate uvicorn deployment).
+
+More than one worker needs the shared backends configured: CACHE_URL,
+CHANNEL_REDIS_URL and TIMELINE_REDIS_URL pointing at Redis (deployment.yaml
+does this), and MEDIA_ROOT on storage every worker can read. Without
+CACHE_URL the process-local defaults only hold up with WEB_CONCURRENCY=1.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn_worker.UvicornWorker')
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# Recycle workers now and then to bound memory growth; jitter avoids restarting all at once.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+accesslog = '-'
+errorlog = '-'
+
+if 'uvicorn' in worker_class.lower():
+    wsgi_app = 'PublicBridge.asgi:application'
+else:
+    wsgi_app = 'PublicBridge.wsgi:application'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
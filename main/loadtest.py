@@ -0,0 +1,437 @@
+"""
+A small asyncio load driver for a running server (see the ``load_test`` command).
+
+Each virtual user is a coroutine with its own keep-alive connection and
+cookies, signed in as one of the accounts ``generate_data`` created, looping
+through a scenario until the run ends:
+
+* ``citizen_browsing``: feed, posts and their threads, own reports,
+  notifications, and the odd vote;
+* ``admin_triage``: the filtered report queue, bulk status transitions,
+  analytics and a CSV export page;
+* ``chat_burst``: opens a conversation's WebSocket, sends a burst of
+  messages and times each one's echo, then loads the history.
+
+The HTTP/1.1 and WebSocket clients are deliberately minimal (no TLS
+verification options, no redirects followed, no fragmented frames): enough
+to drive this application, with nothing to install.
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+import ssl
+import struct
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.urls import reverse
+
+from . import seeding
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class Session:
+    """One keep-alive HTTP/1.1 connection with a cookie jar."""
+
+    def __init__(self, base_url):
+        parsed = urlsplit(base_url)
+        self.base_url = base_url.rstrip('/')
+        self.host = parsed.hostname
+        self.netloc = parsed.netloc
+        self.tls = parsed.scheme == 'https'
+        self.port = parsed.port or (443 if self.tls else 80)
+        self.cookies = {}
+        self.reader = self.writer = None
+
+    async def _open(self):
+        return await asyncio.open_connection(self.host, self.port, ssl=ssl.create_default_context() if self.tls else None)
+
+    def _cookie_header(self):
+        return '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+
+    def _store_cookies(self, values):
+        for value in values:
+            for name, morsel in SimpleCookie(value).items():
+                if morsel.value and morsel['max-age'] != '0':
+                    self.cookies[name] = morsel.value
+                else:
+                    self.cookies.pop(name, None)
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, data=None, json_body=None, ajax=True, **kwargs):
+        headers = kwargs.pop('headers', {})
+        if ajax and 'csrftoken' in self.cookies:
+            headers['X-CSRFToken'] = self.cookies['csrftoken']
+        return await self.request('POST', path, data=data, json_body=json_body, headers=headers, **kwargs)
+
+    async def request(self, method, path, data=None, json_body=None, headers=None):
+        body = b''
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.netloc}',
+            'Accept-Encoding: identity',
+            'Connection: keep-alive',
+        ]
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            lines.append('Content-Type: application/json')
+        elif data is not None:
+            body = urlencode(data, doseq=True).encode()
+            lines.append('Content-Type: application/x-www-form-urlencoded')
+        if body or method == 'POST':
+            lines.append(f'Content-Length: {len(body)}')
+        if self.cookies:
+            lines.append(f'Cookie: {self._cookie_header()}')
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        payload = ('\r\n'.join(lines) + '\r\n\r\n').encode() + body
+
+        # A keep-alive connection the server has since closed fails on first
+        # use; reconnect once.
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await self._open()
+            try:
+                self.writer.write(payload)
+                await self.writer.drain()
+                return await self._read_response(method)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _read_response(self, method):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        status = int(status_line.split()[1])
+        headers, cookies = await _read_headers(self.reader)
+        self._store_cookies(cookies)
+
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await _read_chunked(self.reader)
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return Response(status, headers, body)
+
+    async def websocket(self, path):
+        """Open a WebSocket at ``path`` with this session's cookies."""
+        reader, writer = await self._open()
+        key = base64.b64encode(os.urandom(16)).decode()
+        lines = [
+            f'GET {path} HTTP/1.1',
+            f'Host: {self.netloc}',
+            'Upgrade: websocket',
+            'Connection: Upgrade',
+            f'Sec-WebSocket-Key: {key}',
+            'Sec-WebSocket-Version: 13',
+            f'Origin: {self.base_url}',
+        ]
+        if self.cookies:
+            lines.append(f'Cookie: {self._cookie_header()}')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+        await writer.drain()
+        status_line = await reader.readline()
+        await _read_headers(reader)
+        if not status_line or int(status_line.split()[1]) != 101:
+            writer.close()
+            raise ConnectionError(f"WebSocket handshake failed: {status_line.decode().strip()!r}")
+        return WebSocket(reader, writer)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+        self.reader = self.writer = None
+
+
+async def _read_headers(reader):
+    headers, cookies = {}, []
+    while True:
+        line = (await reader.readline()).decode('latin-1').rstrip('\r\n')
+        if not line:
+            return headers, cookies
+        name, _, value = line.partition(':')
+        name, value = name.strip().lower(), value.strip()
+        if name == 'set-cookie':
+            cookies.append(value)
+        headers[name] = value
+
+
+async def _read_chunked(reader):
+    chunks = []
+    while True:
+        size = int((await reader.readline()).split(b';')[0], 16)
+        if not size:
+            await _read_headers(reader)  # trailers
+            return b''.join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
+
+
+class WebSocket:
+    """Client side of RFC 6455: masked text frames out, unfragmented frames in."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def _send_frame(self, opcode, payload):
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header.append(0x80 | length)
+        elif length < 1 << 16:
+            header += bytes([0x80 | 126]) + struct.pack('!H', length)
+        else:
+            header += bytes([0x80 | 127]) + struct.pack('!Q', length)
+        mask = os.urandom(4)
+        self.writer.write(bytes(header) + mask + bytes(byte ^ mask[n % 4] for n, byte in enumerate(payload)))
+        await self.writer.drain()
+
+    async def send_text(self, text):
+        await self._send_frame(0x1, text.encode())
+
+    async def receive_text(self):
+        while True:
+            first, second = await self.reader.readexactly(2)
+            opcode, length = first & 0x0F, second & 0x7F
+            if length == 126:
+                length = struct.unpack('!H', await self.reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack('!Q', await self.reader.readexactly(8))[0]
+            mask = await self.reader.readexactly(4) if second & 0x80 else None
+            payload = await self.reader.readexactly(length)
+            if mask:
+                payload = bytes(byte ^ mask[n % 4] for n, byte in enumerate(payload))
+            if opcode == 0x1:
+                return payload.decode()
+            if opcode == 0x8:
+                raise ConnectionError("WebSocket closed by server")
+            if opcode == 0x9:
+                await self._send_frame(0xA, payload)
+
+    async def close(self):
+        try:
+            await self._send_frame(0x8, b'')
+        except ConnectionError:
+            pass
+        self.writer.close()
+
+
+class Recorder:
+    """Latencies and failures per request name."""
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def timed(self, name, request, ok=lambda response: response.status < 400):
+        started = time.perf_counter()
+        try:
+            response = await request
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            self.errors[name] += 1
+            return None
+        self.timings[name].append(time.perf_counter() - started)
+        if not ok(response):
+            self.errors[name] += 1
+        return response
+
+    def record(self, name, seconds):
+        self.timings[name].append(seconds)
+
+    def fail(self, name):
+        self.errors[name] += 1
+
+    def summary(self, elapsed):
+        rows = {}
+        for name in sorted(set(self.timings) | set(self.errors)):
+            samples = sorted(self.timings[name])
+            rows[name] = {
+                'requests': len(samples),
+                'errors': self.errors[name],
+                'rps': round(len(samples) / elapsed, 2),
+                **{
+                    f'p{percent}_ms': round(_percentile(samples, percent) * 1000, 2) if samples else None
+                    for percent in (50, 95, 99)
+                },
+                'max_ms': round(samples[-1] * 1000, 2) if samples else None,
+            }
+        total = sum(row['requests'] for row in rows.values())
+        return {
+            'elapsed_s': round(elapsed, 2),
+            'requests': total,
+            'errors': sum(row['errors'] for row in rows.values()),
+            'rps': round(total / elapsed, 2),
+            'endpoints': rows,
+        }
+
+
+def _percentile(ordered, percent):
+    return ordered[min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))]
+
+
+class Plan:
+    """What the scenarios work on, looked up in the database before the run starts."""
+
+    def __init__(self, rng, citizens, admins, post_ids, report_ids, conversations):
+        self.rng = rng
+        self.citizens = citizens
+        self.admins = admins
+        self.posts = seeding.Skewed(rng, post_ids) if post_ids else None
+        self.report_ids = report_ids
+        self.conversations = conversations
+
+
+async def login(session, recorder, username):
+    await recorder.timed('login page', session.get(reverse('login')))
+    response = await recorder.timed('login', session.post(reverse('login'), data={
+        'username': username,
+        'password': seeding.PASSWORD,
+        'csrfmiddlewaretoken': session.cookies.get('csrftoken', ''),
+    }, ajax=False), ok=lambda response: response.status == 302)
+    return response is not None and response.status == 302
+
+
+async def citizen_browsing(session, recorder, plan, think):
+    await recorder.timed('feed', session.get(reverse('forum:feed')))
+    if plan.posts is not None:
+        for post_id in plan.posts.sample(plan.rng.randint(1, 4)):
+            await think()
+            await recorder.timed('post detail', session.get(reverse('forum:post_detail', args=[post_id])))
+            if plan.rng.random() < 0.2:
+                await recorder.timed('vote post', session.post(
+                    reverse('forum:vote_post', args=[post_id]), data={'action': plan.rng.choice(['upvote', 'downvote'])}
+                ))
+    await think()
+    await recorder.timed('my reports', session.get(reverse('user_reports')))
+    await think()
+    await recorder.timed('notifications', session.get(reverse('forum:notifications')))
+    await think()
+
+
+async def admin_triage(session, recorder, plan, think):
+    status = plan.rng.choice(['pending', 'under_review'])
+    await recorder.timed('report queue', session.get(f"{reverse('manage_reports')}?status={status}"))
+    await think()
+    if plan.report_ids:
+        ids = plan.rng.sample(plan.report_ids, min(20, len(plan.report_ids)))
+        await recorder.timed('bulk transition', session.post(reverse('bulk_update_reports'), json_body={
+            'ids': ids, 'action': 'transition', 'status': plan.rng.choice(['under_review', 'resolved', 'pending']),
+        }))
+        await think()
+        await recorder.timed('report detail', session.get(reverse('report_details', args=[plan.rng.choice(ids)])))
+        await think()
+    await recorder.timed('analytics', session.get(reverse('analytics_view')))
+    await think()
+    await recorder.timed('export page', session.get(f"{reverse('export_reports_to_csv')}?limit=500"))
+    await think()
+
+
+async def chat_burst(session, recorder, plan, think, conversation, burst=20):
+    conversation_id, other_username = conversation
+    await recorder.timed('chat room', session.get(reverse('forum:chat_room', args=[other_username])))
+    try:
+        started = time.perf_counter()
+        socket = await session.websocket(f'/ws/messages/{conversation_id}/')
+        recorder.record('ws connect', time.perf_counter() - started)
+    except (OSError, asyncio.IncompleteReadError, ValueError):
+        recorder.fail('ws connect')
+        await think()
+        return
+    try:
+        token = os.urandom(4).hex()
+        sent = {}
+        for seq in range(burst):
+            content = f'load {token} {seq}'
+            sent[content] = time.perf_counter()
+            await socket.send_text(json.dumps({'message': content}))
+        # The group echoes every message back to its sender, maybe interleaved with the other side's.
+        while sent:
+            event = json.loads(await asyncio.wait_for(socket.receive_text(), timeout=10))
+            began = sent.pop(event.get('message'), None)
+            if began is not None:
+                recorder.record('ws message echo', time.perf_counter() - began)
+    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+        recorder.fail('ws message echo')
+    finally:
+        await socket.close()
+    await think()
+    await recorder.timed('message history', session.get(reverse('forum:message_history', args=[conversation_id])))
+    await think()
+
+
+async def virtual_user(number, scenario, base_url, plan, recorder, deadline, think_time, ramp_up):
+    rng = random.Random(number)
+    await asyncio.sleep(ramp_up * rng.random())
+
+    async def think():
+        if think_time:
+            await asyncio.sleep(rng.uniform(0, 2 * think_time))
+
+    session = Session(base_url)
+    conversation = None
+    if scenario == 'admin_triage':
+        username = plan.admins[number % len(plan.admins)]
+    elif scenario == 'chat_burst':
+        username, *conversation = plan.conversations[number % len(plan.conversations)]
+    else:
+        username = plan.citizens[number % len(plan.citizens)]
+    try:
+        if not await login(session, recorder, username):
+            return
+        while time.monotonic() < deadline:
+            if scenario == 'citizen_browsing':
+                await citizen_browsing(session, recorder, plan, think)
+            elif scenario == 'admin_triage':
+                await admin_triage(session, recorder, plan, think)
+            else:
+                await chat_burst(session, recorder, plan, think, conversation)
+    finally:
+        await session.close()
+
+
+async def run(base_url, plan, mix, duration, think_time, ramp_up):
+    """Run ``mix`` ({scenario: virtual users}) for ``duration`` seconds. Returns the summary."""
+    recorder = Recorder()
+    started = time.perf_counter()
+    deadline = time.monotonic() + ramp_up + duration
+    number = 0
+    tasks = []
+    for scenario, users in mix.items():
+        for _ in range(users):
+            tasks.append(virtual_user(number, scenario, base_url, plan, recorder, deadline, think_time, ramp_up))
+            number += 1
+    await asyncio.gather(*tasks)
+    summary = recorder.summary(time.perf_counter() - started)
+    summary['virtual_users'] = dict(mix)
+    return summary
@@ -0,0 +1,89 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+TABLE = 'benchmark_db_writes'
+
+
+def _worker(worker, transactions, rows, read_every, latencies, errors, start):
+    try:
+        start.wait()
+        for seq in range(transactions):
+            began = time.perf_counter()
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    if read_every and seq % read_every == 0:
+                        cursor.execute(f"SELECT COUNT(*) FROM {TABLE} WHERE worker = %s", [worker])
+                    cursor.executemany(
+                        f"INSERT INTO {TABLE} (worker, seq, payload) VALUES (%s, %s, %s)",
+                        [(worker, seq, f"payload-{worker}-{seq}-{row}") for row in range(rows)],
+                    )
+            except OperationalError:
+                errors.append(worker)
+                continue
+            latencies.append(time.perf_counter() - began)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure write throughput of the default database under concurrent writers, "
+        f"using a scratch table ({TABLE}) that is dropped afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent writers.")
+        parser.add_argument('--transactions', type=int, default=200, help="Transactions per writer.")
+        parser.add_argument('--rows', type=int, default=1, help="Rows inserted per transaction.")
+        parser.add_argument('--read-every', type=int, default=0,
+                            help="Also run a SELECT in every Nth transaction (0: writes only).")
+
+    def handle(self, *args, **options):
+        threads, transactions, rows = options['threads'], options['transactions'], options['rows']
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            cursor.execute(
+                f"CREATE TABLE {TABLE} (worker INTEGER NOT NULL, seq INTEGER NOT NULL, payload VARCHAR(64) NOT NULL)"
+            )
+            if connection.vendor == 'sqlite':
+                cursor.execute("PRAGMA journal_mode")
+                self.stdout.write(f"SQLite journal_mode={cursor.fetchone()[0]}")
+        connection.close()
+
+        latencies, errors = [], []
+        start = threading.Barrier(threads + 1)
+        workers = [
+            threading.Thread(
+                target=_worker,
+                args=(number, transactions, rows, options['read_every'], latencies, errors, start),
+            )
+            for number in range(threads)
+        ]
+        for thread in workers:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+        committed = len(latencies)
+        self.stdout.write(f"{connection.vendor}: {threads} writers x {transactions} transactions x {rows} rows")
+        if committed:
+            milliseconds = sorted(latency * 1000 for latency in latencies)
+            centiles = statistics.quantiles(milliseconds, n=100) if committed > 1 else milliseconds * 99
+            self.stdout.write(
+                f"latency ms: p50 {centiles[49]:.2f}  p95 {centiles[94]:.2f}  "
+                f"p99 {centiles[98]:.2f}  max {milliseconds[-1]:.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{committed} transactions ({committed * rows} rows) in {elapsed:.2f}s: "
+            f"{committed / elapsed:.0f} tx/s, {committed * rows / elapsed:.0f} rows/s, {len(errors)} failed."
+        ))
@@ -0,0 +1,158 @@
+import inspect
+import multiprocessing
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+MODELS = ['reports', 'anonymous_reports', 'posts', 'comments', 'follows', 'messages', 'notifications']
+
+
+def _setup_worker():
+    import django
+    django.setup()
+
+
+def _run_chunk(kind, name, seed, kwargs):
+    """Run one ``main.seeding`` generator in a worker. Returns (kind, rows created)."""
+    from main import seeding
+
+    generator = getattr(seeding, name)
+    if 'rng' in inspect.signature(generator).parameters:
+        kwargs['rng'] = random.Random(seed)
+    result = generator(**kwargs)
+    return kind, len(result) if isinstance(result, list) else result
+
+
+def _split(total, chunk_size):
+    """Sizes of the chunks ``total`` rows are written in."""
+    return [min(chunk_size, total - start) for start in range(0, total, chunk_size)]
+
+
+def _partition(ids, total, chunk_size):
+    """Spread ``total`` rows over disjoint slices of ``ids``: [(slice, rows)]."""
+    if not ids or total <= 0:
+        return []
+    slices = min(len(ids), -(-total // chunk_size))
+    shares = _split(total, -(-total // slices))
+    return [(ids[n::slices], rows) for n, rows in enumerate(shares)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic users and activity at volume (see main.seeding): reports, anonymous "
+        "reports, posts, comment chains, follows, messages and notifications with power-law skew, "
+        "written with bulk_create in chunks across a process pool."
+    )
+
+    def add_arguments(self, parser):
+        from main import seeding
+
+        parser.add_argument('--users', type=int, default=10000, help="Users to create.")
+        for model in MODELS:
+            parser.add_argument(
+                f"--{model.replace('_', '-')}", type=int, default=None,
+                help=f"Rows to create (default: {seeding.RATIOS[model]} per user).",
+            )
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes.")
+        parser.add_argument('--chunk-size', type=int, default=20000, help="Rows per task.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix; must not be in use yet.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for repeatable data.")
+        parser.add_argument('--search', action='store_true', help="Rebuild the search index afterwards.")
+
+    def handle(self, *args, **options):
+        from django.contrib.auth import get_user_model
+
+        from forum.models import Post
+        from main import seeding
+        from users.models import GovernmentAdmin, Profile
+
+        User = get_user_model()
+        users, prefix, chunk_size = options['users'], options['prefix'], options['chunk_size']
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f"Users named '{prefix}-...' already exist; pass another --prefix.")
+        counts = {
+            model: options[model] if options[model] is not None else int(users * seeding.RATIOS[model])
+            for model in MODELS
+        }
+        self.started = time.perf_counter()
+        self.seed = options['seed']
+
+        # Workers open their own connections; don't hand them ours.
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(options['workers'], mp_context=context, initializer=_setup_worker) as pool:
+            self.pool = pool
+            admins = max(1, int(users * seeding.ADMIN_SHARE))
+            self.run('users', [
+                ('users', 'create_users', {'count': admins, 'prefix': f'{prefix}-admin', 'admins': admins}),
+                *(
+                    ('users', 'create_users', {'count': size, 'prefix': f'{prefix}-{n}'})
+                    for n, size in enumerate(_split(users - admins, chunk_size))
+                ),
+            ])
+
+            user_ids = list(User.objects.values_list('pk', flat=True))
+            department_ids = list(GovernmentAdmin.objects.values_list('pk', flat=True))
+            profile_ids = list(Profile.objects.values_list('pk', flat=True))
+            connections.close_all()
+            self.run('activity', [
+                *(
+                    ('reports', 'create_reports', {'user_ids': user_ids, 'department_ids': department_ids, 'count': size})
+                    for size in _split(counts['reports'], chunk_size)
+                ),
+                *(
+                    ('anonymous_reports', 'create_anonymous_reports', {'count': size})
+                    for size in _split(counts['anonymous_reports'], chunk_size)
+                ),
+                *(
+                    ('posts', 'create_posts', {'user_ids': user_ids, 'count': size})
+                    for size in _split(counts['posts'], chunk_size)
+                ),
+                *(
+                    ('follows', 'create_follows', {'follower_profile_ids': followers, 'profile_ids': profile_ids, 'count': size})
+                    for followers, size in _partition(profile_ids, counts['follows'], chunk_size)
+                ),
+                *(
+                    ('messages', 'create_conversations', {'first_user_ids': first, 'user_ids': user_ids, 'messages': size})
+                    for first, size in _partition(user_ids, counts['messages'], chunk_size)
+                ),
+                *(
+                    ('notifications', 'create_notifications', {'user_ids': user_ids, 'count': size})
+                    for size in _split(counts['notifications'], chunk_size)
+                ),
+            ])
+
+            # Threads stay within a post, so comments split cleanly by post.
+            post_ids = list(Post.objects.values_list('pk', flat=True))
+            connections.close_all()
+            self.run('comments', [
+                ('comments', 'create_comments', {'post_ids': posts, 'user_ids': user_ids, 'count': size})
+                for posts, size in _partition(post_ids, counts['comments'], chunk_size)
+            ])
+
+        began = time.perf_counter()
+        seeding.finalize(search=options['search'])
+        self.stdout.write(f"Recomputed counters{' and search index' if options['search'] else ''} "
+                          f"in {time.perf_counter() - began:.1f}s")
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - self.started:.1f}s"))
+
+    def run(self, phase, tasks):
+        """Run ``(kind, generator, kwargs)`` tasks on the pool, reporting rows per second."""
+        began = time.perf_counter()
+        futures = [
+            self.pool.submit(_run_chunk, kind, name, f'{self.seed}:{name}:{n}', kwargs)
+            for n, (kind, name, kwargs) in enumerate(tasks)
+        ]
+        created = Counter()
+        for done, future in enumerate(as_completed(futures), 1):
+            kind, rows = future.result()
+            created[kind] += rows
+            self.stdout.write(f"  {phase}: {done}/{len(futures)} tasks, {kind} +{rows}")
+        elapsed = time.perf_counter() - began
+        for kind, rows in sorted(created.items()):
+            self.stdout.write(f"{kind}: {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f}/s)")
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from forum.models import Conversation, Post
+from main import loadtest
+from reports.models import Report
+
+SCENARIOS = ['citizen_browsing', 'admin_triage', 'chat_burst']
+SAMPLE_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a running server with simulated users (citizen browsing, admin triage, chat bursts) "
+        "and report throughput and latency percentiles per endpoint. Signs in as accounts created by "
+        "generate_data, read from this project's database. Admin triage changes report statuses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help="Server to load.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix used with generate_data.")
+        for scenario, default in zip(SCENARIOS, (40, 5, 10)):
+            parser.add_argument(f"--{scenario.replace('_', '-')}", type=int, default=default,
+                                help=f"Virtual users running {scenario} (default {default}).")
+        parser.add_argument('--duration', type=float, default=60, help="Seconds to run after ramp-up.")
+        parser.add_argument('--ramp-up', type=float, default=10, help="Seconds over which users start.")
+        parser.add_argument('--think-time', type=float, default=0.5,
+                            help="Mean pause between a user's requests, in seconds (0: none).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', dest='json_path', help="Also write the summary to this file.")
+
+    def handle(self, *args, **options):
+        mix = {scenario: options[scenario] for scenario in SCENARIOS if options[scenario] > 0}
+        if not mix:
+            raise CommandError("No virtual users: give at least one scenario a positive count.")
+        plan = self.plan(options['prefix'], random.Random(options['seed']), mix)
+        self.stdout.write(
+            f"Loading {options['base_url']} with {', '.join(f'{users} {name}' for name, users in mix.items())} "
+            f"for {options['duration']:g}s (+{options['ramp_up']:g}s ramp-up)"
+        )
+        summary = asyncio.run(loadtest.run(
+            options['base_url'], plan, mix, options['duration'], options['think_time'], options['ramp_up'],
+        ))
+        self.report(summary)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as handle:
+                json.dump(summary, handle, indent=2)
+
+    def plan(self, prefix, rng, mix):
+        """Accounts and objects for the scenarios, looked up now: the run itself doesn't touch the ORM."""
+        User = get_user_model()
+        seeded = User.objects.filter(username__startswith=f'{prefix}-')
+        citizens = list(seeded.filter(is_citizen=True).order_by('?').values_list('username', flat=True)[:SAMPLE_SIZE])
+        admins = list(seeded.filter(is_government_admin=True).values_list('username', flat=True)[:SAMPLE_SIZE])
+        if not citizens:
+            raise CommandError(f"No users named '{prefix}-...'; run generate_data first.")
+        if 'admin_triage' in mix and not admins:
+            raise CommandError(f"No government admins named '{prefix}-...'.")
+
+        conversations = []
+        if 'chat_burst' in mix:
+            rows = (
+                Conversation.participants.through.objects
+                .filter(conversation__direct_key__isnull=False, user__username__startswith=f'{prefix}-')
+                .order_by('-conversation_id').values_list('conversation_id', 'user__username')[:SAMPLE_SIZE * 2]
+            )
+            by_conversation = {}
+            for conversation_id, username in rows:
+                by_conversation.setdefault(conversation_id, []).append(username)
+            conversations = [
+                (usernames[0], conversation_id, usernames[1])
+                for conversation_id, usernames in by_conversation.items() if len(usernames) == 2
+            ]
+            if not conversations:
+                raise CommandError("No two-person conversations between generated users.")
+            rng.shuffle(conversations)
+
+        return loadtest.Plan(
+            rng,
+            citizens=citizens,
+            admins=admins,
+            post_ids=list(Post.objects.order_by('-id').values_list('pk', flat=True)[:SAMPLE_SIZE]),
+            report_ids=list(Report.objects.order_by('-id').values_list('pk', flat=True)[:SAMPLE_SIZE]),
+            conversations=conversations,
+        )
+
+    def report(self, summary):
+        self.stdout.write(
+            f"\n{'endpoint':<20}{'requests':>10}{'errors':>8}{'req/s':>9}"
+            f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+        )
+        for name, row in summary['endpoints'].items():
+            cells = [
+                f"{row[key]:>10.1f}" if row[key] is not None else f"{'-':>10}"
+                for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')
+            ]
+            self.stdout.write(f"{name:<20}{row['requests']:>10}{row['errors']:>8}{row['rps']:>9.1f}{''.join(cells)}")
+        style = self.style.SUCCESS if not summary['errors'] else self.style.WARNING
+        self.stdout.write(style(
+            f"\n{summary['requests']} requests, {summary['errors']} errors in {summary['elapsed_s']}s "
+            f"({summary['rps']} req/s)"
+        ))
@@ -0,0 +1,322 @@
+"""
+Synthetic data at volume, written with ``bulk_create``.
+
+Activity is skewed the way real usage is: authors, reporters, senders and
+followed users are drawn from a power-law (Zipf) distribution over a shuffled
+population, so a few accounts produce most of the content. Comment threads
+are built level by level, each reply hanging off a comment of the level
+above, which gives long chains as well as wide ones.
+
+``bulk_create`` skips model ``save()`` and signals, so everything those would
+maintain is written here directly (Profile rows, comment depth/path/thread
+root, conversation participants) or recomputed by ``finalize()`` (follower
+counts, dashboard metrics and user stats, the search index).
+
+Every ``create_*`` function takes the ids it draws from and a
+``random.Random``, and only touches the rows it creates, so a caller can split
+the work into chunks and run them in separate processes (see the
+``generate_data`` command). Partition by the first argument: posts for
+comments, followers for follows, the lower participant for conversations.
+"""
+import itertools
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from forum.models import Comment, Conversation, Message, Notification, Post
+from reports.models import AnonymousReport, Report
+from users.models import Follow, GovernmentAdmin, Profile
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+SKEW = 1.1                     # Zipf exponent for who does things
+POPULARITY_SEED = 20
+PASSWORD = 'seed-password'     # every generated account signs in with this
+# Rows per generated user when seed_dataset() isn't given explicit counts.
+RATIOS = {
+    'reports': 3,
+    'anonymous_reports': 0.5,
+    'posts': 2,
+    'comments': 10,
+    'follows': 8,
+    'messages': 10,
+    'notifications': 5,
+}
+MAX_COMMENT_DEPTH = 12
+REPLY_RATIO = 0.75             # each comment level is this fraction of the one above
+MESSAGES_PER_CONVERSATION = 20
+ADMIN_SHARE = 0.02
+
+DEPARTMENTS = [
+    'Public Works', 'Water Supply', 'Sanitation', 'Transport', 'Health',
+    'Education', 'Housing', 'Parks', 'Revenue', 'Police',
+]
+WORDS = (
+    "road water light bin park noise school bus drain tree permit clinic queue "
+    "repair street bridge fee office pothole leak power outage waste collection "
+    "delay complaint ward council meeting budget safety traffic signal footpath"
+).split()
+
+
+def _text(rng, words):
+    return ' '.join(rng.choices(WORDS, k=words)).capitalize()
+
+
+class Skewed:
+    """
+    Draws from ``population`` with Zipf weights over a random order of it.
+    The order depends only on the population, so chunks of a parallel run
+    that draw from the same ids agree on who is popular.
+    """
+
+    def __init__(self, rng, population, exponent=SKEW):
+        self.rng = rng
+        self.population = sorted(population)
+        random.Random(POPULARITY_SEED).shuffle(self.population)
+        self.cum_weights = list(itertools.accumulate(
+            1 / rank ** exponent for rank in range(1, len(self.population) + 1)
+        ))
+
+    def sample(self, k=1):
+        return self.rng.choices(self.population, cum_weights=self.cum_weights, k=k)
+
+    def one(self):
+        return self.sample()[0]
+
+
+def create_users(count, prefix, admins=0, batch_size=BATCH_SIZE):
+    """
+    ``count`` users named ``<prefix>-<n>``, the first ``admins`` of them
+    government admins with a department each, plus their Profile rows.
+    Returns the new user ids.
+    """
+    password = make_password(PASSWORD)
+    users = [
+        User(
+            username=f'{prefix}-{n}',
+            email=f'{prefix}-{n}@example.com',
+            password=password,
+            is_citizen=n >= admins,
+            is_government_admin=n < admins,
+        )
+        for n in range(count)
+    ]
+    users = User.objects.bulk_create(users, batch_size=batch_size)
+    Profile.objects.bulk_create([Profile(user=user) for user in users], batch_size=batch_size)
+    GovernmentAdmin.objects.bulk_create([
+        GovernmentAdmin(user=user, department_name=DEPARTMENTS[n % len(DEPARTMENTS)])
+        for n, user in enumerate(users[:admins])
+    ], batch_size=batch_size)
+    return [user.pk for user in users]
+
+
+def create_reports(user_ids, department_ids, count, rng, batch_size=BATCH_SIZE):
+    reporters = Skewed(rng, user_ids)
+    statuses = [value for value, _ in Report.STATUS_CHOICES]
+    priorities = [value for value, _ in Report.PRIORITY_CHOICES]
+    categories = [value for value, _ in Report.CATEGORY_CHOICES]
+    reports = (
+        Report(
+            user_id=user_id,
+            title=_text(rng, 5),
+            description=_text(rng, 40),
+            status=rng.choices(statuses, weights=(3, 3, 5, 1))[0],
+            priority=rng.choices(priorities, weights=(3, 5, 2))[0],
+            category=rng.choice(categories),
+            assigned_department_id=rng.choice(department_ids) if department_ids and rng.random() < 0.6 else None,
+        )
+        for user_id in reporters.sample(count)
+    )
+    return _bulk(Report, reports, batch_size)
+
+
+def create_anonymous_reports(count, rng, batch_size=BATCH_SIZE):
+    categories = [value for value, _ in AnonymousReport.CATEGORY_CHOICES]
+    reports = (
+        AnonymousReport(category=rng.choice(categories), description=_text(rng, 40))
+        for _ in range(count)
+    )
+    return _bulk(AnonymousReport, reports, batch_size)
+
+
+def create_posts(user_ids, count, rng, batch_size=BATCH_SIZE):
+    """Returns the new post ids."""
+    authors = Skewed(rng, user_ids)
+    posts = [
+        Post(author_id=user_id, title=_text(rng, 6), content=_text(rng, 60))
+        for user_id in authors.sample(count)
+    ]
+    return [post.pk for post in Post.objects.bulk_create(posts, batch_size=batch_size)]
+
+
+def create_comments(post_ids, user_ids, count, rng, max_depth=MAX_COMMENT_DEPTH, batch_size=BATCH_SIZE):
+    """
+    ``count`` comments on ``post_ids``: top-level comments on popular posts,
+    then replies level by level, each level REPLY_RATIO the size of the one
+    above. Returns the number created.
+    """
+    if not post_ids or count <= 0:
+        return 0
+    authors = Skewed(rng, user_ids)
+    sizes = _level_sizes(count, max_depth)
+    posts = Skewed(rng, post_ids)
+    level = [
+        Comment(post_id=post_id, author_id=author_id, content=_text(rng, 15))
+        for post_id, author_id in zip(posts.sample(sizes[0]), authors.sample(sizes[0]))
+    ]
+    level = Comment.objects.bulk_create(level, batch_size=batch_size)
+    created = len(level)
+    for size in sizes[1:]:
+        if not level or not size:
+            break
+        parents = Skewed(rng, range(len(level)))
+        replies = []
+        for index, author_id in zip(parents.sample(size), authors.sample(size)):
+            parent = level[index]
+            replies.append(Comment(
+                post_id=parent.post_id,
+                author_id=author_id,
+                content=_text(rng, 15),
+                parent_comment_id=parent.pk,
+                depth=parent.depth + 1,
+                thread_root_id=parent.thread_root_id or parent.pk,
+                path=f"{parent.path}{parent.pk:010d}/",
+            ))
+        level = Comment.objects.bulk_create(replies, batch_size=batch_size)
+        created += len(level)
+    return created
+
+
+def _level_sizes(count, max_depth):
+    weights = [REPLY_RATIO ** depth for depth in range(max_depth + 1)]
+    total = sum(weights)
+    sizes = [int(count * weight / total) for weight in weights]
+    sizes[0] += count - sum(sizes)
+    return sizes
+
+
+def create_follows(follower_profile_ids, profile_ids, count, rng, batch_size=BATCH_SIZE):
+    """
+    ``count`` follows from ``follower_profile_ids`` (spread evenly) to
+    popular ``profile_ids``. Returns the number created.
+    """
+    if not follower_profile_ids or len(profile_ids) < 2:
+        return 0
+    followed = Skewed(rng, profile_ids)
+    per_follower, extra = divmod(count, len(follower_profile_ids))
+    follows = []
+    for n, follower_id in enumerate(follower_profile_ids):
+        wanted = min(per_follower + (n < extra), len(profile_ids) - 1)
+        targets = set()
+        # Popular profiles come up again and again; give up after a few misses.
+        for _ in range(wanted * 4):
+            if len(targets) == wanted:
+                break
+            target = followed.one()
+            if target != follower_id:
+                targets.add(target)
+        follows.extend(Follow(follower_id=follower_id, followed_id=target) for target in targets)
+    return _bulk(Follow, follows, batch_size, ignore_conflicts=True)
+
+
+def create_conversations(first_user_ids, user_ids, messages, rng,
+                         per_conversation=MESSAGES_PER_CONVERSATION, batch_size=BATCH_SIZE):
+    """
+    Direct conversations between each of ``first_user_ids`` and a higher-id
+    user from ``user_ids``, holding ``messages`` messages between them
+    (skewed: a few chats are very busy). Returns the number of messages.
+    """
+    others = Skewed(rng, user_ids)
+    keys = {}
+    for _ in range(max(1, messages // per_conversation) * 2):
+        if len(keys) * per_conversation >= messages:
+            break
+        low = rng.choice(first_user_ids)
+        high = others.one()
+        if high > low:
+            keys.setdefault(Conversation.direct_key_for(low, high), (low, high))
+    if not keys:
+        return 0
+    existing = set(Conversation.objects.filter(direct_key__in=list(keys)).values_list('direct_key', flat=True))
+    conversations = Conversation.objects.bulk_create(
+        [Conversation(direct_key=key) for key in keys if key not in existing], batch_size=batch_size
+    )
+    Participants = Conversation.participants.through
+    Participants.objects.bulk_create([
+        Participants(conversation_id=conversation.pk, user_id=user_id)
+        for conversation in conversations
+        for user_id in keys[conversation.direct_key]
+    ], batch_size=batch_size)
+    if not conversations:
+        return 0
+    busy = Skewed(rng, range(len(conversations)))
+    return _bulk(Message, (
+        Message(
+            conversation_id=conversations[index].pk,
+            sender_id=rng.choice(keys[conversations[index].direct_key]),
+            content=_text(rng, 12),
+        )
+        for index in busy.sample(messages)
+    ), batch_size)
+
+
+def create_notifications(user_ids, count, rng, batch_size=BATCH_SIZE):
+    recipients = Skewed(rng, user_ids)
+    return _bulk(Notification, (
+        Notification(user_id=user_id, message=_text(rng, 10), is_read=rng.random() < 0.6)
+        for user_id in recipients.sample(count)
+    ), batch_size)
+
+
+def _bulk(model, objects, batch_size, **kwargs):
+    """bulk_create from an iterable without holding more than one batch in memory."""
+    objects = iter(objects)
+    created = 0
+    while batch := list(itertools.islice(objects, batch_size)):
+        model.objects.bulk_create(batch, **kwargs)
+        created += len(batch)
+    return created
+
+
+def finalize(search=False):
+    """Recompute what signals would have maintained for bulk-created rows."""
+    from dashboard import metrics, stats
+    from users import follows
+
+    follows.recount()
+    metrics.reconcile(fix=True)
+    stats.rebuild_all(User.objects.values_list('pk', flat=True))
+    if search:
+        from search import index
+        index.rebuild()
+
+
+def seed_dataset(users, prefix='seed', seed=0, search=False, **counts):
+    """
+    Add ``users`` users and activity proportional to them (RATIOS, or
+    explicit counts as keyword arguments), in this process. The activity is
+    spread over every user in the database, so seeding again grows the data
+    existing users see. Returns the counts created.
+    """
+    rng = random.Random(seed)
+    counts = {name: int(counts.get(name, users * ratio)) for name, ratio in RATIOS.items()}
+    create_users(users, prefix, admins=max(1, int(users * ADMIN_SHARE)))
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    department_ids = list(GovernmentAdmin.objects.values_list('pk', flat=True))
+    profile_ids = list(Profile.objects.values_list('pk', flat=True))
+
+    created = {'users': users}
+    created['reports'] = create_reports(user_ids, department_ids, counts['reports'], rng)
+    created['anonymous_reports'] = create_anonymous_reports(counts['anonymous_reports'], rng)
+    post_ids = create_posts(user_ids, counts['posts'], rng)
+    created['posts'] = len(post_ids)
+    created['comments'] = create_comments(
+        list(Post.objects.values_list('pk', flat=True)), user_ids, counts['comments'], rng
+    )
+    created['follows'] = create_follows(profile_ids, profile_ids, counts['follows'], rng)
+    created['messages'] = create_conversations(user_ids, user_ids, counts['messages'], rng)
+    created['notifications'] = create_notifications(user_ids, counts['notifications'], rng)
+    finalize(search=search)
+    return created
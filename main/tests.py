@@ -1,3 +1,305 @@
-from django.test import TestCase
+"""
+Query-count regression suite for every view.
 
-# Create your tests here.
+Seeds a realistic dataset with main.seeding, requests every named URL in
+reports, forum, dashboard and users, then grows the data about tenfold and
+requests them all again. A route fails when it runs more queries than its
+budget in ROUTES, or when its query count changed with the size of the data
+(an N+1 somewhere). Each request runs in a rolled-back transaction with an
+empty cache and timeline store, so every measurement sees the same data and
+the uncached path.
+
+Run with UPDATE_QUERY_BASELINE=1 to rewrite query_baseline.json with each
+route's query count and p50/p95 latency at the larger size.
+"""
+import json
+import os
+import random
+import statistics
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from forum import timeline
+from forum.models import Comment, Conversation, Message, Notification, Post
+from main import seeding
+from reports.models import Report
+from users.models import Follow, GovernmentAdmin, Profile
+
+User = get_user_model()
+
+BASELINE_PATH = Path(__file__).with_name('query_baseline.json')
+SMALL_USERS = 200
+LARGE_USERS = 1800      # added on top of SMALL_USERS
+TIMED_REPEATS = 10
+COVERED_URLCONFS = ('reports.urls', 'forum.urls', 'dashboard.urls', 'users.urls')
+
+
+class Route:
+    """One request: who makes it, against which fixture objects, and its query budget."""
+
+    def __init__(self, name, budget, role='citizen', method='get', kwargs=None, data=None,
+                 json_body=False, status=200):
+        self.name = name
+        self.budget = budget
+        self.role = role
+        self.method = method
+        self.kwargs = kwargs or (lambda fx: {})
+        self.data = data or (lambda fx: None)
+        self.json_body = json_body
+        self.status = status
+
+    @property
+    def label(self):
+        return f'{self.method.upper()} {self.name}'
+
+
+ROUTES = [
+    # reports
+    Route('submit_report', 0, role='anonymous'),
+    Route('submit_report', 3, role='anonymous', method='post',
+          data=lambda fx: {'category': 'service', 'description': 'Street light out'}),
+    Route('report_details', 4, kwargs=lambda fx: {'report_id': fx.report.pk}),
+    Route('user_reports', 4),
+    Route('submit_userreport', 2),
+    Route('submit_userreport', 11, method='post', status=302,
+          data=lambda fx: {'title': 'Broken footpath', 'description': 'Slabs missing'}),
+    Route('edit_report', 3, kwargs=lambda fx: {'report_id': fx.report.pk}),
+    Route('edit_report', 9, method='post', status=302, kwargs=lambda fx: {'report_id': fx.report.pk},
+          data=lambda fx: {'title': 'Broken footpath', 'description': 'Still broken'}),
+    Route('delete_report', 3, kwargs=lambda fx: {'report_id': fx.report.pk}),
+    Route('delete_report', 11, method='post', status=302, kwargs=lambda fx: {'report_id': fx.report.pk}),
+    # forum
+    Route('forum:feed', 7),
+    Route('forum:create_post', 3),
+    Route('forum:create_post', 8, method='post', status=302,
+          data=lambda fx: {'title': 'Park cleanup', 'content': 'Saturday at nine'}),
+    Route('forum:post_detail', 8, kwargs=lambda fx: {'post_id': fx.post.pk}),
+    Route('forum:edit_post', 4, kwargs=lambda fx: {'post_id': fx.post.pk}),
+    Route('forum:edit_post', 6, method='post', status=302, kwargs=lambda fx: {'post_id': fx.post.pk},
+          data=lambda fx: {'title': 'Park cleanup', 'content': 'Moved to Sunday'}),
+    Route('forum:delete_post', 5, kwargs=lambda fx: {'post_id': fx.post.pk}),
+    # A post whose thread stays the same size: deleting it costs what its own rows cost.
+    Route('forum:delete_post', 17, method='post', status=302, kwargs=lambda fx: {'post_id': fx.doomed_post.pk}),
+    Route('forum:add_comment', 12, method='post', status=302, kwargs=lambda fx: {'post_id': fx.post.pk},
+          data=lambda fx: {'content': 'Count me in', 'parent_id': fx.comment.pk}),
+    Route('forum:comment_replies', 6, kwargs=lambda fx: {'comment_id': fx.comment.pk}),
+    Route('forum:vote_post', 11, method='post', kwargs=lambda fx: {'post_id': fx.post.pk},
+          data=lambda fx: {'action': 'upvote'}),
+    Route('forum:vote_comment', 11, method='post', kwargs=lambda fx: {'comment_id': fx.comment.pk},
+          data=lambda fx: {'action': 'upvote'}),
+    Route('forum:follow_user', 11, method='post', kwargs=lambda fx: {'user_id': fx.stranger.pk}),
+    Route('forum:unfollow_user', 9, method='post', kwargs=lambda fx: {'user_id': fx.friend.pk}),
+    Route('forum:notifications', 4),
+    Route('forum:mark_as_read', 4, method='post', status=302,
+          kwargs=lambda fx: {'notification_id': fx.notification.pk}),
+    Route('forum:mark_notifications_read', 5, method='post',
+          data=lambda fx: {'ids': fx.notification_ids}),
+    Route('forum:inbox', 5),
+    Route('forum:chat_room', 5, kwargs=lambda fx: {'username': fx.friend.username}),
+    Route('forum:message_history', 5, kwargs=lambda fx: {'conversation_id': fx.conversation.pk}),
+    Route('forum:mark_conversation_read', 9, method='post',
+          kwargs=lambda fx: {'conversation_id': fx.conversation.pk}),
+    Route('forum:profile_view', 8, kwargs=lambda fx: {'username': fx.friend.username}),
+    # dashboard
+    Route('dashboard', 5, role='staff'),
+    Route('dashboard_overview', 5, role='staff'),
+    Route('manage_departments', 3, role='staff'),
+    Route('toggle_department_status', 4, role='staff', method='post',
+          kwargs=lambda fx: {'department_id': fx.department.pk}),
+    Route('manage_reports', 4, role='staff'),
+    Route('assign_report_to_department', 13, role='staff', method='post', status=302,
+          kwargs=lambda fx: {'report_id': fx.report.pk, 'department_id': fx.department.pk}),
+    Route('export_reports_to_csv', 3, role='staff'),
+    Route('bulk_update_reports', 11, role='staff', method='post', json_body=True,
+          data=lambda fx: {'ids': fx.report_ids, 'action': 'transition', 'status': 'under_review'}),
+    Route('manage_citizens', 3, role='staff'),
+    Route('manage_polls', 3, role='staff'),
+    Route('manage_feedback', 3, role='staff'),
+    Route('manage_notifications', 3, role='staff'),
+    Route('manage_messages', 2, role='staff'),
+    Route('analytics_view', 6, role='staff'),
+    Route('cache_stats', 2, role='staff'),
+    # users
+    Route('register', 0, role='anonymous'),
+    Route('login', 0, role='anonymous'),
+    Route('login', 11, role='anonymous', method='post', status=302,
+          data=lambda fx: {'username': fx.citizen.username, 'password': seeding.PASSWORD}),
+    Route('logout', 4, status=302),
+    Route('admin_panel', 0, role='anonymous'),
+]
+
+
+def _url_names(patterns, namespace=None):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _url_names(pattern.url_patterns, pattern.namespace or namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield f'{namespace}:{pattern.name}' if namespace else pattern.name
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))]
+
+
+class Fixtures:
+    """The users and objects the routes act on, with activity that grows with each scale."""
+
+    def __init__(self):
+        self.citizen = seeding.create_users(1, 'citizen')[0]
+        self.friend, self.stranger = seeding.create_users(2, 'neighbour')
+        staff_id = seeding.create_users(1, 'staff', admins=1)[0]
+        User.objects.filter(pk=staff_id).update(is_staff=True)
+        self.citizen, self.friend, self.stranger, self.staff = (
+            User.objects.get(pk=pk) for pk in (self.citizen, self.friend, self.stranger, staff_id)
+        )
+        self.department = GovernmentAdmin.objects.get(user=self.staff)
+        self.profile = Profile.objects.get(user=self.citizen)
+        friend_profile = Profile.objects.get(user=self.friend)
+        Follow.objects.create(follower=self.profile, followed=friend_profile)
+        self.report = Report.objects.create(user=self.citizen, title='Pothole', description='Deep one')
+        self.post = Post.objects.create(author=self.citizen, title='Park cleanup', content='Who is in?')
+        self.comment = Comment.objects.create(post=self.post, author=self.friend, content='Me')
+        self.doomed_post = Post.objects.create(author=self.citizen, title='Lost cat', content='Found her')
+        seeding.create_comments([self.doomed_post.pk], [self.citizen.pk, self.friend.pk], 40, random.Random(0))
+        self.conversation, _ = Conversation.objects.get_or_create(
+            direct_key=Conversation.direct_key_for(self.citizen.pk, self.friend.pk)
+        )
+        self.conversation.participants.add(self.citizen, self.friend)
+        self.notification = Notification.objects.create(user=self.citizen, message='Welcome')
+        # Submitted the way citizens submit them, so the bulk route triages whatever status the app writes.
+        client = Client()
+        client.force_login(self.citizen)
+        for n in range(20):
+            client.post(reverse('submit_userreport'), {'title': f'Streetlight {n}', 'description': 'Out'})
+        self.report_ids = list(
+            Report.objects.filter(title__startswith='Streetlight ').order_by('pk').values_list('pk', flat=True)
+        )
+
+    def grow(self, users, seed):
+        """Seed ``users`` more users, and give the fixture users a proportional share of the activity."""
+        seeding.seed_dataset(users, prefix=f'seed{seed}', seed=seed)
+        rng = random.Random(seed)
+        everyone = list(User.objects.values_list('pk', flat=True))
+        mine = [self.citizen.pk]
+        seeding.create_reports(mine, [self.department.pk], users // 10, rng)
+        seeding.create_posts(mine, users // 20, rng)
+        seeding.create_comments([self.post.pk], everyone, users // 4, rng)
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author_id=author_id, content='Agreed', parent_comment=self.comment,
+                    depth=1, thread_root=self.comment, path=f'{self.comment.pk:010d}/')
+            for author_id in rng.sample(everyone, users // 20)
+        ])
+        seeding.create_notifications(mine, users // 5, rng)
+        Message.objects.bulk_create([
+            Message(conversation=self.conversation, sender_id=rng.choice(mine + [self.friend.pk]), content='Hi')
+            for _ in range(users // 5)
+        ])
+        profiles = list(Profile.objects.exclude(user=self.stranger).values_list('pk', flat=True))
+        seeding.create_follows([self.profile.pk], profiles, users // 20, rng)
+        seeding.create_follows(rng.sample(profiles, users // 10), [self.profile.pk], users // 10, rng)
+        seeding.finalize()
+
+        self.notification_ids = list(
+            Notification.objects.filter(user=self.citizen).order_by('-id').values_list('pk', flat=True)[:20]
+        )
+
+
+@override_settings(REQUEST_PROFILING={'ENABLED': False})
+class QueryCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixtures = Fixtures()
+        cls.fixtures.grow(SMALL_USERS, seed=1)
+
+    def setUp(self):
+        cache.clear()
+        timeline.get_store().clear()
+
+    def request(self, route):
+        """Make ``route``'s request once. Returns (response, query count, seconds)."""
+        fx = self.fixtures
+        client = Client()
+        user = {'citizen': fx.citizen, 'staff': fx.staff}.get(route.role)
+        if user is not None:
+            client.force_login(user)
+        url = reverse(route.name, kwargs=route.kwargs(fx))
+        data = route.data(fx)
+        extra = {'content_type': 'application/json'} if route.json_body else {}
+        if route.json_body:
+            data = json.dumps(data)
+        cache.clear()
+        timeline.get_store().clear()
+        queries = []
+        with transaction.atomic():
+            with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+                started = time.perf_counter()
+                response = getattr(client, route.method)(url, data, **extra)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        return response, len(queries), elapsed
+
+    def measure_all(self, repeats=1):
+        results = {}
+        for route in ROUTES:
+            response, count, elapsed = self.request(route)
+            timings = [elapsed]
+            for _ in range(repeats - 1):
+                timings.append(self.request(route)[2])
+            results[route.label] = {
+                'status': response.status_code, 'queries': count, 'timings': timings,
+                'json': response.json() if response.get('Content-Type') == 'application/json' else None,
+            }
+        return results
+
+    def test_every_url_has_a_route(self):
+        resolver = get_resolver()
+        names = set()
+        for pattern in resolver.url_patterns:
+            if isinstance(pattern, URLResolver) and getattr(pattern.urlconf_module, '__name__', '') in COVERED_URLCONFS:
+                names.update(_url_names([pattern]))
+        self.assertEqual(names - {route.name for route in ROUTES}, set())
+
+    def test_query_counts_do_not_grow_with_data(self):
+        small = self.measure_all()
+        self.fixtures.grow(LARGE_USERS, seed=2)
+        large = self.measure_all(repeats=TIMED_REPEATS)
+
+        for route in ROUTES:
+            with self.subTest(route=route.label):
+                before, after = small[route.label], large[route.label]
+                self.assertEqual(after['status'], route.status)
+                self.assertEqual(
+                    after['queries'], before['queries'],
+                    f"query count changed from {before['queries']} to {after['queries']} as the data grew",
+                )
+                self.assertLessEqual(after['queries'], route.budget)
+
+        # A route that skips every row runs fewer queries and still passes its budget.
+        self.assertEqual(len(self.fixtures.report_ids), 20)
+        self.assertEqual(large['POST bulk_update_reports']['json']['updated'], len(self.fixtures.report_ids))
+
+        if os.environ.get('UPDATE_QUERY_BASELINE'):
+            baseline = {
+                label: {
+                    'status': result['status'],
+                    'queries': result['queries'],
+                    'p50_ms': round(statistics.median(result['timings']) * 1000, 2),
+                    'p95_ms': round(_percentile(result['timings'], 95) * 1000, 2),
+                }
+                for label, result in large.items()
+            }
+            BASELINE_PATH.write_text(json.dumps({
+                'users': User.objects.count(),
+                'repeats': TIMED_REPEATS,
+                'routes': baseline,
+            }, indent=2) + '\n')
@@ -1,5 +1,8 @@
 
 from django.shortcuts import render
+from django.views.decorators.cache import cache_page
 
+# The landing page is the same for everyone and only changes with a deploy.
+@cache_page(60 * 15)
 def landing_page(request):
     return render(request, 'main/PublicBridge.html')
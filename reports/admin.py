@@ -1,5 +1,11 @@
-from django.contrib import admin
-from .models import Report, AnonymousReport, Comment
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.shortcuts import get_object_or_404, render
+from .models import Report, AnonymousReport, Comment, ReportAuditLog
+from .bulk import bulk_assign, bulk_transition
+from users.models import GovernmentAdmin
+from .exports import stream_reports
+from search.mixins import FullTextSearchAdminMixin
 from django.contrib.auth import get_user_model
 User = get_user_model()
 
@@ -7,12 +13,24 @@ class CommentInline(admin.TabularInline):
     model = Comment  # Replace with your actual model
     extra = 0  # Controls how many empty forms to display
 
-class ReportAdmin(admin.ModelAdmin):
+class ReportAuditLogInline(admin.TabularInline):
+    model = ReportAuditLog
+    extra = 0
+    can_delete = False
+    fields = ('action', 'from_status', 'to_status', 'from_department', 'to_department', 'actor', 'created_at')
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+class ReportAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'user', 'status', 'category', 'priority', 'created_at', 'updated_at')
     list_filter = ('status', 'category', 'priority', 'created_at')  # Added 'priority' for filtering
     search_fields = ('title', 'description', 'user__username')  # Fixed case: 'user' instead of 'User'
+    search_kind = 'report'
     actions = ['assign_to_department', 'mark_as_resolved', 'set_priority_high', 'export_to_csv']
-    inlines = [CommentInline]
+    inlines = [CommentInline, ReportAuditLogInline]
+    list_select_related = ('user',)
     ordering = ('-created_at',)  # Default ordering by newest first
 
     # Customizable display of 'user' field for anonymous reports
@@ -22,52 +40,52 @@ class ReportAdmin(admin.ModelAdmin):
 
     # Action to assign reports to a department (government admin_dashboard)
     def assign_to_department(self, request, queryset):
-        for report in queryset:
-            report.status = 'under_review'  # Set the status to 'under_review'
-            report.save()
-        self.message_user(request, f"{queryset.count()} reports have been assigned to departments.")
+        departments = GovernmentAdmin.objects.filter(is_active=True).order_by('department_name')
+        department_id = request.POST.get('department')
+        if 'apply' in request.POST and department_id:
+            department = get_object_or_404(GovernmentAdmin, id=department_id)
+            ids = list(queryset.values_list('id', flat=True))
+            result = bulk_assign(ids, department, actor=request.user)
+            self.message_user(request, f"{result.updated} reports have been assigned to {department.department_name}.")
+            return None
+        # Ask which department first; the selection is posted back to this action.
+        return render(request, 'admin/reports/report/assign_department.html', {
+            **self.admin_site.each_context(request),
+            'title': "Assign reports to a department",
+            'reports': queryset,
+            'departments': departments,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'opts': self.model._meta,
+        })
     assign_to_department.short_description = "Assign selected reports to a department"
 
     # Action to mark selected reports as resolved
     def mark_as_resolved(self, request, queryset):
-        queryset.update(status='resolved')  # Bulk update status
-        self.message_user(request, f"{queryset.count()} reports marked as resolved.")
+        result = bulk_transition(list(queryset.values_list('id', flat=True)), 'resolved', actor=request.user)
+        self.message_user(request, f"{result.updated} reports marked as resolved.")
+        if result.skipped:
+            self.message_user(request, f"{len(result.skipped)} reports were skipped (already resolved or not allowed from their status).", messages.WARNING)
     mark_as_resolved.short_description = "Mark selected reports as resolved"
 
     # Action to set the priority of reports to 'High'
     def set_priority_high(self, request, queryset):
-        queryset.update(priority='high')  # Assuming a 'priority' field exists
-        self.message_user(request, f"{queryset.count()} reports have been set to High priority.")
+        updated = queryset.update(priority='high')  # Assuming a 'priority' field exists
+        self.message_user(request, f"{updated} reports have been set to High priority.")
     set_priority_high.short_description = "Set priority to High"
 
     # Action to export selected reports to a CSV file
     def export_to_csv(self, request, queryset):
-        import csv
-        from django.http import HttpResponse
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="reports.csv"'
-
-        writer = csv.writer(response)
-        # Write headers
-        writer.writerow(['Title', 'User', 'Status', 'Category', 'Priority', 'Created At', 'Updated At'])
-
-        # Write report data
-        for report in queryset:
-            writer.writerow([
-                report.title,
-                report.user.username if report.user else "Anonymous",
-                report.status,
-                report.category,
-                getattr(report, 'priority', 'N/A'),
-                report.created_at,
-                report.updated_at,
-            ])
-
         self.message_user(request, f"{queryset.count()} reports have been exported to CSV.")
-        return response
+        return stream_reports(queryset, 'csv')
     export_to_csv.short_description = "Export selected reports to CSV"
 
 # Register the admin_dashboard models
 admin.site.register(Report, ReportAdmin)
-admin.site.register(AnonymousReport)
+class AnonymousReportAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
+    list_display = ('category', 'submitted_at')
+    list_filter = ('category', 'submitted_at')
+    search_fields = ('description',)
+    search_kind = 'anonymous_report'
+
+
+admin.site.register(AnonymousReport, AnonymousReportAdmin)
@@ -0,0 +1,133 @@
+"""
+Bulk triage for reports: department assignment and status transitions over
+thousands of ids, one UPDATE and one audit INSERT per batch.
+"""
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .models import Report, ReportAuditLog
+from .signals import reports_bulk_changed
+
+BATCH_SIZE = 1000
+SNAPSHOT_FIELDS = ('id', 'user_id', 'status', 'category', 'priority', 'assigned_department_id', 'created_at')
+
+
+class BulkResult:
+    def __init__(self):
+        self.updated = 0
+        self.skipped = {}
+        self.missing = []
+
+    def as_dict(self):
+        return {
+            'updated': self.updated,
+            'skipped': {str(pk): reason for pk, reason in self.skipped.items()},
+            'missing': self.missing,
+        }
+
+
+def can_transition(from_status, to_status):
+    return to_status in Report.STATUS_TRANSITIONS.get(from_status, set())
+
+
+def _batches(ids, size):
+    ids = list(dict.fromkeys(ids))
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _snapshot(batch):
+    rows = (
+        Report.objects.select_for_update()
+        .filter(id__in=batch)
+        .values(*SNAPSHOT_FIELDS)
+    )
+    return {row['id']: row for row in rows}
+
+
+def _finish(batch_changes, audit_rows):
+    ReportAuditLog.objects.bulk_create(audit_rows, batch_size=BATCH_SIZE)
+    if batch_changes:
+        reports_bulk_changed.send(sender=Report, changes=batch_changes)
+
+
+def bulk_transition(report_ids, to_status, actor=None, batch_size=BATCH_SIZE):
+    """
+    Move the given reports to ``to_status``. Reports whose current status
+    does not allow that transition are skipped and reported, not failed.
+    """
+    if to_status not in dict(Report.STATUS_CHOICES):
+        raise ValueError(f"Unknown status: {to_status!r}")
+    result = BulkResult()
+    for batch in _batches(report_ids, batch_size):
+        with transaction.atomic():
+            before = _snapshot(batch)
+            result.missing += [pk for pk in batch if pk not in before]
+            allowed = []
+            for pk, row in before.items():
+                if row['status'] == to_status:
+                    result.skipped[pk] = f"already {to_status}"
+                elif not can_transition(row['status'], to_status):
+                    result.skipped[pk] = f"cannot move from {row['status']} to {to_status}"
+                else:
+                    allowed.append(pk)
+            if not allowed:
+                continue
+            result.updated += Report.objects.filter(id__in=allowed).update(
+                status=to_status, updated_at=timezone.now()
+            )
+            _finish(
+                [(before[pk], {**before[pk], 'status': to_status}) for pk in allowed],
+                [
+                    ReportAuditLog(
+                        report_id=pk, actor=actor, action='status',
+                        from_status=before[pk]['status'], to_status=to_status,
+                        from_department_id=before[pk]['assigned_department_id'],
+                        to_department_id=before[pk]['assigned_department_id'],
+                    )
+                    for pk in allowed
+                ],
+            )
+    return result
+
+
+def bulk_assign(report_ids, department, actor=None, batch_size=BATCH_SIZE):
+    """
+    Assign the given reports to ``department``. Pending reports move to
+    under_review in the same UPDATE; other statuses are left as they are.
+    """
+    result = BulkResult()
+    for batch in _batches(report_ids, batch_size):
+        with transaction.atomic():
+            before = _snapshot(batch)
+            result.missing += [pk for pk in batch if pk not in before]
+            ids = list(before)
+            if not ids:
+                continue
+            result.updated += Report.objects.filter(id__in=ids).update(
+                assigned_department=department,
+                status=Case(When(status='pending', then=Value('under_review')), default=F('status')),
+                updated_at=timezone.now(),
+            )
+            after = {
+                pk: {
+                    **row,
+                    'assigned_department_id': department.id,
+                    'status': 'under_review' if row['status'] == 'pending' else row['status'],
+                }
+                for pk, row in before.items()
+            }
+            _finish(
+                [(before[pk], after[pk]) for pk in ids],
+                [
+                    ReportAuditLog(
+                        report_id=pk, actor=actor, action='assign',
+                        from_status=before[pk]['status'], to_status=after[pk]['status'],
+                        from_department_id=before[pk]['assigned_department_id'],
+                        to_department_id=department.id,
+                    )
+                    for pk in ids
+                ],
+            )
+    return result
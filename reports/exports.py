@@ -0,0 +1,161 @@
+import csv
+import json
+import zlib
+from datetime import datetime, time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Report
+
+# (header, values_list lookup) pairs. Reading through values_list joins the
+# reporter in the same query instead of loading one User per row.
+EXPORT_COLUMNS = [
+    ('ID', 'id'),
+    ('Title', 'title'),
+    ('User', 'user__username'),
+    ('Status', 'status'),
+    ('Category', 'category'),
+    ('Priority', 'priority'),
+    ('Department', 'assigned_department__department_name'),
+    ('Created At', 'created_at'),
+    ('Updated At', 'updated_at'),
+]
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() hands the value back, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def _parse_bound(value, end_of_day=False):
+    """
+    Accept either a full datetime or a plain YYYY-MM-DD date for a range bound.
+    Raises ValueError for anything else, including impossible dates such as
+    2024-02-30 (which parse_date rejects with ValueError rather than None).
+    """
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"{value!r} is not a date or datetime.")
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_reports(queryset, params):
+    """
+    Narrow ``queryset`` with the export parameters found in ``params``:
+    ``status``, ``date_from``/``date_to`` on created_at, and ``after``, the last
+    id a previous (interrupted or chunked) download received. Raises
+    ValueError when a date bound is not a valid date.
+    """
+    status = params.get('status')
+    if status in dict(Report.STATUS_CHOICES):
+        queryset = queryset.filter(status=status)
+    date_from = _parse_bound(params.get('date_from'))
+    if date_from:
+        queryset = queryset.filter(created_at__gte=date_from)
+    date_to = _parse_bound(params.get('date_to'), end_of_day=True)
+    if date_to:
+        queryset = queryset.filter(created_at__lte=date_to)
+    after = params.get('after')
+    if after and after.isdigit():
+        queryset = queryset.filter(id__gt=int(after))
+    return queryset
+
+
+def _rows(queryset, limit=None):
+    # Ordering on the primary key is what makes ``after`` a stable resume point.
+    rows = queryset.order_by('id').values_list(*[lookup for _, lookup in EXPORT_COLUMNS])
+    if limit:
+        rows = rows[:limit]
+    return rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _csv_lines(rows, header=True):
+    writer = csv.writer(Echo())
+    user_column = [lookup for _, lookup in EXPORT_COLUMNS].index('user__username')
+    if header:
+        yield writer.writerow([title for title, _ in EXPORT_COLUMNS])
+    for row in rows:
+        if row[user_column] is None:
+            row = row[:user_column] + ('Anonymous',) + row[user_column + 1:]
+        yield writer.writerow(row)
+
+
+def _ndjson_lines(rows):
+    keys = [title.lower().replace(' ', '_') for title, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(keys, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def _gzip(lines):
+    # wbits=31 writes a gzip container; flush per batch of rows keeps memory flat.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    buffer = []
+    for line in lines:
+        buffer.append(line.encode())
+        if len(buffer) >= CHUNK_SIZE:
+            yield compressor.compress(b''.join(buffer))
+            buffer = []
+    yield compressor.compress(b''.join(buffer)) + compressor.flush()
+
+
+def stream_reports(queryset, export_format='csv', compress=False, limit=None, header=True):
+    """
+    Build a StreamingHttpResponse exporting ``queryset`` as CSV or NDJSON,
+    optionally gzip-compressed. Rows are pulled from the database in chunks and
+    written out as they arrive, so memory use does not grow with the table.
+    """
+    content_type, extension = EXPORT_FORMATS.get(export_format, EXPORT_FORMATS['csv'])
+    rows = _rows(queryset, limit)
+    if extension == 'csv':
+        lines = _csv_lines(rows, header=header)
+    else:
+        lines = _ndjson_lines(rows)
+
+    filename = f"reports.{extension}"
+    if compress:
+        lines = _gzip(lines)
+        content_type = 'application/gzip'
+        filename += '.gz'
+
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def stream_reports_from_request(request, queryset=None):
+    """Apply the request's export parameters to ``queryset`` and stream the result."""
+    params = request.GET
+    if queryset is None:
+        queryset = Report.objects.all()
+    try:
+        queryset = filter_reports(queryset, params)
+    except ValueError as error:
+        return JsonResponse({'status': 'error', 'message': f'Invalid date range: {error}'}, status=400)
+    limit = params.get('limit')
+    return stream_reports(
+        queryset,
+        export_format=params.get('format', 'csv'),
+        compress=params.get('compress') == 'gzip',
+        limit=int(limit) if limit and limit.isdigit() else None,
+        # A resumed download appends to a file that already has its header row.
+        header=not params.get('after'),
+    )
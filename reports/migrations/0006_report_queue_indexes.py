@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0005_alter_report_status'),
+        ('users', '0004_alter_user_is_staff'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['-created_at', '-id'], name='report_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='report_status_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['priority', '-created_at', '-id'], name='report_priority_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='report_category_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['assigned_department', '-created_at', '-id'], name='report_dept_queue_idx'),
+        ),
+    ]
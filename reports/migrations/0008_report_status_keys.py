@@ -0,0 +1,28 @@
+from django.db import migrations
+
+# Citizen-submitted reports used to be saved with the display label ('Pending')
+# instead of the status key ('pending'), which bulk triage and the dashboard
+# counters don't recognise.
+LABEL_TO_KEY = {
+    'Under Review': 'under_review',
+    'Resolved': 'resolved',
+    'Pending': 'pending',
+    'Rejected': 'rejected',
+}
+
+
+def status_labels_to_keys(apps, schema_editor):
+    Report = apps.get_model('reports', 'Report')
+    for label, key in LABEL_TO_KEY.items():
+        Report.objects.filter(status=label).update(status=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0007_reportauditlog'),
+    ]
+
+    operations = [
+        migrations.RunPython(status_labels_to_keys, migrations.RunPython.noop),
+    ]
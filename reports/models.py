@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings  # Important: Import settings to reference your custom user model
 
 class AnonymousReport(models.Model):
@@ -48,6 +48,13 @@ class Report(models.Model):
         ('medium', 'Medium'),
         ('high', 'High'),
     ]
+    # Status changes triage is allowed to make, keyed by the current status.
+    STATUS_TRANSITIONS = {
+        'pending': {'under_review', 'resolved', 'rejected'},
+        'under_review': {'pending', 'resolved', 'rejected'},
+        'resolved': {'under_review'},
+        'rejected': {'under_review'},
+    }
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
@@ -64,5 +71,55 @@ class Report(models.Model):
         blank=True,
         related_name='reports',
     )
+
+    class Meta:
+        # Composite indexes backing the keyset-paginated admin queue, which always
+        # orders on (created_at, id) and optionally filters on one column first.
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='report_queue_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='report_status_queue_idx'),
+            models.Index(fields=['priority', '-created_at', '-id'], name='report_priority_queue_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='report_category_queue_idx'),
+            models.Index(fields=['assigned_department', '-created_at', '-id'], name='report_dept_queue_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Keep the row and the dashboard metric counters its signals adjust in one transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+    def __str__(self):
+        return self.title
+
+
+class ReportAuditLog(models.Model):
+    ACTION_CHOICES = [
+        ('assign', 'Assigned to department'),
+        ('status', 'Status changed'),
+    ]
+
+    report = models.ForeignKey(Report, on_delete=models.CASCADE, related_name='audit_log')
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    from_status = models.CharField(max_length=20, blank=True)
+    to_status = models.CharField(max_length=20, blank=True)
+    from_department = models.ForeignKey(
+        'users.GovernmentAdmin', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    to_department = models.ForeignKey(
+        'users.GovernmentAdmin', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['report', '-created_at'], name='report_audit_idx'),
+        ]
+
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f"{self.get_action_display()} on report {self.report_id} at {self.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
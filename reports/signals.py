@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent after a bulk UPDATE that bypassed Report.save(). ``changes`` is a list of
+# (before, after) dicts holding each affected report's user_id, status,
+# category, priority, assigned_department_id and created_at.
+reports_bulk_changed = Signal()
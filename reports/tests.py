@@ -1,3 +1,156 @@
+import csv
+import importlib
+import io
+import json
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+from django.urls import reverse
+
+from users.models import GovernmentAdmin
+from .bulk import bulk_assign, bulk_transition
+from .models import Report, ReportAuditLog
+from .pagination import keyset_paginate
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        cls.reporter = User.objects.create_user('reporter', password='pw')
+        cls.reports = [
+            Report.objects.create(user=cls.reporter, title=f'Report {n}', description='...', status=status)
+            for n, status in enumerate(['pending', 'pending', 'resolved'])
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_reports_to_csv'), params)
+        body = b''.join(response.streaming_content).decode() if response.streaming else ''
+        return response, body
+
+    def test_csv_has_header_and_every_row(self):
+        response, body = self.export()
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(rows[0][:2], ['ID', 'Title'])
+        self.assertEqual([int(row[0]) for row in rows[1:]], [report.pk for report in self.reports])
+
+    def test_status_filter_and_resume(self):
+        _, body = self.export(format='ndjson', status='pending', after=self.reports[0].pk)
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.reports[1].pk])
+
+    def test_date_range(self):
+        _, body = self.export(format='ndjson', date_from='2000-01-01', date_to='2000-12-31')
+        self.assertEqual(body, '')
+
+    def test_invalid_date_is_a_bad_request(self):
+        for value in ('2024-02-30', '2024-13-01T10:00', 'yesterday'):
+            with self.subTest(value=value):
+                response, _ = self.export(date_from=value)
+                self.assertEqual(response.status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('citizen', password='pw', is_staff=True)
+        cls.reports = [
+            Report.objects.create(user=cls.user, title=f'Report {n}', description='...', status=status)
+            for n, status in enumerate(['pending', 'resolved', 'pending', 'pending', 'pending'])
+        ]
+        # Ties on created_at are broken by id, so a page boundary inside them loses nothing.
+        Report.objects.update(created_at=timezone.now())
+        cls.newest_first = [report.pk for report in reversed(cls.reports)]
+
+    def pages(self, queryset, page_size):
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_paginate(queryset, cursor, page_size)
+            seen.append([row.pk for row in rows])
+            if cursor is None:
+                return seen
+
+    def test_pages_cross_the_cursor_boundary_without_gaps(self):
+        pages = self.pages(Report.objects.all(), 2)
+        self.assertEqual(pages, [self.newest_first[:2], self.newest_first[2:4], self.newest_first[4:]])
+
+    def test_malformed_cursor_starts_over(self):
+        rows, _ = keyset_paginate(Report.objects.all(), 'not-a-cursor', 2)
+        self.assertEqual([row.pk for row in rows], self.newest_first[:2])
+
+    def test_queue_keeps_filters_on_the_next_page(self):
+        self.client.force_login(self.user)
+        pending = [pk for pk in self.newest_first if pk != self.reports[1].pk]
+        with mock.patch('dashboard.views.REPORT_QUEUE_PAGE_SIZE', 3):
+            first = self.client.get(reverse('manage_reports'), {'status': 'pending'})
+            second = self.client.get(f"{reverse('manage_reports')}?{first.context['next_page_query']}")
+        self.assertEqual([report.pk for report in first.context['reports']], pending[:3])
+        self.assertEqual([report.pk for report in second.context['reports']], pending[3:])
+        self.assertIsNone(second.context['next_page_query'])
+
+
+class BulkTriageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.citizen = User.objects.create_user('citizen', password='pw')
+        cls.admin = User.objects.create_user('admin', is_government_admin=True)
+        cls.department = GovernmentAdmin.objects.create(user=cls.admin, department_name='Roads')
+
+    def submit(self, title='Pothole'):
+        self.client.force_login(self.citizen)
+        self.client.post(reverse('submit_userreport'), {'title': title, 'description': 'Deep one'})
+        return Report.objects.get(title=title)
+
+    def test_submitted_reports_store_the_status_key(self):
+        self.assertEqual(self.submit().status, 'pending')
+
+    def test_transition_skips_disallowed_moves(self):
+        pending, resolved = self.submit('One'), self.submit('Two')
+        Report.objects.filter(pk=resolved.pk).update(status='resolved')
+        result = bulk_transition([pending.pk, resolved.pk, 0], 'rejected', actor=self.admin)
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(list(result.skipped), [resolved.pk])
+        self.assertEqual(result.missing, [0])
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'rejected')
+        self.assertEqual(
+            list(ReportAuditLog.objects.values_list('report_id', 'from_status', 'to_status')),
+            [(pending.pk, 'pending', 'rejected')],
+        )
+
+    def test_assign_moves_pending_reports_under_review(self):
+        pending, resolved = self.submit('One'), self.submit('Two')
+        Report.objects.filter(pk=resolved.pk).update(status='resolved')
+        result = bulk_assign([pending.pk, resolved.pk], self.department, actor=self.admin)
+        self.assertEqual(result.updated, 2)
+        statuses = dict(Report.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {pending.pk: 'under_review', resolved.pk: 'resolved'})
+        self.assertEqual(Report.objects.filter(assigned_department=self.department).count(), 2)
+
+    def test_assign_view_is_for_staff_and_post_only(self):
+        report = self.submit()
+        url = reverse('assign_report_to_department', args=[report.pk, self.department.pk])
+        self.assertEqual(self.client.post(url).status_code, 403)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(self.client.post(url).status_code, 302)
+        report.refresh_from_db()
+        self.assertEqual((report.status, report.assigned_department), ('under_review', self.department))
+        self.assertEqual(list(ReportAuditLog.objects.values_list('actor', flat=True)), [self.admin.pk])
 
-# Create your tests here.
+    def test_status_labels_migrate_to_keys(self):
+        report = self.submit()
+        Report.objects.filter(pk=report.pk).update(status='Pending')
+        migration = importlib.import_module('reports.migrations.0008_report_status_keys')
+        migration.status_labels_to_keys(django_apps, None)
+        report.refresh_from_db()
+        self.assertEqual(report.status, 'pending')
@@ -5,6 +5,28 @@ from django.contrib.auth.decorators import login_required
 from .models import Report
 from .forms import ReportForm
 from django.shortcuts import get_object_or_404
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+from PublicBridge.caching import versioned_page
+from PublicBridge.conditional import personal_etag
+
+
+def _report_updated_at(request, report_id):
+    # One query per request, shared by the conditional-GET and page-cache checks.
+    if not hasattr(request, '_report_updated_at'):
+        request._report_updated_at = Report.objects.filter(id=report_id).values_list('updated_at', flat=True).first()
+    return request._report_updated_at
+
+
+def _report_version(request, report_id):
+    updated_at = _report_updated_at(request, report_id)
+    return updated_at and f"{report_id}:{updated_at.timestamp()}"
+
+
+def _user_reports_etag(request):
+    latest = Report.objects.filter(user=request.user).aggregate(updated=Max('updated_at'), total=Count('id'))
+    return personal_etag(request, latest['updated'], latest['total'])
+
 
 def submit_report(request):
     if request.method == 'POST':
@@ -17,6 +39,7 @@ def submit_report(request):
     return render(request, 'reports/submit_report.html', {'form': form})
 
 @login_required
+@condition(etag_func=_user_reports_etag)
 def user_reports(request):
     """ View to display the user-specific reports on the dashboard. """
     user_reports = Report.objects.filter(user=request.user).order_by('-created_at')
@@ -30,15 +53,17 @@ def submit_userreport(request):
         if form.is_valid():
             report = form.save(commit=False)
             report.user = request.user
-            report.status = 'Pending'  # Set the default status to 'Pending'
+            # status is left at the model default, the 'pending' key.
             report.save()
             return redirect('user_reports')  # Redirect to the report list after submission
     else:
         form = ReportForm()
 
     return render(request, 'reports/submit_userreport.html', {'form': form})
+@condition(etag_func=_report_version, last_modified_func=_report_updated_at)
+@versioned_page(_report_version)
 def report_details(request, report_id):
-    report = get_object_or_404(Report, id=report_id)
+    report = get_object_or_404(Report.objects.select_related('user'), id=report_id)
 
     context = {
         'report': report,
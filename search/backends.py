@@ -0,0 +1,152 @@
+"""
+Full-text index storage. SQLite uses an FTS5 virtual table ranked with bm25();
+PostgreSQL uses a table with a generated, weighted tsvector column and a GIN
+index. Both are keyed by the packed row id from search.registry.
+"""
+import html
+import re
+
+from django.db import connection
+
+TABLE = 'search_index'
+# Control characters can't appear in indexed text, so they make safe highlight markers.
+MARK_START, MARK_END = '\x02', '\x03'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def render_snippet(raw):
+    """HTML-escape a snippet and turn the highlight markers into <mark> tags."""
+    return html.escape(raw or '').replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+class SQLiteBackend:
+    create_sql = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+        "kind UNINDEXED, object_id UNINDEXED, link_id UNINDEXED, title, body, "
+        "tokenize='porter unicode61')",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {TABLE}"]
+
+    def upsert(self, cursor, documents):
+        cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(doc[0],) for doc in documents])
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (rowid, kind, object_id, link_id, title, body) VALUES (%s, %s, %s, %s, %s, %s)",
+            documents,
+        )
+
+    def delete(self, cursor, row_ids):
+        cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(row_id,) for row_id in row_ids])
+
+    def clear(self, cursor, kind=None):
+        if kind:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE kind = %s", [kind])
+        else:
+            cursor.execute(f"DELETE FROM {TABLE}")
+
+    def to_query(self, text):
+        # Quote every token so FTS5 operators in user input are matched literally;
+        # the last token is a prefix so results appear while the user is typing.
+        tokens = TOKEN_RE.findall(text)
+        if not tokens:
+            return None
+        terms = [f'"{token}"' for token in tokens]
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+    def search(self, cursor, text, kinds, limit, offset):
+        query = self.to_query(text)
+        if not query:
+            return []
+        placeholders = ', '.join(['%s'] * len(kinds))
+        # bm25 weights follow column order: kind, object_id, link_id, title, body.
+        cursor.execute(
+            f"SELECT kind, object_id, link_id, title, "
+            f"snippet({TABLE}, 4, %s, %s, '…', 16), bm25({TABLE}, 0, 0, 0, 10.0, 1.0) AS rank "
+            f"FROM {TABLE} WHERE {TABLE} MATCH %s AND kind IN ({placeholders}) "
+            f"ORDER BY rank LIMIT %s OFFSET %s",
+            [MARK_START, MARK_END, query, *kinds, limit, offset],
+        )
+        return cursor.fetchall()
+
+    def match_ids(self, cursor, text, kinds, limit):
+        """Object ids of the best matches, without building snippets."""
+        query = self.to_query(text)
+        if not query:
+            return []
+        placeholders = ', '.join(['%s'] * len(kinds))
+        cursor.execute(
+            f"SELECT object_id FROM {TABLE} WHERE {TABLE} MATCH %s AND kind IN ({placeholders}) "
+            f"ORDER BY bm25({TABLE}, 0, 0, 0, 10.0, 1.0) LIMIT %s",
+            [query, *kinds, limit],
+        )
+        return [int(object_id) for object_id, in cursor.fetchall()]
+
+
+class PostgresBackend:
+    create_sql = [
+        f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+        "id bigint PRIMARY KEY, kind varchar(32) NOT NULL, object_id bigint NOT NULL, "
+        "link_id bigint NULL, title text NOT NULL, body text NOT NULL, "
+        "document tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', title), 'A') || "
+        "setweight(to_tsvector('english', body), 'B')) STORED)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_document_idx ON {TABLE} USING GIN (document)",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {TABLE}"]
+
+    def upsert(self, cursor, documents):
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (id, kind, object_id, link_id, title, body) VALUES (%s, %s, %s, %s, %s, %s) "
+            "ON CONFLICT (id) DO UPDATE SET link_id = EXCLUDED.link_id, title = EXCLUDED.title, body = EXCLUDED.body",
+            documents,
+        )
+
+    def delete(self, cursor, row_ids):
+        cursor.execute(f"DELETE FROM {TABLE} WHERE id = ANY(%s)", [list(row_ids)])
+
+    def clear(self, cursor, kind=None):
+        if kind:
+            cursor.execute(f"DELETE FROM {TABLE} WHERE kind = %s", [kind])
+        else:
+            cursor.execute(f"TRUNCATE {TABLE}")
+
+    def to_query(self, text):
+        tokens = TOKEN_RE.findall(text)
+        if not tokens:
+            return None
+        return ' & '.join(tokens[:-1] + [f'{tokens[-1]}:*'])
+
+    def search(self, cursor, text, kinds, limit, offset):
+        query = self.to_query(text)
+        if not query:
+            return []
+        cursor.execute(
+            f"SELECT kind, object_id, link_id, title, "
+            f"ts_headline('english', body, q, %s), ts_rank_cd(document, q) AS rank "
+            f"FROM {TABLE}, to_tsquery('english', %s) q "
+            f"WHERE document @@ q AND kind = ANY(%s) ORDER BY rank DESC LIMIT %s OFFSET %s",
+            [f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=10',
+             query, list(kinds), limit, offset],
+        )
+        return cursor.fetchall()
+
+    def match_ids(self, cursor, text, kinds, limit):
+        """Object ids of the best matches, without building headlines."""
+        query = self.to_query(text)
+        if not query:
+            return []
+        cursor.execute(
+            f"SELECT object_id FROM {TABLE}, to_tsquery('english', %s) q "
+            f"WHERE document @@ q AND kind = ANY(%s) ORDER BY ts_rank_cd(document, q) DESC LIMIT %s",
+            [query, list(kinds), limit],
+        )
+        return [object_id for object_id, in cursor.fetchall()]
+
+
+def get_backend(conn=None):
+    conn = conn or connection
+    if conn.vendor == 'postgresql':
+        return PostgresBackend()
+    if conn.vendor == 'sqlite':
+        return SQLiteBackend()
+    return None
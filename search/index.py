@@ -0,0 +1,95 @@
+from django.db import connection, transaction
+from django.utils.safestring import mark_safe
+
+from .backends import get_backend, render_snippet
+from .registry import KINDS, KINDS_BY_NAME
+
+CHUNK_SIZE = 2000
+
+
+def index_objects(kind, objects):
+    backend = get_backend()
+    if backend is None:
+        return
+    documents = [kind.document(obj) for obj in objects]
+    if documents:
+        with connection.cursor() as cursor:
+            backend.upsert(cursor, documents)
+
+
+def remove_objects(kind, object_ids):
+    backend = get_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.delete(cursor, [kind.row_id(pk) for pk in object_ids])
+
+
+def rebuild(kind_names=None, chunk_size=CHUNK_SIZE, stdout=None):
+    """Re-index every object of the given kinds (all kinds by default). Returns {kind: count}."""
+    backend = get_backend()
+    if backend is None:
+        raise RuntimeError(f"Full-text search is not supported on {connection.vendor}.")
+    totals = {}
+    for kind in KINDS:
+        if kind_names and kind.name not in kind_names:
+            continue
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                backend.clear(cursor, kind.name)
+            total = 0
+            batch = []
+            for obj in kind.model.objects.order_by('pk').iterator(chunk_size=chunk_size):
+                batch.append(obj)
+                if len(batch) >= chunk_size:
+                    index_objects(kind, batch)
+                    total += len(batch)
+                    batch = []
+            index_objects(kind, batch)
+            total += len(batch)
+        totals[kind.name] = total
+        if stdout:
+            stdout.write(f"Indexed {total} {kind.name} documents.")
+    return totals
+
+
+def search(text, kinds=None, public_only=True, limit=20, offset=0):
+    """
+    Return ranked hits for ``text`` as dicts with kind, object_id, title,
+    snippet (safe HTML with <mark> highlights) and url.
+    """
+    backend = get_backend()
+    if backend is None:
+        return []
+    names = [
+        kind.name for kind in KINDS
+        if (not kinds or kind.name in kinds) and (kind.public or not public_only)
+    ]
+    if not names:
+        return []
+    with connection.cursor() as cursor:
+        rows = backend.search(cursor, text, names, limit, offset)
+    results = []
+    for kind_name, object_id, link_id, title, snippet, rank in rows:
+        kind = KINDS_BY_NAME[kind_name]
+        results.append({
+            'kind': kind_name,
+            'object_id': int(object_id),
+            'title': title,
+            'snippet': mark_safe(render_snippet(snippet)),
+            'url': kind.get_url(int(object_id), link_id),
+            'rank': rank,
+        })
+    return results
+
+
+def matching_ids(kind_name, text, limit=1000):
+    """
+    Primary keys of the best ``limit`` objects of one kind matching ``text``.
+    Only the ids are read: no snippets, titles or URLs.
+    """
+    backend = get_backend()
+    if backend is None:
+        return []
+    with connection.cursor() as cursor:
+        return backend.match_ids(cursor, text, [kind_name], limit)
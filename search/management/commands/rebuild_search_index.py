@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from search.index import CHUNK_SIZE, rebuild
+from search.registry import KINDS_BY_NAME
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for reports, posts and comments from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*', help=f"Kinds to rebuild (default all): {', '.join(KINDS_BY_NAME)}")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        unknown = set(options['kinds']) - set(KINDS_BY_NAME)
+        if unknown:
+            raise CommandError(f"Unknown kinds: {', '.join(sorted(unknown))}")
+        try:
+            totals = rebuild(options['kinds'], options['chunk_size'], stdout=self.stdout)
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Indexed {sum(totals.values())} documents."))
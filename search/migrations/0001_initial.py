@@ -0,0 +1,28 @@
+from django.db import migrations
+
+from search.backends import get_backend
+
+
+def create_index(apps, schema_editor):
+    backend = get_backend(schema_editor.connection)
+    if backend is not None:
+        for sql in backend.create_sql:
+            schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    backend = get_backend(schema_editor.connection)
+    if backend is not None:
+        for sql in backend.drop_sql:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+from search.backends import get_backend
+from search.registry import KINDS
+
+CHUNK_SIZE = 2000
+
+
+def backfill_index(apps, schema_editor):
+    """Index the rows that existed before the index did (later writes are indexed by signals)."""
+    backend = get_backend(schema_editor.connection)
+    if backend is None:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for kind in KINDS:
+            model = apps.get_model(kind.model_label)
+            documents = []
+            for obj in model.objects.order_by('pk').iterator(chunk_size=CHUNK_SIZE):
+                documents.append(kind.document(obj))
+                if len(documents) >= CHUNK_SIZE:
+                    backend.upsert(cursor, documents)
+                    documents = []
+            if documents:
+                backend.upsert(cursor, documents)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('forum', '0015_post_comment_updated_at'),
+        ('reports', '0008_report_status_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+from .backends import get_backend
+from .index import matching_ids
+
+
+class FullTextSearchAdminMixin:
+    """
+    Answer the admin changelist search box from the full-text index instead of
+    LIKE '%term%' scans over ``search_fields``. Set ``search_kind`` to the
+    registry name of the model.
+    """
+    search_kind = None
+    search_result_limit = 1000
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or get_backend() is None:
+            return super().get_search_results(request, queryset, search_term)
+        ids = matching_ids(self.search_kind, search_term, limit=self.search_result_limit)
+        return queryset.filter(pk__in=ids), False
@@ -0,0 +1,81 @@
+from django.apps import apps
+from django.urls import reverse
+
+# Everything the search index covers. ``code`` is packed into each document's
+# row id (object_id * KIND_SLOTS + code) so a document can be replaced or
+# removed by primary key; never renumber an existing kind.
+KIND_SLOTS = 8
+
+
+class SearchKind:
+    def __init__(self, name, model, code, title, body, url=None, link=None, public=True):
+        self.name = name
+        self.model_label = model
+        self.code = code
+        self.title = title
+        self.body = body
+        self.url = url
+        # Optional id stored with the document for building its URL (e.g. a comment's post).
+        self.link = link
+        self.public = public
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def row_id(self, object_id):
+        return object_id * KIND_SLOTS + self.code
+
+    def document(self, obj):
+        link_id = self.link(obj) if self.link else None
+        return self.row_id(obj.pk), self.name, obj.pk, link_id, self.title(obj) or '', self.body(obj) or ''
+
+    def get_url(self, object_id, link_id):
+        if self.url:
+            return self.url(object_id, link_id)
+        model = self.model
+        return reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_change', args=[object_id])
+
+
+KINDS = [
+    SearchKind(
+        'report', 'reports.Report', 1,
+        title=lambda report: report.title,
+        body=lambda report: report.description,
+        url=lambda pk, link_id: reverse('report_details', args=[pk]),
+    ),
+    SearchKind(
+        'anonymous_report', 'reports.AnonymousReport', 2,
+        title=lambda report: report.get_category_display(),
+        body=lambda report: report.description,
+        public=False,
+    ),
+    SearchKind(
+        'post', 'forum.Post', 3,
+        title=lambda post: post.title,
+        body=lambda post: post.content,
+        url=lambda pk, link_id: reverse('forum:post_detail', args=[pk]),
+    ),
+    SearchKind(
+        'comment', 'forum.Comment', 4,
+        title=lambda comment: '',
+        body=lambda comment: comment.content,
+        url=lambda pk, post_id: reverse('forum:post_detail', args=[post_id]),
+        link=lambda comment: comment.post_id,
+    ),
+    SearchKind(
+        'department_post', 'forum.DepartmentPost', 5,
+        title=lambda post: post.title,
+        body=lambda post: post.content,
+    ),
+]
+
+KINDS_BY_NAME = {kind.name: kind for kind in KINDS}
+
+
+def kind_for_model(model):
+    label = model._meta.label
+    for kind in KINDS:
+        if kind.model_label == label:
+            return kind
+    return None
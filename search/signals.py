@@ -0,0 +1,49 @@
+from django.db import models
+from django.db.models.signals import post_delete, post_save
+
+from .index import index_objects, remove_objects
+from .registry import KINDS
+
+# Models whose deletion cascades to indexed objects of another model (e.g. a
+# post to its comments). Documents removed by such a cascade are collected on
+# the object the delete started from and removed together when it goes, which
+# Django does after deleting everything that depends on it.
+CASCADE_ORIGINS = set()
+
+
+def _connect(kind):
+    def update_document(sender, instance, **kwargs):
+        index_objects(kind, [instance])
+
+    def remove_document(sender, instance, origin=None, **kwargs):
+        if type(origin) in CASCADE_ORIGINS and type(origin) is not sender:
+            origin.__dict__.setdefault('_search_removals', {}).setdefault(kind, []).append(instance.pk)
+            return
+        remove_objects(kind, [instance.pk])
+
+    post_save.connect(update_document, sender=kind.model, weak=False, dispatch_uid=f'search_index_{kind.name}')
+    post_delete.connect(remove_document, sender=kind.model, weak=False, dispatch_uid=f'search_remove_{kind.name}')
+
+
+def remove_cascaded_documents(sender, instance, **kwargs):
+    # Cascaded rows are deleted before the object they hang off, so by the
+    # time its post_delete fires every removal has been collected.
+    for kind, object_ids in instance.__dict__.pop('_search_removals', {}).items():
+        remove_objects(kind, object_ids)
+
+
+for _kind in KINDS:
+    _connect(_kind)
+    CASCADE_ORIGINS.update(
+        field.related_model for field in _kind.model._meta.get_fields()
+        if isinstance(field, models.ForeignKey) and field.remote_field.on_delete is models.CASCADE
+        and field.related_model is not _kind.model
+    )
+
+# Connected per model: a receiver without a sender would stop Django from
+# fast-deleting rows of every other model.
+for _model in CASCADE_ORIGINS:
+    post_delete.connect(
+        remove_cascaded_documents, sender=_model, weak=False,
+        dispatch_uid=f'search_remove_cascaded_{_model._meta.label_lower}',
+    )
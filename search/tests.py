@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from forum.models import Comment, Post
+from reports.models import AnonymousReport
+from .index import matching_ids, search
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.post = Post.objects.create(author=cls.author, title='Streetlight outage', content='Dark since Monday')
+        cls.other = Post.objects.create(author=cls.author, title='Park cleanup', content='Bring gloves')
+        cls.comment = Comment.objects.create(post=cls.other, author=cls.author, content='The streetlight by the gate too')
+        AnonymousReport.objects.create(category='service', description='Streetlight wiring exposed')
+
+    def hits(self, text, **kwargs):
+        return [(hit['kind'], hit['object_id']) for hit in search(text, **kwargs)]
+
+    def test_matches_titles_and_bodies_across_kinds(self):
+        self.assertEqual(self.hits('streetlight'), [('post', self.post.pk), ('comment', self.comment.pk)])
+        hit = search('gloves')[0]
+        self.assertEqual(hit['url'], reverse('forum:post_detail', args=[self.other.pk]))
+        self.assertIn('<mark>gloves</mark>', hit['snippet'])
+
+    def test_last_word_matches_as_a_prefix(self):
+        self.assertEqual(self.hits('park clean'), [('post', self.other.pk)])
+
+    def test_query_syntax_is_matched_literally(self):
+        self.assertEqual(self.hits('"park" OR NOT'), [])
+        self.assertEqual(self.hits('***'), [])
+
+    def test_staff_only_kinds_are_hidden_from_the_public(self):
+        self.assertNotIn('anonymous_report', {kind for kind, _ in self.hits('wiring')})
+        self.assertEqual([kind for kind, _ in self.hits('wiring', public_only=False)], ['anonymous_report'])
+
+    def test_edits_and_deletes_update_the_index(self):
+        self.post.title = 'Pothole'
+        self.post.save()
+        self.assertEqual(matching_ids('post', 'streetlight'), [])
+        self.other.delete()
+        self.assertEqual(self.hits('streetlight gate'), [])
+        self.assertEqual(self.hits('gloves'), [])
@@ -0,0 +1,34 @@
+from django.shortcuts import render
+
+from .index import search
+from .registry import KINDS
+
+RESULTS_PER_PAGE = 20
+
+
+def search_view(request):
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('kind') or None
+    page = request.GET.get('page', '1')
+    page = int(page) if page.isdigit() and int(page) > 0 else 1
+
+    results = []
+    if query:
+        # Fetch one extra hit to know whether there is a next page without a COUNT.
+        results = search(
+            query,
+            kinds=[kind] if kind else None,
+            public_only=not request.user.is_staff,
+            limit=RESULTS_PER_PAGE + 1,
+            offset=(page - 1) * RESULTS_PER_PAGE,
+        )
+    has_next = len(results) > RESULTS_PER_PAGE
+
+    return render(request, 'search/results.html', {
+        'query': query,
+        'kind': kind,
+        'kinds': [k.name for k in KINDS if k.public or request.user.is_staff],
+        'results': results[:RESULTS_PER_PAGE],
+        'page': page,
+        'has_next': has_next,
+    })
@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from django.contrib import admin
-from .models import GovernmentAdmin, Profile, Follow
+from .models import GovernmentAdmin, Profile, Follow, SuggestedUser
 
 
 # Admin panel for managing GovernmentAdmin (ministries or departments)
@@ -25,26 +25,30 @@ class GovernmentAdminAdmin(admin.ModelAdmin):
 
 # Admin panel for Profile (to track citizen profiles and their engagement)
 class ProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'bio', 'get_following_count', 'get_follower_count')  # Key info for admin_dashboard
+    list_display = ('user', 'bio', 'following_count', 'followers_count')  # Key info for admin_dashboard
+    list_select_related = ('user',)
     search_fields = ('user__username', 'bio')  # Enable profile searching
-
-    # Additional methods to display engagement metrics
-    def get_following_count(self, obj):
-        return obj.following.count()
-    get_following_count.short_description = 'Following Count'
-
-    def get_follower_count(self, obj):
-        return obj.followers.count()
-    get_follower_count.short_description = 'Follower Count'
+    readonly_fields = ('following_count', 'followers_count')  # Maintained from Follow rows
 
 
 # Admin panel for Follow (tracking relationships between users)
 class FollowAdmin(admin.ModelAdmin):
     list_display = ('follower', 'followed')  # Show follow relationships
+    list_select_related = ('follower__user', 'followed__user')
+    raw_id_fields = ('follower', 'followed')
     search_fields = ('follower__user__username', 'followed__user__username')  # Search by follower/followed
 
 
+# Admin panel for precomputed follow suggestions (read-only; rebuilt by rebuild_suggestions)
+class SuggestedUserAdmin(admin.ModelAdmin):
+    list_display = ('user', 'rank', 'suggested', 'score', 'mutual_count', 'computed_at')
+    list_select_related = ('user', 'suggested')
+    search_fields = ('user__username',)
+    raw_id_fields = ('user', 'suggested')
+
+
 # Register the models to the admin_dashboard site
 admin.site.register(GovernmentAdmin, GovernmentAdminAdmin)
 admin.site.register(Profile, ProfileAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(SuggestedUser, SuggestedUserAdmin)
@@ -0,0 +1,67 @@
+"""
+Follow graph between users.
+
+Follows are stored between profiles (users.Follow) but everything here takes
+users. Membership is an EXISTS query; the follower/following totals are
+denormalized onto Profile and adjusted in the same transaction as the Follow
+row (see users.signals), so lists of users never count per row.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Follow, Profile
+from .recommendations import forget
+
+
+def is_following(user, other_user):
+    return Follow.objects.filter(follower__user=user, followed__user=other_user).exists()
+
+
+def follow(user, other_user):
+    """Make ``user`` follow ``other_user``. Returns False if they already did."""
+    if user.pk == other_user.pk:
+        raise ValueError("Users cannot follow themselves.")
+    follower, _ = Profile.objects.get_or_create(user=user)
+    followed, _ = Profile.objects.get_or_create(user=other_user)
+    try:
+        with transaction.atomic():
+            Follow.objects.create(follower=follower, followed=followed)
+    except IntegrityError:
+        return False
+    forget(user, other_user)
+    return True
+
+
+def unfollow(user, other_user):
+    """Stop ``user`` following ``other_user``. Returns False if they weren't."""
+    with transaction.atomic():
+        # Deleting through the queryset fires post_delete, which adjusts the counts.
+        deleted, _ = Follow.objects.filter(follower__user=user, followed__user=other_user).delete()
+    return bool(deleted)
+
+
+def adjust_counts(follower_profile_id, followed_profile_id, delta):
+    # Clamped at zero so a count that drifted (e.g. Follow rows bulk-loaded)
+    # can't make a delete fail; recount() puts it right.
+    Profile.objects.filter(pk=follower_profile_id).update(following_count=Greatest(F('following_count') + delta, 0))
+    Profile.objects.filter(pk=followed_profile_id).update(followers_count=Greatest(F('followers_count') + delta, 0))
+
+
+def recount(profile_ids=None):
+    """Recompute the denormalized counts from Follow rows. Returns how many profiles changed."""
+    profiles = Profile.objects.all()
+    if profile_ids is not None:
+        profiles = profiles.filter(pk__in=profile_ids)
+    followers = (
+        Follow.objects.filter(followed=OuterRef('pk')).order_by()
+        .values('followed').annotate(total=Count('id')).values('total')
+    )
+    following = (
+        Follow.objects.filter(follower=OuterRef('pk')).order_by()
+        .values('follower').annotate(total=Count('id')).values('total')
+    )
+    return profiles.update(
+        followers_count=Coalesce(Subquery(followers), Value(0)),
+        following_count=Coalesce(Subquery(following), Value(0)),
+    )
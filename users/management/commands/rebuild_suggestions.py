@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from users.recommendations import CHUNK_SIZE, TOP_K, rebuild_suggestions
+
+
+class Command(BaseCommand):
+    help = "Recompute every active user's 'who to follow' suggestions from the follow graph."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=TOP_K, help="Suggestions stored per user.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Users scored per sparse-matrix block.")
+
+    def handle(self, *args, **options):
+        total = rebuild_suggestions(
+            top_k=options['top_k'], chunk_size=options['chunk_size'], stdout=self.stdout
+        )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt suggestions for {total} users."))
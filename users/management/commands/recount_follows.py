@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.follows import recount
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized follower/following counts on profiles from the Follow table."
+
+    def handle(self, *args, **options):
+        updated = recount()
+        self.stdout.write(self.style.SUCCESS(f"Recounted follows for {updated} profiles."))
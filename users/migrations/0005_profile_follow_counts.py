@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_follow_counts(apps, schema_editor):
+    Profile = apps.get_model('users', 'Profile')
+    Follow = apps.get_model('users', 'Follow')
+    followers = (
+        Follow.objects.filter(followed=OuterRef('pk')).order_by()
+        .values('followed').annotate(total=Count('id')).values('total')
+    )
+    following = (
+        Follow.objects.filter(follower=OuterRef('pk')).order_by()
+        .values('follower').annotate(total=Count('id')).values('total')
+    )
+    Profile.objects.update(
+        followers_count=Coalesce(Subquery(followers), Value(0)),
+        following_count=Coalesce(Subquery(following), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_alter_user_is_staff'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_follow_counts, migrations.RunPython.noop),
+    ]
@@ -48,6 +48,44 @@ class Profile(models.Model):
         related_name='followers',
         symmetrical=False
     )
+    # Kept in step with Follow rows by users.signals; see users/follows.py.
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    COUNTER_FIELDS = ('followers_count', 'following_count')
 
     def __str__(self):
         return self.user.username
+
+    def save(self, *args, **kwargs):
+        # Counters only change through F() updates; a full save of an instance
+        # loaded earlier (profile form, the User post_save hook) must not write
+        # stale values back over them.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+# Precomputed "who to follow" suggestions, rebuilt by the rebuild_suggestions
+# command (users/recommendations.py) and read back in rank order.
+class SuggestedUser(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="suggestions")
+    suggested = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    mutual_count = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'suggested'], name='unique_suggested_user'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'rank'], name='suggested_user_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"Suggest {self.suggested_id} to {self.user_id} (#{self.rank})"
@@ -0,0 +1,134 @@
+"""
+"Who to follow" suggestions.
+
+A periodic batch job (``python manage.py rebuild_suggestions``) loads the whole
+follow graph into a SciPy sparse matrix ``A`` (A[i, j] = 1 when user i follows
+user j). Row block ``A[rows] @ A`` counts, for every candidate j, how many of
+the people i follows also follow j: friends of friends. Each candidate's score
+is that mutual count plus a boost for engagement and popularity; users with too
+few such candidates are topped up with the globally best-boosted users. The top
+``TOP_K`` per user are stored in SuggestedUser, and requests read them back
+with one indexed query.
+
+NumPy and SciPy are only imported by the batch job, not by web processes.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .models import Follow, SuggestedUser
+
+User = get_user_model()
+
+TOP_K = 20
+CHUNK_SIZE = 5000
+MUTUAL_WEIGHT = 1.0
+ENGAGEMENT_WEIGHT = 0.5
+POPULARITY_WEIGHT = 0.25
+
+
+def suggestions_for(user, limit=5):
+    """``user``'s precomputed suggestions, best first."""
+    return [
+        row.suggested
+        for row in SuggestedUser.objects.filter(user=user).select_related('suggested').order_by('rank')[:limit]
+    ]
+
+
+def forget(user, suggested_user):
+    """Drop one suggestion, e.g. once the user has followed them."""
+    SuggestedUser.objects.filter(user=user, suggested=suggested_user).delete()
+
+
+def _load_graph():
+    import numpy as np
+    from scipy import sparse
+
+    users = list(User.objects.filter(is_active=True).order_by('id').values_list('id', 'engagement_score'))
+    user_ids = np.array([row[0] for row in users], dtype=np.int64)
+    engagement = np.array([row[1] for row in users], dtype=np.float64)
+    n = len(user_ids)
+
+    edges = np.array(
+        list(Follow.objects.values_list('follower__user_id', 'followed__user_id').iterator(chunk_size=CHUNK_SIZE)),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    # Map user ids to matrix positions, dropping edges that touch inactive users.
+    src = np.searchsorted(user_ids, edges[:, 0])
+    dst = np.searchsorted(user_ids, edges[:, 1])
+    valid = (src < n) & (dst < n)
+    valid[valid] &= (user_ids[src[valid]] == edges[valid, 0]) & (user_ids[dst[valid]] == edges[valid, 1])
+    src, dst = src[valid], dst[valid]
+
+    graph = sparse.csr_matrix((np.ones(len(src), dtype=np.float64), (src, dst)), shape=(n, n))
+    graph.sum_duplicates()
+    graph.data[:] = 1.0
+    return user_ids, engagement, graph
+
+
+def _rank_block(block, followed, start, boost, popular, top_k):
+    """Yield ``(row, [(position, score, mutual), ...])`` for one row block of A @ A."""
+    import numpy as np
+
+    rows = block.shape[0]
+    # Drop each user themselves and everyone they already follow, all at once.
+    row_of_entry = np.repeat(np.arange(rows), np.diff(block.indptr))
+    block.data[block.indices == row_of_entry + start] = 0
+    block = block - block.multiply(followed)
+    block.eliminate_zeros()
+
+    scores = block.copy()
+    scores.data = MUTUAL_WEIGHT * block.data + boost[block.indices]
+
+    for row in range(rows):
+        lo, hi = block.indptr[row], block.indptr[row + 1]
+        candidates, mutual, score = block.indices[lo:hi], block.data[lo:hi], scores.data[lo:hi]
+        if len(candidates) > top_k:
+            keep = np.argpartition(-score, top_k)[:top_k]
+            candidates, mutual, score = candidates[keep], mutual[keep], score[keep]
+        order = np.argsort(-score, kind='stable')
+        picked = [(int(candidates[k]), float(score[k]), int(mutual[k])) for k in order]
+
+        if len(picked) < top_k:
+            taken = set(candidates.tolist())
+            taken.update(followed.indices[followed.indptr[row]:followed.indptr[row + 1]].tolist())
+            taken.add(start + row)
+            for position in popular:
+                if len(picked) >= top_k:
+                    break
+                if position not in taken:
+                    picked.append((int(position), float(boost[position]), 0))
+        yield row, picked
+
+
+def rebuild_suggestions(top_k=TOP_K, chunk_size=CHUNK_SIZE, stdout=None):
+    """Recompute and store every active user's top ``top_k`` suggestions. Returns users processed."""
+    import numpy as np
+
+    user_ids, engagement, graph = _load_graph()
+    n = len(user_ids)
+    followers = np.asarray(graph.sum(axis=0)).ravel()
+    boost = ENGAGEMENT_WEIGHT * np.log1p(np.maximum(engagement, 0)) + POPULARITY_WEIGHT * np.log1p(followers)
+    # Enough fallback candidates to top up anyone who follows a fair number of them.
+    popular = np.argsort(-boost, kind='stable')[:top_k * 5].tolist()
+
+    for start in range(0, n, chunk_size):
+        end = min(start + chunk_size, n)
+        followed = graph[start:end]
+        block = followed @ graph
+        rows = []
+        for row, picked in _rank_block(block, followed, start, boost, popular, top_k):
+            user_id = int(user_ids[start + row])
+            rows.extend(
+                SuggestedUser(
+                    user_id=user_id, suggested_id=int(user_ids[position]),
+                    rank=rank, score=score, mutual_count=mutual,
+                )
+                for rank, (position, score, mutual) in enumerate(picked, start=1)
+            )
+        with transaction.atomic():
+            SuggestedUser.objects.filter(user_id__in=user_ids[start:end].tolist()).delete()
+            SuggestedUser.objects.bulk_create(rows, batch_size=1000)
+        if stdout:
+            stdout.write(f"Suggestions rebuilt for {end} of {n} users.")
+    SuggestedUser.objects.filter(user__is_active=False).delete()
+    return n
@@ -1,3 +1,101 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from . import follows
+from .models import Profile, SuggestedUser
+from .recommendations import rebuild_suggestions, suggestions_for
+
+User = get_user_model()
+
+
+class FollowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', password='pw')
+        cls.bob = User.objects.create_user('bob', password='pw')
+
+    def setUp(self):
+        self.client.force_login(self.alice)
+
+    def counts(self, user):
+        profile = Profile.objects.get(user=user)
+        return profile.followers_count, profile.following_count
+
+    def test_follow_and_unfollow_keep_counts(self):
+        response = self.client.post(reverse('forum:follow_user', args=[self.bob.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(follows.is_following(self.alice, self.bob))
+        self.assertEqual((self.counts(self.alice), self.counts(self.bob)), ((0, 1), (1, 0)))
+
+        response = self.client.post(reverse('forum:unfollow_user', args=[self.bob.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(follows.is_following(self.alice, self.bob))
+        self.assertEqual((self.counts(self.alice), self.counts(self.bob)), ((0, 0), (0, 0)))
+
+    def test_follow_endpoints_require_post(self):
+        for name in ('forum:follow_user', 'forum:unfollow_user'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=[self.bob.id]))
+                self.assertEqual(response.status_code, 405)
+        self.assertFalse(follows.is_following(self.alice, self.bob))
+
+    def test_follow_endpoints_check_csrf(self):
+        self.client = self.client_class(enforce_csrf_checks=True)
+        self.client.force_login(self.alice)
+        response = self.client.post(reverse('forum:follow_user', args=[self.bob.id]))
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(follows.is_following(self.alice, self.bob))
+
+    def test_repeated_and_self_follows_are_rejected(self):
+        self.assertTrue(follows.follow(self.alice, self.bob))
+        self.assertFalse(follows.follow(self.alice, self.bob))
+        self.assertEqual(self.counts(self.bob), (1, 0))
+        response = self.client.post(reverse('forum:follow_user', args=[self.alice.id]))
+        self.assertEqual(response.status_code, 400)
+
+    def test_recount_repairs_drift(self):
+        follows.follow(self.alice, self.bob)
+        Profile.objects.filter(user=self.bob).update(followers_count=5)
+        follows.unfollow(self.alice, self.bob)
+        self.assertEqual(self.counts(self.bob), (4, 0))
+        follows.recount()
+        self.assertEqual(self.counts(self.bob), (0, 0))
+
+
+class SuggestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {name: User.objects.create_user(name) for name in ('alice', 'bob', 'carol', 'dave', 'erin', 'frank')}
+        cls.gone = User.objects.create_user('gone', is_active=False)
+        for follower, followed in [('alice', 'bob'), ('alice', 'carol'), ('bob', 'dave'),
+                                   ('carol', 'dave'), ('carol', 'erin')]:
+            follows.follow(cls.users[follower], cls.users[followed])
+        follows.follow(cls.users['bob'], cls.gone)
+
+    def names(self, user):
+        return [suggested.username for suggested in suggestions_for(user, limit=10)]
+
+    def test_friends_of_friends_rank_by_mutual_follows_then_top_up(self):
+        self.assertEqual(rebuild_suggestions(), 6)
+        self.assertEqual(self.names(self.users['alice']), ['dave', 'erin', 'frank'])
+        mutual = SuggestedUser.objects.filter(user=self.users['alice']).order_by('rank')
+        self.assertEqual(list(mutual.values_list('mutual_count', flat=True)), [2, 1, 0])
+        # Never yourself, people you follow, or inactive users.
+        for user in self.users.values():
+            names = self.names(user)
+            self.assertNotIn(user.username, names)
+            self.assertNotIn('gone', names)
+            self.assertFalse(any(follows.is_following(user, User.objects.get(username=name)) for name in names))
+        self.assertFalse(SuggestedUser.objects.filter(user=self.gone).exists())
+
+    def test_following_a_suggestion_drops_it(self):
+        rebuild_suggestions()
+        follows.follow(self.users['alice'], self.users['dave'])
+        self.assertEqual(self.names(self.users['alice']), ['erin', 'frank'])
+
+    def test_rebuild_replaces_earlier_suggestions(self):
+        rebuild_suggestions(top_k=1, chunk_size=2)
+        self.assertEqual(self.names(self.users['alice']), ['dave'])
+        rebuild_suggestions()
+        self.assertEqual(self.names(self.users['alice']), ['dave', 'erin', 'frank'])